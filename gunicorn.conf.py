@@ -0,0 +1,25 @@
+"""
+Gunicorn configuration for running Welli with pre-forked uvicorn workers
+
+Models are loaded once in the master and shared copy-on-write with workers:
+    gunicorn src.main:app -c gunicorn.conf.py
+"""
+
+import os
+from src.utils.env import load_environment
+
+# Settings below may come from .env
+load_environment()
+
+bind = f"{os.getenv('API_HOST', '0.0.0.0')}:{os.getenv('API_PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import the app in the master so models can be loaded before fork
+preload_app = os.getenv("PRELOAD_MODELS_BEFORE_FORK", "True").lower() == "true"
+
+def when_ready(server):
+    """Runs in the master after the app is imported and before workers are forked"""
+    if preload_app:
+        from src.api.routes import preload_models_before_fork
+        preload_models_before_fork()
@@ -0,0 +1,47 @@
+"""
+Compare per-call churn inference latency of the scaler -> sklearn pipeline and the compiled forest backend
+
+Usage (from the repository root):
+    python -m scripts.bench_churn_inference [--rows 1] [--repeats 500]
+"""
+
+import argparse
+import time
+import numpy as np
+from src.models.churn_model import ChurnPredictor
+
+def _time_per_call(fn, X: np.ndarray, repeats: int) -> float:
+    fn(X)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(X)
+    return (time.perf_counter() - start) / repeats * 1000.0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1, help="Rows per predict_proba call")
+    parser.add_argument("--repeats", type=int, default=500, help="Timed calls per backend")
+    args = parser.parse_args()
+
+    predictor = ChurnPredictor(use_artifact=False)
+    if predictor.compiled_model is None:
+        raise SystemExit("Compiled backend unavailable, set CHURN_MODEL_BACKEND=compiled")
+
+    scaler = predictor.churn_scaler
+    X = scaler.mean_ + np.random.default_rng(0).standard_normal((args.rows, len(predictor.feature_names))) * scaler.scale_
+
+    def sklearn_pipeline(features):
+        return predictor.churn_model.predict_proba(scaler.transform(features))
+
+    identical = np.array_equal(sklearn_pipeline(X), predictor.compiled_model.predict_proba(X))
+
+    sklearn_ms = _time_per_call(sklearn_pipeline, X, args.repeats)
+    compiled_ms = _time_per_call(predictor.compiled_model.predict_proba, X, args.repeats)
+
+    print(f"rows per call:      {args.rows}")
+    print(f"sklearn backend:    {sklearn_ms:.3f} ms/call")
+    print(f"compiled backend:   {compiled_ms:.3f} ms/call ({sklearn_ms / compiled_ms:.1f}x faster)")
+    print(f"bit-identical:      {identical}")
+
+if __name__ == "__main__":
+    main()
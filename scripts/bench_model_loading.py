@@ -0,0 +1,67 @@
+"""
+Compare model load time from joblib pickles against the memory-mapped array artifacts
+
+Each measurement runs in a fresh interpreter, so it includes the imports each format needs
+(sklearn for joblib, NumPy only for artifacts). Run scripts.export_model_artifacts first.
+
+Usage (from the repository root):
+    python -m scripts.bench_model_loading [--repeats 5]
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+JOBLIB_LOAD = """
+import joblib
+for path in ("ml_models/churn_classification/churn_model.joblib", "ml_models/churn_classification/churn_scaler.joblib",
+             "ml_models/clustering/kmeans_model.joblib", "ml_models/clustering/clustering_scaler.joblib"):
+    joblib.load(path)
+"""
+
+ARTIFACT_LOAD = """
+from src.utils.model_loader import ModelLoader
+from src.utils.forest_compiler import CompiledForest
+from src.utils.kmeans_kernel import NearestCentroidKernel
+# Includes the staleness check the services run against the joblib files before trusting an artifact
+for directory, artifact, sources in (
+    ("ml_models/churn_classification", "churn_model.welli", ("churn_model.joblib", "churn_scaler.joblib")),
+    ("ml_models/clustering", "kmeans_model.welli", ("kmeans_model.joblib", "clustering_scaler.joblib"))
+):
+    loader = ModelLoader(base_path=directory)
+    arrays, metadata = loader.load_array_artifact(artifact)
+    assert loader.file_stamp(*sources) == metadata["source_stamp"], f"{artifact} is stale, re-run scripts.export_model_artifacts"
+    if "forest" in metadata:
+        CompiledForest.from_arrays(arrays, metadata["forest"])
+    else:
+        NearestCentroidKernel.from_arrays(arrays)
+"""
+
+TIMED = """
+import json, sys, time
+started = time.perf_counter()
+exec(sys.argv[1])
+print(json.dumps({"seconds": time.perf_counter() - started}))
+"""
+
+def _time_in_fresh_process(load_code: str) -> float:
+    result = subprocess.run([sys.executable, "-c", TIMED, load_code], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])["seconds"]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=5, help="Fresh processes per format")
+    args = parser.parse_args()
+
+    results = {}
+    for name, code in (("joblib", JOBLIB_LOAD), ("artifact", ARTIFACT_LOAD)):
+        _time_in_fresh_process(code)  # warm the page cache
+        results[name] = statistics.median(_time_in_fresh_process(code) for _ in range(args.repeats)) * 1000.0
+
+    print(f"joblib (imports + unpickle):                 {results['joblib']:.1f} ms")
+    print(f"array artifact (imports + validate + mmap):  {results['artifact']:.1f} ms ({results['joblib'] / results['artifact']:.1f}x faster)")
+
+if __name__ == "__main__":
+    main()
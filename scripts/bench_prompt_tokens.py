@@ -0,0 +1,183 @@
+"""
+Compare daily-plan prompt tokens, and optionally live tokens, latency and parse failures, of the legacy and compact prompts
+
+Token counts are exact when tiktoken is installed and estimated otherwise; with structured output the compact
+count includes the serialized response_format JSON schema, which OpenAI bills as prompt tokens. With --live, plans are generated
+through the configured OpenAI endpoint (set OPENAI_BASE_URL to use scripts.llm_stub_server).
+
+Usage (from the repository root):
+    python -m scripts.bench_prompt_tokens [--users data/plan_requests.jsonl] [--live 20]
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Any, Dict, List
+from src.models.micro_coach import MicroCoach
+from src.utils.llm_gateway import count_tokens
+
+SAMPLE_REQUESTS = [
+    {"user_id": "bench-1", "goal": "reduce stress and improve sleep", "current_streak": 7,
+     "recent_activities": ["meditation", "breathing exercise"], "available_time_minutes": 20,
+     "preferred_time": "evening", "mood": "stressed"},
+    {"user_id": "bench-2", "goal": "build a running habit", "current_streak": 0,
+     "recent_activities": [], "available_time_minutes": 30, "preferred_time": "morning", "mood": None},
+    {"user_id": "bench-3", "goal": "eat healthier lunches", "current_streak": 21,
+     "recent_activities": ["meal prep", "journaling", "walk"], "available_time_minutes": 10,
+     "preferred_time": "afternoon", "mood": "motivated"},
+    {"user_id": "bench-4", "goal": "feel less anxious at work", "current_streak": 3,
+     "recent_activities": ["body scan"], "available_time_minutes": 5, "preferred_time": "morning", "mood": "anxious"}
+]
+
+def legacy_system_prompt() -> str:
+    """System prompt as sent before prompt compaction"""
+    return """You are a supportive wellness micro-coach. Your role is to create personalized, 
+        achievable daily wellness plans that help users build sustainable habits.
+
+        Guidelines:
+        - Keep plans simple with 1-2 activities maximum
+        - Focus on small wins and building momentum
+        - Be encouraging and supportive in tone
+        - Consider the user's available time and current streak
+        - Adapt recommendations based on recent activities
+        - Include specific, actionable items with time estimates
+        - Provide a motivational message
+
+        Respond ONLY with valid JSON in this exact format:
+        {
+            "motivational_message": "Brief, encouraging message",
+            "daily_items": [
+                {
+                    "activity": "Specific activity name",
+                    "duration_minutes": 10,
+                    "description": "Clear description of what to do",
+                    "category": "meditation|exercise|nutrition|sleep|mental_health"
+                }
+            ],
+            "follow_up_time": "evening"
+        }"""
+
+def legacy_user_prompt(user_data: Dict[str, Any]) -> str:
+    """User prompt as sent before prompt compaction"""
+    goal = user_data.get("goal", "improve overall wellness")
+    streak = user_data.get("current_streak", 0)
+    recent_activities = user_data.get("recent_activities", [])
+    available_time = user_data.get("available_time_minutes", 15)
+    preferred_time = user_data.get("preferred_time", "morning")
+    mood = user_data.get("mood")
+
+    prompt = f"""Create a personalized wellness plan for today.
+
+        User Context:
+        - Goal: {goal}
+        - Current streak: {streak} days
+        - Recent activities: {', '.join(recent_activities) if recent_activities else 'None'}
+        - Available time: {available_time} minutes
+        - Preferred time: {preferred_time}"""
+
+    if mood:
+        prompt += f"\n- Current mood: {mood}"
+
+    prompt += f"""
+        
+        Create a plan that:
+        - Fits within {available_time} minutes
+        - Builds on their {streak}-day streak
+        - Complements recent activities: {recent_activities}
+        - Aligns with their goal: {goal}
+        """
+
+    return prompt
+
+def _load_requests(path: str) -> List[Dict[str, Any]]:
+    with open(path) as f:
+        text = f.read().strip()
+    if text.startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+def _prompt_tokens(coach: MicroCoach, requests: List[Dict[str, Any]]) -> Dict[str, List[int]]:
+    legacy = []
+    compact = []
+    schema = []
+    for request in requests:
+        system_tokens, _ = count_tokens(legacy_system_prompt(), coach.model_name)
+        user_tokens, _ = count_tokens(legacy_user_prompt(request), coach.model_name)
+        legacy.append(system_tokens + user_tokens)
+        report = coach.prompt_token_report(request)
+        compact.append(report["prompt_tokens"])
+        schema.append(report["schema_tokens"])
+    return {"legacy": legacy, "compact": compact, "schema": schema}
+
+async def _live_run(coach: MicroCoach, requests: List[Dict[str, Any]], calls: int, compact: bool) -> Dict[str, Any]:
+    """Generate plans directly with the OpenAI client, bypassing the plan cache"""
+    latencies = []
+    prompt_tokens = []
+    completion_tokens = []
+    failures = 0
+    for i in range(calls):
+        request = requests[i % len(requests)]
+        if compact:
+            messages = coach._messages(coach._create_user_prompt(request))
+            options = coach._completion_options()
+        else:
+            messages = [
+                {"role": "system", "content": legacy_system_prompt()},
+                {"role": "user", "content": legacy_user_prompt(request)}
+            ]
+            options = {"model": coach.model_name, "temperature": 0.7, "max_tokens": coach.max_completion_tokens}
+
+        start = time.perf_counter()
+        response = await coach.openai_client.chat.completions.create(messages=messages, **options)
+        latencies.append((time.perf_counter() - start) * 1000.0)
+        if response.usage:
+            prompt_tokens.append(response.usage.prompt_tokens)
+            completion_tokens.append(response.usage.completion_tokens)
+        try:
+            json.loads(response.choices[0].message.content or "")
+        except json.JSONDecodeError:
+            failures += 1
+
+    return {
+        "latency_p50_ms": statistics.median(latencies),
+        "latency_mean_ms": statistics.mean(latencies),
+        "prompt_tokens": statistics.mean(prompt_tokens) if prompt_tokens else None,
+        "completion_tokens": statistics.mean(completion_tokens) if completion_tokens else None,
+        "parse_failures": failures
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", help="DailyPlanRequest objects (JSON array or JSON Lines); defaults to built-in samples")
+    parser.add_argument("--live", type=int, default=0, help="Plans to generate per variant against the OpenAI endpoint")
+    args = parser.parse_args()
+
+    requests = _load_requests(args.users) if args.users else SAMPLE_REQUESTS
+    coach = MicroCoach()
+    _, exact = count_tokens("", coach.model_name)
+
+    tokens = _prompt_tokens(coach, requests)
+    legacy = statistics.mean(tokens["legacy"])
+    compact = statistics.mean(tokens["compact"])
+    print(f"requests:             {len(requests)}")
+    print(f"token counts:         {'exact (tiktoken)' if exact else 'estimated (install tiktoken for exact counts)'}")
+    print(f"structured output:    {coach.structured_output}")
+    print(f"legacy prompt:        {legacy:.0f} tokens/plan")
+    print(f"compact prompt:       {compact:.0f} tokens/plan ({(1 - compact / legacy) * 100:.0f}% fewer), "
+          f"including {statistics.mean(tokens['schema']):.0f} response schema tokens")
+
+    if args.live:
+        async def live():
+            return [(name, await _live_run(coach, requests, args.live, use_compact))
+                    for name, use_compact in (("legacy", False), ("compact", True))]
+
+        for name, result in asyncio.run(live()):
+            print(f"{name + ' live:':<22}"
+                  f"p50 {result['latency_p50_ms']:.0f} ms, mean {result['latency_mean_ms']:.0f} ms, "
+                  f"prompt {result['prompt_tokens']} / completion {result['completion_tokens']} tokens, "
+                  f"{result['parse_failures']}/{args.live} parse failures")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Report per-worker unique memory (USS) of gunicorn workers with and without pre-fork model preloading
+
+Linux only (reads /proc/<pid>/smaps_rollup). Usage (from the repository root):
+    python -m scripts.bench_worker_memory [--workers 4] [--mode both|preload|no-preload]
+"""
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Dict, List
+
+def _smaps_rollup(pid: int) -> Dict[str, int]:
+    """Memory counters in kB for a process"""
+    counters = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                counters[parts[0].rstrip(":")] = int(parts[1])
+    return counters
+
+def _children(pid: int) -> List[int]:
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(child) for child in f.read().split()]
+
+def _wait_until_serving(port: int, master: subprocess.Popen, workers: int, timeout: float):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if master.poll() is not None:
+            raise SystemExit("gunicorn exited during startup")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1):
+                if len(_children(master.pid)) >= workers:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise SystemExit(f"gunicorn did not start within {timeout}s")
+
+def measure(preload: bool, workers: int, port: int, settle_seconds: float, timeout: float) -> Dict[str, float]:
+    """Start gunicorn, wait for all workers, and collect memory counters in MB"""
+    env = dict(os.environ, PRELOAD_MODELS_BEFORE_FORK=str(preload))
+    master = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "src.main:app", "-c", "gunicorn.conf.py",
+         "--workers", str(workers), "--bind", f"127.0.0.1:{port}"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        _wait_until_serving(port, master, workers, timeout)
+        time.sleep(settle_seconds)
+
+        worker_stats = [_smaps_rollup(pid) for pid in _children(master.pid)]
+        master_stats = _smaps_rollup(master.pid)
+    finally:
+        master.send_signal(signal.SIGTERM)
+        master.wait(timeout=30)
+
+    uss = [(s.get("Private_Clean", 0) + s.get("Private_Dirty", 0)) / 1024 for s in worker_stats]
+    return {
+        "master_rss_mb": master_stats.get("Rss", 0) / 1024,
+        "worker_rss_mb": sum(s.get("Rss", 0) for s in worker_stats) / 1024 / len(worker_stats),
+        "worker_uss_mb": sum(uss) / len(uss),
+        "total_pss_mb": (master_stats.get("Pss", 0) + sum(s.get("Pss", 0) for s in worker_stats)) / 1024
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--mode", choices=["both", "preload", "no-preload"], default="both")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--settle-seconds", type=float, default=5.0, help="Wait after startup before sampling")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    modes = {"both": [True, False], "preload": [True], "no-preload": [False]}[args.mode]
+    print(f"{'mode':<12}{'master RSS':>12}{'worker RSS':>12}{'worker USS':>12}{'total PSS':>12}  (MB, {args.workers} workers)")
+    for preload in modes:
+        result = measure(preload, args.workers, args.port, args.settle_seconds, args.timeout)
+        label = "preload" if preload else "no-preload"
+        print(f"{label:<12}{result['master_rss_mb']:>12.1f}{result['worker_rss_mb']:>12.1f}"
+              f"{result['worker_uss_mb']:>12.1f}{result['total_pss_mb']:>12.1f}")
+
+if __name__ == "__main__":
+    main()
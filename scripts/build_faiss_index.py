@@ -0,0 +1,20 @@
+"""
+Build the catalog embeddings and export a FAISS index snapshot for the current catalog version
+
+Usage (from the repository root):
+    python -m scripts.build_faiss_index
+"""
+
+import logging
+from src.models.content_matcher import ContentMatcher
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def main():
+    matcher = ContentMatcher()
+    index_path = matcher.export_faiss_index()
+    print(f"FAISS index for catalog version {matcher.catalog_version} written to {index_path}")
+
+if __name__ == "__main__":
+    main()
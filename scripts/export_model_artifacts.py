@@ -0,0 +1,26 @@
+"""
+Export the churn forest, KMeans centroids and their scalers as memory-mappable array artifacts
+
+Writes churn_model.welli and kmeans_model.welli next to the joblib files. Services load them
+instead of unpickling sklearn while the joblib files keep the size and modification time recorded here,
+so re-run this after every retrain.
+
+Usage (from the repository root):
+    python -m scripts.export_model_artifacts
+"""
+
+import logging
+from src.models.churn_model import ChurnPredictor
+from src.models.clustering import UserClusterer
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def main():
+    for name, model in (("churn", ChurnPredictor(use_artifact=False)), ("clustering", UserClusterer(use_artifact=False))):
+        if not model.export_artifact():
+            raise SystemExit(f"Exporting the {name} artifact failed")
+        print(f"Exported {name} artifact to {model.model_loader.base_path / model.ARTIFACT_NAME}")
+
+if __name__ == "__main__":
+    main()
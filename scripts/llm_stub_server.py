@@ -0,0 +1,159 @@
+"""
+Local stand-in for the OpenAI chat completions and embeddings endpoints, for exercising the LLM gateway
+
+Serves canned daily plans (optionally streamed) and deterministic embeddings with configurable latency,
+a requests-per-window limit (a minute by default) that answers 429 with Retry-After, and random 5xx failures. Point the app at it with:
+    OPENAI_BASE_URL=http://127.0.0.1:8001/v1 OPENAI_API_KEY=stub
+
+Usage (from the repository root):
+    python -m scripts.llm_stub_server [--port 8001] [--latency-ms 400] [--rpm 60] [--window-seconds 60] [--error-rate 0.05] [--token-ms 15]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+from collections import deque
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+STUB_PLAN = {
+    "motivational_message": "Small steps add up - you've got this!",
+    "daily_items": [
+        {
+            "activity": "Box breathing",
+            "duration_minutes": 5,
+            "description": "Breathe in for 4, hold for 4, out for 4, hold for 4, and repeat",
+            "category": "meditation"
+        },
+        {
+            "activity": "Short walk",
+            "duration_minutes": 10,
+            "description": "Take a brisk walk outside and notice five things around you",
+            "category": "exercise"
+        }
+    ],
+    "follow_up_time": "evening"
+}
+
+def create_app(latency_ms: float, rpm: int, error_rate: float, token_ms: float = 15, dimension: int = 1536,
+               window_seconds: float = 60) -> FastAPI:
+    app = FastAPI(title="OpenAI stub")
+    request_times = deque()
+    counters = {"requests": 0, "rate_limited": 0, "errors": 0}
+
+    def _error(status: int, message: str, error_type: str, headers=None) -> JSONResponse:
+        return JSONResponse(status_code=status, headers=headers,
+                            content={"error": {"message": message, "type": error_type, "code": None}})
+
+    async def _admit() -> JSONResponse:
+        """Apply the rate limit, failure rate and latency; returns an error response or None"""
+        counters["requests"] += 1
+        now = time.monotonic()
+        while request_times and now - request_times[0] > window_seconds:
+            request_times.popleft()
+        if rpm and len(request_times) >= rpm:
+            counters["rate_limited"] += 1
+            retry_after = window_seconds - (now - request_times[0])
+            return _error(429, "Rate limit reached for requests", "requests",
+                          headers={"retry-after": f"{retry_after:.3f}"})
+        request_times.append(now)
+
+        await asyncio.sleep(latency_ms / 1000.0 * random.uniform(0.5, 1.5))
+        if random.random() < error_rate:
+            counters["errors"] += 1
+            return _error(500, "The server had an error while processing your request", "server_error")
+        return None
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        error = await _admit()
+        if error is not None:
+            return error
+
+        content = json.dumps(STUB_PLAN)
+        prompt_tokens = sum(len(message.get("content") or "") for message in body.get("messages", [])) // 4
+        completion_tokens = len(content) // 4
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        if body.get("stream"):
+            include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+            return StreamingResponse(_stream_chunks(body.get("model", "stub"), content, usage if include_usage else None),
+                                     media_type="text/event-stream")
+        return {
+            "id": f"chatcmpl-stub-{counters['requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage
+        }
+
+    async def _stream_chunks(model: str, content: str, usage):
+        """chat.completion.chunk events of about four characters each, token_ms apart"""
+        chunk_id = f"chatcmpl-stub-{counters['requests']}"
+
+        def event(delta, finish_reason=None, chunk_usage=None, choices=True):
+            chunk = {"id": chunk_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if choices else []}
+            if chunk_usage is not None:
+                chunk["usage"] = chunk_usage
+            return f"data: {json.dumps(chunk)}\n\n"
+
+        yield event({"role": "assistant", "content": ""})
+        for start in range(0, len(content), 4):
+            await asyncio.sleep(token_ms / 1000.0)
+            yield event({"content": content[start:start + 4]})
+        yield event({}, finish_reason="stop")
+        if usage is not None:
+            yield event(None, chunk_usage=usage, choices=False)
+        yield "data: [DONE]\n\n"
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        error = await _admit()
+        if error is not None:
+            return error
+
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        data = []
+        for index, text in enumerate(texts):
+            seed = int(hashlib.sha1(text.encode("utf-8")).hexdigest()[:8], 16)
+            vector = np.random.default_rng(seed).standard_normal(dimension)
+            data.append({"object": "embedding", "index": index, "embedding": (vector / np.linalg.norm(vector)).tolist()})
+        prompt_tokens = sum(len(text) for text in texts) // 4
+        return {
+            "object": "list",
+            "data": data,
+            "model": body.get("model", "stub"),
+            "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens}
+        }
+
+    @app.get("/stats")
+    async def stats():
+        return counters
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=400, help="Mean response latency")
+    parser.add_argument("--rpm", type=int, default=0, help="Requests per window before answering 429 (0 = unlimited)")
+    parser.add_argument("--window-seconds", type=float, default=60, help="Rate limit window; shorten it for quick 429 tests")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with a 500")
+    parser.add_argument("--token-ms", type=float, default=15, help="Delay between streamed chunks of about one token")
+    args = parser.parse_args()
+
+    app = create_app(args.latency_ms, args.rpm, args.error_rate, args.token_ms, window_seconds=args.window_seconds)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Precompute daily plans for a list of users off-peak and store them for /daily-plan to serve
+
+Reads DailyPlanRequest objects from a JSON array or JSON Lines file, generates plans for the
+target date (tomorrow by default) with bounded concurrency, and writes them to the plan store
+keyed by (user_id, plan_date) together with the request context they were generated for. Users
+whose plans stay rate limited after the retries are skipped rather than stored as fallback
+template plans. Intended for a nightly cron job, e.g.:
+
+    0 2 * * * cd /app && python -m scripts.precompute_daily_plans --users data/plan_requests.jsonl
+
+Usage (from the repository root):
+    python -m scripts.precompute_daily_plans --users users.json [--date YYYY-MM-DD] [--concurrency 8] [--retries 3] [--overwrite]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from src.api.schemas import DailyPlanRequest, DailyPlanResponse
+from src.models.micro_coach import MicroCoach
+from src.utils.llm_gateway import PRIORITY_BATCH, LLMRateLimitError
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def _read_requests(path: str) -> List[DailyPlanRequest]:
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read().strip()
+    if text.startswith("["):
+        records = json.loads(text)
+    else:
+        records = [json.loads(line) for line in text.splitlines() if line.strip()]
+    return [DailyPlanRequest(**record) for record in records]
+
+async def _generate(coach: MicroCoach, request: DailyPlanRequest, plan_date: str,
+                    semaphore: asyncio.Semaphore, retries: int) -> Optional[Tuple[Dict[str, Any], str]]:
+    """Plan and context signature for a request, retrying while the LLM gateway is saturated"""
+    for attempt in range(retries + 1):
+        async with semaphore:
+            try:
+                plan = await coach.generate_daily_plan(request, plan_date=plan_date, priority=PRIORITY_BATCH, fallback=False)
+                return DailyPlanResponse(**plan).dict(), coach.plan_signature(request)
+            except LLMRateLimitError as e:
+                delay = e.retry_after
+            except Exception as e:
+                logger.error(f"Plan generation failed for user {request.user_id}: {str(e)}")
+                return None
+        # Back off outside the semaphore so other users keep their slots
+        if attempt < retries:
+            await asyncio.sleep(delay)
+    logger.error(f"Skipping user {request.user_id}: LLM capacity still exhausted after {retries} retries")
+    return None
+
+async def precompute(requests: List[DailyPlanRequest], plan_date: str, concurrency: int,
+                     overwrite: bool, keep_days: int, retries: int = 3, flush_every: int = 100) -> Dict[str, int]:
+    """Generate and store plans, flushing to the store as results complete, then purge old plans"""
+    coach = MicroCoach()
+    if not overwrite:
+        requests = [
+            request for request in requests
+            if not coach.plan_store.has(request.user_id, plan_date, coach.plan_signature(request))
+        ]
+
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = [asyncio.create_task(_generate(coach, request, plan_date, semaphore, retries)) for request in requests]
+
+    stored, failed, pending = 0, 0, []
+    for task in asyncio.as_completed(tasks):
+        plan = await task
+        if plan is None:
+            failed += 1
+            continue
+        pending.append(plan)
+        if len(pending) >= flush_every:
+            stored += coach.plan_store.put_many(pending)
+            pending = []
+            logger.info(f"Stored {stored}/{len(requests)} plans for {plan_date}")
+    stored += coach.plan_store.put_many(pending)
+
+    purged = coach.plan_store.purge_before((date.today() - timedelta(days=keep_days)).isoformat())
+    return {"requested": len(tasks), "stored": stored, "failed": failed, "purged": purged}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", required=True, help="JSON array or JSON Lines file of DailyPlanRequest objects")
+    parser.add_argument("--date", default=None, help="Plan date (YYYY-MM-DD), defaults to tomorrow")
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximum concurrent OpenAI requests")
+    parser.add_argument("--overwrite", action="store_true", help="Regenerate plans that are already stored")
+    parser.add_argument("--keep-days", type=int, default=7, help="Delete stored plans older than this many days")
+    parser.add_argument("--retries", type=int, default=3, help="Retries per user while OpenAI capacity is exhausted")
+    args = parser.parse_args()
+
+    plan_date = args.date or (date.today() + timedelta(days=1)).isoformat()
+    requests = _read_requests(args.users)
+
+    started = time.perf_counter()
+    result = asyncio.run(precompute(requests, plan_date, args.concurrency, args.overwrite, args.keep_days, args.retries))
+    elapsed = time.perf_counter() - started
+
+    print(f"Plans for {plan_date}: {result['stored']} stored, {result['failed']} failed, "
+          f"{len(requests) - result['requested']} already present ({elapsed:.1f}s)")
+    print(f"Purged {result['purged']} plans older than {args.keep_days} days")
+
+if __name__ == "__main__":
+    main()
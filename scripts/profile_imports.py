@@ -0,0 +1,89 @@
+"""
+Import-time profile of the API cold start, based on python -X importtime
+
+Imports the target module in fresh interpreters and reports total import time,
+the packages that account for it, and which heavy dependencies were pulled in.
+Use --budget-ms in CI to fail when cold-start imports regress.
+
+Usage (from the repository root):
+    python -m scripts.profile_imports [--module src.main] [--runs 5] [--top 15] [--budget-ms 500] [--json report.json]
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
+
+# Dependencies that should only be imported by the subsystems that use them
+HEAVY_DEPENDENCIES = ("numpy", "faiss", "openai", "sklearn", "scipy", "joblib", "redis", "uvicorn")
+
+def _import_entries(module: str) -> List[Tuple[str, int, int, int]]:
+    """(name, nesting level, self us, cumulative us) for every import made while importing module"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True
+    )
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        level = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        entries.append((name.strip(), level, int(self_us), int(cumulative_us)))
+
+    # Keep only the subtree of the target import, not interpreter start-up (site, encodings)
+    end = max(i for i, entry in enumerate(entries) if entry[0] == module and entry[1] == 0)
+    start = end
+    while start > 0 and entries[start - 1][1] > 0:
+        start -= 1
+    return entries[start:end + 1]
+
+def profile(module: str) -> Dict[str, Any]:
+    """Total import time and self time per top-level package, in milliseconds"""
+    entries = _import_entries(module)
+    packages = defaultdict(int)
+    for name, _, self_us, _ in entries:
+        packages[name.split(".")[0]] += self_us
+
+    imported = {name.split(".")[0] for name, *_ in entries}
+    return {
+        "total_ms": entries[-1][3] / 1000.0,
+        "modules": len(entries),
+        "packages_ms": {name: us / 1000.0 for name, us in sorted(packages.items(), key=lambda item: -item[1])},
+        "heavy_dependencies": [name for name in HEAVY_DEPENDENCIES if name in imported]
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="src.main", help="Module to import")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to profile; the median run is reported")
+    parser.add_argument("--top", type=int, default=15, help="Packages to list")
+    parser.add_argument("--budget-ms", type=float, default=None, help="Exit non-zero if total import time exceeds this")
+    parser.add_argument("--json", dest="json_path", default=None, help="Also write the report to this file")
+    args = parser.parse_args()
+
+    runs = sorted((profile(args.module) for _ in range(args.runs)), key=lambda run: run["total_ms"])
+    report = runs[len(runs) // 2]
+    report["module"] = args.module
+    report["runs_total_ms"] = [round(run["total_ms"], 1) for run in runs]
+
+    print(f"import {args.module}: {report['total_ms']:.1f} ms median over {args.runs} runs "
+          f"({report['modules']} modules, stdev {statistics.pstdev(report['runs_total_ms']):.1f} ms)")
+    print(f"heavy dependencies imported: {', '.join(report['heavy_dependencies']) or 'none'}")
+    print()
+    print(f"{'package':<32}{'self ms':>10}")
+    for name, ms in list(report["packages_ms"].items())[:args.top]:
+        print(f"{name:<32}{ms:>10.1f}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.budget_ms is not None and report["total_ms"] > args.budget_ms:
+        raise SystemExit(f"Import time {report['total_ms']:.1f} ms exceeds budget of {args.budget_ms:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -2,20 +2,36 @@
 FastAPI routes for the Welli retention engine
 """
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi.responses import JSONResponse, StreamingResponse
 from src.api.schemas import (
     GoalMatchRequest, GoalMatchResponse,
     UserBehaviorData, ClusterResponse,
+    ClusterBatchRequest, ClusterBatchResponse,
     ChurnPredictionRequest, ChurnPredictionResponse,
-    DailyPlanRequest, DailyPlanResponse,
+    ChurnBatchRequest, ChurnBatchResponse,
+    DailyPlanRequest, DailyPlanItem, DailyPlanResponse,
     ErrorResponse
 )
-from src.models.content_matcher import ContentMatcher
-from src.models.clustering import UserClusterer
-from src.models.churn_model import ChurnPredictor
-from src.models.micro_coach import MicroCoach
-from src.utils.model_loader import ModelLoader
+from src.utils.llm_gateway import LLMRateLimitError, get_llm_gateway
+from src.utils.model_registry import ModelRegistry
+from src.utils.openai_clients import get_openai_clients
+from src.utils.model_watcher import ModelDirectoryWatcher
+from typing import TYPE_CHECKING, Any
+import asyncio
+import gc
+import json
 import logging
+import math
+import os
+import secrets
+import time
+
+if TYPE_CHECKING:
+    from src.models.content_matcher import ContentMatcher
+    from src.models.clustering import UserClusterer
+    from src.models.churn_model import ChurnPredictor
+    from src.models.micro_coach import MicroCoach
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -24,55 +40,211 @@ logger = logging.getLogger(__name__)
 # Create router
 router = APIRouter()
 
-# Initialize models (these will be loaded lazily)
-content_matcher = None
-user_clusterer = None 
-churn_predictor = None
-micro_coach = None
+# Model modules (and numpy, faiss, openai behind them) are imported by these factories,
+# so importing the API does not pay for them before a model is actually loaded
+def _create_content_matcher():
+    from src.models.content_matcher import ContentMatcher
+    return ContentMatcher()
+
+def _create_user_clusterer():
+    from src.models.clustering import UserClusterer
+    return UserClusterer()
+
+def _create_churn_predictor():
+    from src.models.churn_model import ChurnPredictor
+    return ChurnPredictor()
+
+def _create_micro_coach():
+    from src.models.micro_coach import MicroCoach
+    return MicroCoach()
+
+# Models are constructed once, on first use or at startup warm-up
+model_registry = ModelRegistry()
+model_registry.register("content_matcher", _create_content_matcher)
+model_registry.register("user_clusterer", _create_user_clusterer)
+model_registry.register("churn_predictor", _create_churn_predictor)
+model_registry.register("micro_coach", _create_micro_coach)
 
 def get_content_matcher():
     """Lazy loading of content matcher"""
-    global content_matcher
-    if content_matcher is None:
-        content_matcher = ContentMatcher()
-    return content_matcher
+    return model_registry.get("content_matcher")
 
 def get_user_clusterer():
     """Lazy loading of user clusterer"""
-    global user_clusterer
-    if user_clusterer is None:
-        user_clusterer = UserClusterer()
-    return user_clusterer
+    return model_registry.get("user_clusterer")
 
 def get_churn_predictor():
     """Lazy loading of churn predictor"""
-    global churn_predictor
-    if churn_predictor is None:
-        churn_predictor = ChurnPredictor()
-    return churn_predictor
+    return model_registry.get("churn_predictor")
 
 def get_micro_coach():
     """Lazy loading of micro coach"""
-    global micro_coach
-    if micro_coach is None:
-        micro_coach = MicroCoach()
-    return micro_coach
+    return model_registry.get("micro_coach")
+
+def require_admin_token(x_admin_token: str = Header(None)):
+    """Admin endpoints need the ADMIN_API_TOKEN header value; they are disabled when it is unset"""
+    expected = os.getenv("ADMIN_API_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_API_TOKEN not set)")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, expected):
+        raise HTTPException(status_code=401, detail="Invalid or missing X-Admin-Token header")
+
+# Warm-up state reported by /models/health; "models" holds each model's latest warm-up outcome
+warmup_state = {
+    "enabled": False,
+    "completed": False,
+    "duration_seconds": None,
+    "errors": {},
+    "models": {}
+}
+
+# Loaded models whose warm-up failed are retried from health probes at most this often
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "30"))
+_warmup_retries = {}
+
+async def _warm_up_content_matcher(matcher: "ContentMatcher"):
+    # Fills the goal cache and opens the OpenAI connection for the most generic goal
+    await matcher.match_goal_to_content_async("improve overall wellness", limit=1)
+
+async def _warm_up_user_clusterer(clusterer: "UserClusterer"):
+    clusterer.cluster_user(UserBehaviorData(
+        user_id="warmup",
+        session_count=10,
+        avg_session_duration=10.0,
+        streak_length=3,
+        preferred_time_of_day="morning",
+        content_engagement_rate=0.5,
+        notification_response_rate=0.5
+    ))
+
+async def _warm_up_churn_predictor(predictor: "ChurnPredictor"):
+    predictor.predict_churn(ChurnPredictionRequest(
+        user_id="warmup",
+        days_since_signup=30,
+        total_sessions=10,
+        avg_session_duration=10.0,
+        streak_length=3,
+        last_login_days_ago=2,
+        content_completion_rate=0.5,
+        notification_response_rate=0.5,
+        goal_progress_percentage=50.0
+    ))
+
+async def _warm_up_micro_coach(coach: "MicroCoach"):
+    # Plans cost a paid completion, so the coach is only checked for readiness
+    if not coach.is_ready():
+        raise Exception("Micro coach not ready")
+
+MODEL_WARM_UPS = {
+    "content_matcher": _warm_up_content_matcher,
+    "user_clusterer": _warm_up_user_clusterer,
+    "churn_predictor": _warm_up_churn_predictor,
+    "micro_coach": _warm_up_micro_coach
+}
+
+async def warm_up_model(name: str, instance: Any = None):
+    """
+    Run a model's synthetic warm-up and record the outcome for /models/health
+    
+    Args:
+        name: Registered model name
+        instance: Instance to warm, e.g. one a reload just swapped in; loaded from the registry if omitted
+    """
+    warmup_state["models"][name] = {"warm": False, "error": None, "attempted_at": time.time()}
+    try:
+        model = instance if instance is not None else await model_registry.aget(name)
+        await MODEL_WARM_UPS[name](model)
+    except Exception as e:
+        logger.error(f"Warm-up failed for {name}: {str(e)}")
+        warmup_state["models"][name] = {"warm": False, "error": str(e), "attempted_at": time.time()}
+        warmup_state["errors"][name] = str(e)
+        raise
+    warmup_state["models"][name] = {"warm": True, "error": None, "attempted_at": time.time()}
+    warmup_state["errors"].pop(name, None)
+    logger.info(f"Model {name} loaded and warmed up")
+
+async def warm_up_models():
+    """
+    Load all models concurrently and run a synthetic inference on each.
+    
+    Failures are recorded per model instead of aborting startup, so the API
+    still serves the models that did load and /models/health reports the rest.
+    """
+    warmup_state["enabled"] = True
+    started = time.perf_counter()
+    
+    await asyncio.gather(*(warm_up_model(name) for name in MODEL_WARM_UPS), return_exceptions=True)
+    
+    warmup_state["duration_seconds"] = round(time.perf_counter() - started, 3)
+    warmup_state["completed"] = True
+    logger.info(f"Model warm-up finished in {warmup_state['duration_seconds']}s")
+
+def _is_warm(name: str, instance: Any) -> bool:
+    """
+    Whether a loaded model has passed its warm-up; without startup warm-up, loaded models count as warm
+    
+    A loaded model whose last warm-up failed is warmed again in the background, at most
+    every WARMUP_RETRY_SECONDS, so a dependency outage at startup does not keep it unready.
+    """
+    if not warmup_state["enabled"]:
+        return True
+    state = warmup_state["models"].get(name)
+    if state is not None and state["warm"]:
+        return True
+    
+    retry = _warmup_retries.get(name)
+    attempted_at = state["attempted_at"] if state is not None else 0.0
+    if (retry is None or retry.done()) and time.time() - attempted_at >= WARMUP_RETRY_SECONDS:
+        task = asyncio.get_running_loop().create_task(warm_up_model(name, instance))
+        # Failures are already logged and recorded by warm_up_model
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        _warmup_retries[name] = task
+    return False
+
+async def _warm_up_reloaded(name: str, instance: Any):
+    """Warm a hot-reloaded instance so /models/health reflects it"""
+    try:
+        await warm_up_model(name, instance)
+    except Exception:
+        pass
+
+# Retrained artifacts in these directories are hot-reloaded without a restart
+model_watcher = ModelDirectoryWatcher(
+    model_registry,
+    {
+        "churn_predictor": "ml_models/churn_classification",
+        "user_clusterer": "ml_models/clustering"
+    },
+    interval_seconds=float(os.getenv("MODEL_WATCH_INTERVAL_SECONDS", "30")),
+    on_reload=_warm_up_reloaded
+)
+
+def _rate_limited(error: LLMRateLimitError) -> HTTPException:
+    """503 telling clients when to retry, instead of a 500, when OpenAI capacity is exhausted"""
+    logger.warning(f"LLM capacity exhausted: {str(error)}")
+    return HTTPException(
+        status_code=503,
+        detail=f"Service busy, please retry: {str(error)}",
+        headers={"Retry-After": str(math.ceil(error.retry_after))}
+    )
 
 @router.post("/match-goal", response_model=GoalMatchResponse)
 async def match_goal(
     request: GoalMatchRequest,
-    matcher: ContentMatcher = Depends(get_content_matcher)
+    matcher: "ContentMatcher" = Depends(get_content_matcher)
 ):
     """
     Match user's goal to semantically similar content using sentence embeddings
     """
     try:
         logger.info(f"Matching goal: {request.goal}")
-        result = matcher.match_goal_to_content(
+        result = await matcher.match_goal_to_content_async(
             goal=request.goal,
             limit=request.limit
         )
         return result
+    except LLMRateLimitError as e:
+        raise _rate_limited(e)
     except Exception as e:
         logger.error(f"Error in goal matching: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Goal matching failed: {str(e)}")
@@ -80,7 +252,7 @@ async def match_goal(
 @router.post("/cluster-user", response_model=ClusterResponse)
 async def cluster_user(
     user_data: UserBehaviorData,
-    clusterer: UserClusterer = Depends(get_user_clusterer)
+    clusterer: "UserClusterer" = Depends(get_user_clusterer)
 ):
     """
     Cluster user into behavioral segment using early activity data
@@ -93,10 +265,26 @@ async def cluster_user(
         logger.error(f"Error in user clustering: {str(e)}")
         raise HTTPException(status_code=500, detail=f"User clustering failed: {str(e)}")
 
+@router.post("/cluster-user/batch", response_model=ClusterBatchResponse)
+def cluster_users_batch(
+    request: ClusterBatchRequest,
+    clusterer: "UserClusterer" = Depends(get_user_clusterer)
+):
+    """
+    Cluster many users into behavioral segments in one call, in the threadpool so the event loop stays free
+    """
+    try:
+        logger.info(f"Clustering {len(request.users)} users")
+        result = clusterer.cluster_users_batch(request.users)
+        return result
+    except Exception as e:
+        logger.error(f"Error in batch user clustering: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Batch user clustering failed: {str(e)}")
+
 @router.post("/predict-churn", response_model=ChurnPredictionResponse)
 async def predict_churn(
     request: ChurnPredictionRequest,
-    predictor: ChurnPredictor = Depends(get_churn_predictor)
+    predictor: "ChurnPredictor" = Depends(get_churn_predictor)
 ):
     """
     Predict churn risk using behavioral classifier
@@ -109,52 +297,205 @@ async def predict_churn(
         logger.error(f"Error in churn prediction: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Churn prediction failed: {str(e)}")
 
+@router.post("/predict-churn/batch", response_model=ChurnBatchResponse)
+def predict_churn_batch(
+    request: ChurnBatchRequest,
+    predictor: "ChurnPredictor" = Depends(get_churn_predictor)
+):
+    """
+    Predict churn risk for many users with a single model call, in the threadpool so the event loop stays free
+    """
+    try:
+        logger.info(f"Predicting churn for {len(request.users)} users")
+        result = predictor.predict_churn_batch(request.users)
+        return result
+    except Exception as e:
+        logger.error(f"Error in batch churn prediction: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Batch churn prediction failed: {str(e)}")
+
 @router.post("/daily-plan", response_model=DailyPlanResponse)
 async def generate_daily_plan(
     request: DailyPlanRequest,
-    coach: MicroCoach = Depends(get_micro_coach)
+    coach: "MicroCoach" = Depends(get_micro_coach)
 ):
     """
-    Generate personalized daily wellness plan using OpenAI
+    Generate personalized daily wellness plan using OpenAI, serving a precomputed plan when one exists
     """
     try:
+        precomputed = await coach.get_precomputed_plan(request)
+        if precomputed is not None:
+            return precomputed
+        
         logger.info(f"Generating daily plan for user: {request.user_id}")
         result = await coach.generate_daily_plan(request)
         return result
+    except LLMRateLimitError as e:
+        raise _rate_limited(e)
     except Exception as e:
         logger.error(f"Error in daily plan generation: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Daily plan generation failed: {str(e)}")
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _replay(events):
+    for event in events:
+        yield event
+
+async def _plan_event_stream(first, events):
+    """Format stream_daily_plan events as server-sent events, validating items and the final plan"""
+    try:
+        name, data = first
+        while True:
+            if name == "item":
+                data = DailyPlanItem(**data).dict()
+            elif name == "plan":
+                data = DailyPlanResponse(**data).dict()
+            yield _sse(name, data)
+            name, data = await events.__anext__()
+    except StopAsyncIteration:
+        pass
+    except Exception as e:
+        # Headers are already sent, so failures after the first event are reported in-band
+        logger.error(f"Error in streamed daily plan generation: {str(e)}")
+        yield _sse("error", {"detail": f"Daily plan generation failed: {str(e)}"})
+    finally:
+        # Close the generation (and its OpenAI stream) when the client disconnects
+        await events.aclose()
+
+@router.post("/daily-plan/stream")
+async def stream_daily_plan(
+    request: DailyPlanRequest,
+    coach: "MicroCoach" = Depends(get_micro_coach)
+):
+    """
+    Generate a daily plan as server-sent events: "message" with the motivational message,
+    "item" for each DailyPlanItem as soon as it is complete, then "plan" with the full DailyPlanResponse
+    """
+    try:
+        precomputed = await coach.get_precomputed_plan(request)
+        if precomputed is not None:
+            stream = _replay(coach.plan_events(precomputed))
+        else:
+            logger.info(f"Streaming daily plan for user: {request.user_id}")
+            stream = coach.stream_daily_plan(request)
+        # Wait for the first event so rate limits and early failures still get a proper status code
+        first = await stream.__anext__()
+    except LLMRateLimitError as e:
+        raise _rate_limited(e)
+    except Exception as e:
+        logger.error(f"Error in daily plan generation: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Daily plan generation failed: {str(e)}")
+    
+    return StreamingResponse(
+        _plan_event_stream(first, stream),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/models/content-matcher/status")
+async def content_matcher_status(
+    matcher: "ContentMatcher" = Depends(get_content_matcher)
+):
+    """FAISS index status and goal-embedding cache hit/miss counters"""
+    return matcher.get_index_status()
+
+@router.get("/models/micro-coach/status")
+async def micro_coach_status(
+    coach: "MicroCoach" = Depends(get_micro_coach)
+):
+    """OpenAI client readiness, daily plan cache hit rate and saved tokens, and precomputed plans"""
+    return coach.get_status()
+
+@router.get("/models/llm-gateway/status")
+async def llm_gateway_status():
+    """OpenAI rate limits, queue depth, per-operation latency, retry and token metrics, and HTTP connection reuse"""
+    return {**get_llm_gateway().stats(), "http": get_openai_clients().stats()}
+
+@router.get("/models/registry")
+async def models_registry_status():
+    """Load status, load time and approximate memory footprint per model"""
+    return model_registry.stats()
+
+@router.get("/admin/models/versions", dependencies=[Depends(require_admin_token)])
+async def model_versions():
+    """Loaded and on-disk artifact versions of hot-reloadable models"""
+    return model_watcher.versions()
+
+@router.post("/admin/models/{model_name}/reload", dependencies=[Depends(require_admin_token)])
+async def reload_model(model_name: str):
+    """
+    Load a model's current artifacts in the background and swap them in atomically.
+    
+    Only models with watched artifact directories can be reloaded; the others
+    (e.g. micro_coach) have no artifacts to pick up.
+    """
+    if model_name not in model_watcher.loaders:
+        raise HTTPException(status_code=404, detail=f"Unknown or non-reloadable model: {model_name}")
+    
+    try:
+        logger.info(f"Reloading model: {model_name}")
+        instance = await model_registry.areload(model_name)
+        await _warm_up_reloaded(model_name, instance)
+        return {
+            "model": model_name,
+            "model_version": getattr(instance, "model_version", None),
+            "stats": model_registry.stats()[model_name],
+            "warmup": warmup_state["models"].get(model_name)
+        }
+    except Exception as e:
+        logger.error(f"Error reloading model {model_name}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Model reload failed: {str(e)}")
+
+def preload_models_before_fork():
+    """
+    Load every model in the server master process ahead of forking workers.
+    
+    Workers then share the model memory copy-on-write. Only CPU-side loading
+    happens here; network warm-up (OpenAI connections) is left to each worker's
+    startup so no sockets are shared across processes. gc.freeze() moves the
+    loaded objects out of the collector's generations, so worker GC passes
+    don't write to (and un-share) their pages.
+    """
+    for name in ("content_matcher", "user_clusterer", "churn_predictor", "micro_coach"):
+        try:
+            model_registry.get(name)
+        except Exception as e:
+            logger.error(f"Preloading {name} before fork failed: {str(e)}")
+    
+    gc.collect()
+    gc.freeze()
+    logger.info(f"Preloaded models before fork, {gc.get_freeze_count()} objects frozen")
+
 # Health check for models
 @router.get("/models/health")
 async def models_health_check():
-    """Check if all models are loaded and functioning"""
-    health_status = {
-        "content_matcher": False,
-        "user_clusterer": False,
-        "churn_predictor": False,
-        "micro_coach": False
-    }
+    """
+    Check which models are loaded, warmed up and functioning.
     
-    try:
-        # Test each model
-        matcher = get_content_matcher()
-        health_status["content_matcher"] = matcher.is_ready()
-        
-        clusterer = get_user_clusterer()
-        health_status["user_clusterer"] = clusterer.is_ready()
-        
-        predictor = get_churn_predictor()
-        health_status["churn_predictor"] = predictor.is_ready()
-        
-        coach = get_micro_coach()
-        health_status["micro_coach"] = coach.is_ready()
-        
-    except Exception as e:
-        logger.error(f"Error in model health check: {str(e)}")
+    Reads the registry's current instances without triggering loads, so a probe
+    never re-runs a failed model load. With startup warm-up enabled, a model is
+    only ready once its warm-up (at startup, after a reload or a background retry)
+    has succeeded; until every model is ready the probe answers 503.
+    """
+    health_status = {}
+    registry_stats = model_registry.stats()
+    
+    for name in MODEL_WARM_UPS:
+        try:
+            instance = model_registry.peek(name)
+            health_status[name] = instance is not None and bool(instance.is_ready()) and _is_warm(name, instance)
+        except Exception as e:
+            logger.error(f"Error in model health check for {name}: {str(e)}")
+            health_status[name] = False
     
     all_healthy = all(health_status.values())
-    return {
-        "status": "healthy" if all_healthy else "degraded",
-        "models": health_status
-    }
+    return JSONResponse(
+        status_code=200 if all_healthy else 503,
+        content={
+            "status": "healthy" if all_healthy else "degraded",
+            "models": health_status,
+            "registry": {name: registry_stats.get(name, {}).get("status") for name in health_status},
+            "warmup": warmup_state
+        }
+    )
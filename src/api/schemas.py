@@ -6,6 +6,9 @@ from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
+# Upper bound on users per batch request; larger jobs should be split client-side
+MAX_BATCH_USERS = 10000
+
 # Goal Matching Schemas
 class GoalMatchRequest(BaseModel):
     goal: str = Field(..., description="User's wellness goal in natural language")
@@ -40,6 +43,13 @@ class ClusterResponse(BaseModel):
     cluster_description: str
     confidence_score: float
 
+class ClusterBatchRequest(BaseModel):
+    users: List[UserBehaviorData] = Field(..., max_length=MAX_BATCH_USERS, description="Users to cluster in a single call")
+
+class ClusterBatchResponse(BaseModel):
+    clusters: List[ClusterResponse]
+    total_users: int
+
 # Churn Prediction Schemas
 class ChurnPredictionRequest(BaseModel):
     user_id: str
@@ -59,6 +69,13 @@ class ChurnPredictionResponse(BaseModel):
     recommended_intervention: str
     factors_contributing_to_risk: List[str]
 
+class ChurnBatchRequest(BaseModel):
+    users: List[ChurnPredictionRequest] = Field(..., max_length=MAX_BATCH_USERS, description="Users to score in a single call")
+
+class ChurnBatchResponse(BaseModel):
+    predictions: List[ChurnPredictionResponse]
+    total_users: int
+
 # Daily Plan Schemas
 class DailyPlanRequest(BaseModel):
     user_id: str
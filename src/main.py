@@ -3,21 +3,35 @@ FastAPI application for Welli - Digital Wellness Assistant
 Modular retention engine with ML-powered personalization
 """
 
+from src.utils.env import load_environment
+
+# Load environment variables from .env file before any module reads its configuration
+load_environment()
+
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from dotenv import load_dotenv
-from src.api.routes import router
-import uvicorn
+from src.api.routes import router, warm_up_models, model_watcher
+from src.utils.openai_clients import get_openai_clients
 import os
 
-# Load environment variables from .env file
-load_dotenv()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load and warm up all models before the server accepts traffic, watch for retrained artifacts, and close OpenAI connections on shutdown"""
+    if os.getenv("PRELOAD_MODELS", "True").lower() == "true":
+        await warm_up_models()
+    if model_watcher.interval_seconds > 0:
+        model_watcher.start()
+    yield
+    await model_watcher.stop()
+    await get_openai_clients().aclose()
 
 # Create FastAPI app
 app = FastAPI(
     title="Welli - Digital Wellness Assistant",
     description="AI-powered wellness retention engine with goal matching, behavioral clustering, churn prediction, and micro-coaching",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -52,6 +66,8 @@ async def health_check():
     return {"status": "healthy", "service": "welli-api"}
 
 if __name__ == "__main__":
+    import uvicorn
+    
     # Get configuration from environment variables
     host = os.getenv("API_HOST", "0.0.0.0")
     port = int(os.getenv("API_PORT", "8000"))
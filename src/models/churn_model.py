@@ -5,12 +5,16 @@ Churn prediction using behavioral classifier - requires trained model
 import numpy as np
 from typing import Dict, Any, List
 import logging
-from dotenv import load_dotenv
+import os
 from src.utils.model_loader import ModelLoader
-from src.utils.feature_prep import FeaturePreparator
-
-# Load environment variables
-load_dotenv()
+from src.utils.feature_prep import FeaturePreparator, scale_features
+from src.utils.forest_compiler import CompiledForest
+from src.models.churn_rules import (
+    CHURN_FEATURES, RISK_LEVELS,
+    bucket_risk_levels, evaluate_risk_factors, select_interventions,
+    decode_factor_list, decode_intervention
+)
+from src.utils.env import load_environment
 
 logger = logging.getLogger(__name__)
 
@@ -19,27 +23,36 @@ class ChurnPredictor:
     Predicts user churn risk using behavioral features - requires trained model
     """
     
-    def __init__(self):
+    ARTIFACT_NAME = "churn_model.welli"
+    SOURCE_FILES = ("churn_model.joblib", "churn_scaler.joblib")
+    
+    def __init__(self, use_artifact: bool = True):
+        load_environment()
         self.model_loader = ModelLoader(base_path="ml_models/churn_classification")
         self.feature_prep = FeaturePreparator()
         self.churn_model = None
         self.churn_scaler = None
-        self.feature_names = [
-            "days_since_signup",
-            "total_sessions", 
-            "avg_session_duration",
-            "streak_length",
-            "last_login_days_ago",
-            "content_completion_rate",
-            "notification_response_rate",
-            "goal_progress_percentage"
-        ]
+        self.compiled_model = None
+        # "compiled" runs the flattened forest, "sklearn" calls the estimator directly
+        self.inference_backend = os.getenv("CHURN_MODEL_BACKEND", "compiled").lower()
+        self.feature_names = list(CHURN_FEATURES)
+        # Larger batches go to sklearn when it is loaded: its per-tree C traversal wins at high row counts
+        self.compiled_max_rows = int(os.getenv("CHURN_COMPILED_MAX_ROWS", "5000"))
+        # Memory-map the exported forest instead of unpickling sklearn when it is up to date
+        self.use_artifact = use_artifact
+        self.loaded_from_artifact = False
         
         # Load and validate churn model
         self._load_model()
     
     def _load_model(self):
         """Load trained churn prediction model and scaler - required, no fallback"""
+        # Fingerprint the artifacts first so a retrain during loading is picked up by the next reload
+        self.model_version = self.model_loader.directory_version()
+        
+        if self.use_artifact and self.inference_backend == "compiled" and self._load_artifact():
+            return
+        
         # Load trained churn model - required
         self.churn_model = self.model_loader.load_joblib_model("churn_model.joblib")
         
@@ -53,58 +66,125 @@ class ChurnPredictor:
             raise Exception("Churn scaler not found. Please ensure churn_scaler.joblib exists in ml_models/churn_classification/ directory")
         
         logger.info("Successfully loaded churn prediction model and scaler")
-    
-    def _get_risk_factors(self, features: np.ndarray, churn_prob: float) -> List[str]:
-        """Identify key risk factors contributing to churn probability"""
-        factors = []
-        
-        days_since_signup = features[0, 0]
-        total_sessions = features[0, 1]
-        last_login_days_ago = features[0, 4]
-        completion_rate = features[0, 5]
-        notification_response = features[0, 6]
-        goal_progress = features[0, 7]
-        
-        if last_login_days_ago > 7:
-            factors.append("Extended period without app usage")
-        elif last_login_days_ago > 3:
-            factors.append("Several days since last login")
-        
-        if total_sessions < 3 and days_since_signup > 7:
-            factors.append("Low session count relative to signup time")
         
-        if completion_rate < 0.3:
-            factors.append("Low content completion rate")
-        
-        if notification_response < 0.2:
-            factors.append("Poor notification engagement")
+        if self.inference_backend == "compiled":
+            self._compile_model()
+    
+    def _load_artifact(self) -> bool:
+        """
+        Use the fused forest from churn_model.welli if it was exported from the current
+        joblib files. Returns False (so joblib is loaded instead) if it is missing or stale.
+        """
+        loaded = self.model_loader.load_array_artifact(self.ARTIFACT_NAME)
+        if loaded is None:
+            return False
+        arrays, metadata = loaded
+        
+        # Size and mtime only: hashing the joblib files would cost as much as unpickling them
+        source_stamp = self.model_loader.file_stamp(*self.SOURCE_FILES)
+        if source_stamp is not None and source_stamp != metadata.get("source_stamp"):
+            logger.warning(f"{self.ARTIFACT_NAME} is older than the joblib models, ignoring it. Re-run scripts.export_model_artifacts")
+            return False
+        
+        if metadata.get("features") != self.feature_names:
+            logger.warning(f"{self.ARTIFACT_NAME} was exported for different features, ignoring it")
+            return False
+        
+        self.compiled_model = CompiledForest.from_arrays(arrays, metadata["forest"])
+        self.loaded_from_artifact = True
+        logger.info(f"Loaded compiled churn forest from {self.ARTIFACT_NAME}")
+        return True
+    
+    def export_artifact(self) -> bool:
+        """
+        Write the fused forest and scaler arrays to churn_model.welli
         
-        if goal_progress < 0.2:
-            factors.append("Limited progress toward wellness goals")
+        Returns:
+            True if the artifact was written
+        """
+        if self.compiled_model is None or self.loaded_from_artifact:
+            raise Exception("Export requires a forest compiled from the joblib models")
+        
+        arrays, forest_metadata = self.compiled_model.to_arrays()
+        arrays["scaler_mean"] = np.asarray(self.churn_scaler.mean_, dtype=np.float64)
+        arrays["scaler_scale"] = np.asarray(self.churn_scaler.scale_, dtype=np.float64)
+        metadata = {
+            "model": "churn_forest",
+            "features": self.feature_names,
+            "forest": forest_metadata,
+            "scaler_fused": True,
+            "source_stamp": self.model_loader.file_stamp(*self.SOURCE_FILES)
+        }
+        return self.model_loader.save_array_artifact(arrays, metadata, self.ARTIFACT_NAME)
+    
+    def _compile_model(self):
+        """
+        Compile the forest with the scaler folded into its thresholds, so raw features
+        need no transform per request. Keeps the explicit scaler -> sklearn pipeline
+        if the fused forest is not bit-identical to it.
+        """
+        try:
+            compiled = CompiledForest.from_sklearn(self.churn_model).fuse_scaler(
+                self.churn_scaler.mean_, self.churn_scaler.scale_
+            )
+            
+            # Probe around the training distribution plus exact fused split thresholds
+            rng = np.random.default_rng(0)
+            probe = self.churn_scaler.mean_ + rng.standard_normal((256, len(self.feature_names))) * self.churn_scaler.scale_ * 2.0
+            n_probe_nodes = min(len(probe), len(compiled.feature))
+            probe[np.arange(n_probe_nodes), compiled.feature[:n_probe_nodes]] = compiled.threshold[:n_probe_nodes]
+            
+            expected = self.churn_model.predict_proba(scale_features(self.churn_scaler, probe, self.feature_names))
+            if not np.array_equal(compiled.predict_proba(probe), expected):
+                raise ValueError("fused probabilities differ from scaler -> sklearn pipeline")
+            
+            self.compiled_model = compiled
+            logger.info("Using compiled forest backend with fused scaler for churn prediction")
+        except Exception as e:
+            logger.warning(f"Could not compile churn model, using sklearn backend: {str(e)}")
+            self.inference_backend = "sklearn"
+    
+    def _check_loaded(self):
+        """Raise if neither the compiled forest nor the sklearn model and scaler are available"""
+        if self.compiled_model is not None:
+            return
         
-        if not factors and churn_prob > 0.5:
-            factors.append("General engagement decline patterns")
+        if not self.churn_model:
+            raise Exception("Churn model not loaded")
         
-        return factors
+        if not self.churn_scaler:
+            raise Exception("Churn scaler not loaded")
     
-    def _get_intervention_recommendation(self, risk_level: str, factors: List[str]) -> str:
-        """Get intervention recommendation based on risk level and factors"""
-        if risk_level == "high":
-            if "Extended period without app usage" in factors:
-                return "Send personalized re-engagement campaign with wellness goal reminder"
-            elif "Low content completion rate" in factors:
-                return "Offer shorter, easier content options with immediate rewards"
-            else:
-                return "Provide one-on-one check-in with personalized motivation"
-        
-        elif risk_level == "medium":
-            if "notification engagement" in " ".join(factors).lower():
-                return "Optimize notification timing and personalize message content"
-            else:
-                return "Introduce streak-building challenges with social elements"
+    def _predict_proba(self, features: np.ndarray) -> np.ndarray:
+        """Churn class probabilities for raw (unscaled) features from the configured backend"""
+        if self.compiled_model is not None and (len(features) <= self.compiled_max_rows or self.churn_model is None):
+            return self.compiled_model.predict_proba(features)
+        return self.churn_model.predict_proba(scale_features(self.churn_scaler, features, self.feature_names))
+    
+    def _score(self, features: np.ndarray):
+        """
+        Score an (N, 8) feature matrix with one model call and the vectorized rule table
         
-        else:  # low risk
-            return "Continue current engagement patterns with occasional check-ins"
+        Returns:
+            Tuple of (churn probabilities, risk level indices, risk factor bitmasks, intervention indices)
+        """
+        churn_probs = self._predict_proba(features)[:, 1]
+        risk_levels = bucket_risk_levels(churn_probs)
+        factor_bits = evaluate_risk_factors(features, churn_probs)
+        interventions = select_interventions(risk_levels, factor_bits)
+        return churn_probs, risk_levels, factor_bits, interventions
+    
+    @staticmethod
+    def _serialize_prediction(user_id: str, churn_prob: float, risk_level: int,
+                              factor_bits: int, intervention: int) -> Dict[str, Any]:
+        """Decode rule table indices and bitmasks into the response payload"""
+        return {
+            "user_id": user_id,
+            "churn_probability": round(float(churn_prob), 3),
+            "risk_level": RISK_LEVELS[risk_level],
+            "recommended_intervention": decode_intervention(intervention),
+            "factors_contributing_to_risk": decode_factor_list(factor_bits)
+        }
     
     def predict_churn(self, user_data: Any) -> Dict[str, Any]:
         """
@@ -116,11 +196,7 @@ class ChurnPredictor:
         Returns:
             Dictionary with churn prediction and recommendations
         """
-        if not self.churn_model:
-            raise Exception("Churn model not loaded")
-        
-        if not self.churn_scaler:
-            raise Exception("Churn scaler not loaded")
+        self._check_loaded()
         
         try:
             # Convert Pydantic model to dict
@@ -132,33 +208,48 @@ class ChurnPredictor:
             # Prepare features
             features = self.feature_prep.prepare_churn_features(user_dict)
             
-            # Get churn probability using trained model
-            churn_prob = float(self.churn_model.predict_proba(features)[0][1])
-            
-            # Determine risk level
-            if churn_prob >= 0.7:
-                risk_level = "high"
-            elif churn_prob >= 0.4:
-                risk_level = "medium"
-            else:
-                risk_level = "low"
-            
-            # Get risk factors and intervention
-            risk_factors = self._get_risk_factors(features, churn_prob)
-            intervention = self._get_intervention_recommendation(risk_level, risk_factors)
+            # Get churn probability, risk level, factors and intervention
+            churn_probs, risk_levels, factor_bits, interventions = self._score(features)
             
-            return {
-                "user_id": user_dict["user_id"],
-                "churn_probability": round(churn_prob, 3),
-                "risk_level": risk_level,
-                "recommended_intervention": intervention,
-                "factors_contributing_to_risk": risk_factors
-            }
+            return self._serialize_prediction(
+                user_dict["user_id"], churn_probs[0], risk_levels[0], factor_bits[0], interventions[0]
+            )
             
         except Exception as e:
             logger.error(f"Error in churn prediction: {str(e)}")
             raise Exception(f"Churn prediction failed: {str(e)}")
     
+    def predict_churn_batch(self, users: List[Any]) -> Dict[str, Any]:
+        """
+        Predict churn probability for many users with a single model call
+        
+        Args:
+            users: List of ChurnPredictionRequest objects (or dicts) with user metrics
+            
+        Returns:
+            Dictionary with one prediction per user, in input order
+        """
+        self._check_loaded()
+        
+        try:
+            user_dicts = [user.dict() if hasattr(user, 'dict') else user for user in users]
+            if not user_dicts:
+                return {"predictions": [], "total_users": 0}
+            
+            features = self.feature_prep.prepare_churn_features_batch(user_dicts)
+            churn_probs, risk_levels, factor_bits, interventions = self._score(features)
+            
+            predictions = [
+                self._serialize_prediction(user_dict["user_id"], *row)
+                for user_dict, *row in zip(user_dicts, churn_probs, risk_levels, factor_bits, interventions)
+            ]
+            
+            return {"predictions": predictions, "total_users": len(predictions)}
+            
+        except Exception as e:
+            logger.error(f"Error in batch churn prediction: {str(e)}")
+            raise Exception(f"Batch churn prediction failed: {str(e)}")
+    
     def is_ready(self) -> bool:
         """Check if the churn predictor is ready to use"""
-        return self.churn_model is not None and self.churn_scaler is not None
+        return self.compiled_model is not None or (self.churn_model is not None and self.churn_scaler is not None)
@@ -0,0 +1,134 @@
+"""
+Declarative churn risk-factor and intervention rules, evaluated with NumPy masks over feature matrices
+"""
+
+import numpy as np
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Tuple
+
+# Column order of the churn feature matrix (see FeaturePreparator.prepare_churn_features)
+CHURN_FEATURES = (
+    "days_since_signup",
+    "total_sessions",
+    "avg_session_duration",
+    "streak_length",
+    "last_login_days_ago",
+    "content_completion_rate",
+    "notification_response_rate",
+    "goal_progress_percentage"
+)
+FEATURE_INDEX = {name: i for i, name in enumerate(CHURN_FEATURES)}
+
+RISK_LEVELS = ("low", "medium", "high")
+RISK_LEVEL_THRESHOLDS = (0.4, 0.7)
+
+_OPERATORS = {
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "<": np.less,
+    "<=": np.less_equal
+}
+
+class RiskFactorRule(NamedTuple):
+    """A risk factor that applies when all conditions hold and none of the excluded factors did"""
+    message: str
+    conditions: Tuple[Tuple[str, str, float], ...]
+    excludes: Tuple[str, ...] = ()
+
+class InterventionRule(NamedTuple):
+    """First matching rule for a risk level wins; requires_any=None matches unconditionally"""
+    risk_level: str
+    requires_any: Optional[Tuple[str, ...]]
+    message: str
+
+# "churn_probability" is available to conditions alongside the feature columns.
+# A factor's bit is its position in this table; rules may only exclude earlier factors.
+RISK_FACTOR_RULES = (
+    RiskFactorRule("Extended period without app usage", (("last_login_days_ago", ">", 7),)),
+    RiskFactorRule("Several days since last login", (("last_login_days_ago", ">", 3),),
+                   excludes=("Extended period without app usage",)),
+    RiskFactorRule("Low session count relative to signup time", (("total_sessions", "<", 3), ("days_since_signup", ">", 7))),
+    RiskFactorRule("Low content completion rate", (("content_completion_rate", "<", 0.3),)),
+    RiskFactorRule("Poor notification engagement", (("notification_response_rate", "<", 0.2),)),
+    RiskFactorRule("Limited progress toward wellness goals", (("goal_progress_percentage", "<", 0.2),)),
+    RiskFactorRule("General engagement decline patterns", (("churn_probability", ">", 0.5),),
+                   excludes=(
+                       "Extended period without app usage",
+                       "Several days since last login",
+                       "Low session count relative to signup time",
+                       "Low content completion rate",
+                       "Poor notification engagement",
+                       "Limited progress toward wellness goals"
+                   )),
+)
+
+INTERVENTION_RULES = (
+    InterventionRule("high", ("Extended period without app usage",),
+                     "Send personalized re-engagement campaign with wellness goal reminder"),
+    InterventionRule("high", ("Low content completion rate",),
+                     "Offer shorter, easier content options with immediate rewards"),
+    InterventionRule("high", None, "Provide one-on-one check-in with personalized motivation"),
+    InterventionRule("medium", ("Poor notification engagement",),
+                     "Optimize notification timing and personalize message content"),
+    InterventionRule("medium", None, "Introduce streak-building challenges with social elements"),
+    InterventionRule("low", None, "Continue current engagement patterns with occasional check-ins"),
+)
+
+FACTOR_BITS = {rule.message: 1 << bit for bit, rule in enumerate(RISK_FACTOR_RULES)}
+
+def _factor_mask(names: Tuple[str, ...]) -> int:
+    mask = 0
+    for name in names:
+        mask |= FACTOR_BITS[name]
+    return mask
+
+def bucket_risk_levels(churn_probs: np.ndarray) -> np.ndarray:
+    """Risk level index (into RISK_LEVELS) for each probability"""
+    return np.digitize(churn_probs, RISK_LEVEL_THRESHOLDS)
+
+def evaluate_risk_factors(features: np.ndarray, churn_probs: np.ndarray) -> np.ndarray:
+    """
+    Evaluate RISK_FACTOR_RULES over an (N, 8) feature matrix
+
+    Args:
+        features: Churn feature matrix in CHURN_FEATURES column order
+        churn_probs: Churn probability per row
+
+    Returns:
+        uint16 array of factor bitmasks, one per row
+    """
+    factor_bits = np.zeros(len(features), dtype=np.uint16)
+
+    for bit, rule in enumerate(RISK_FACTOR_RULES):
+        mask = np.ones(len(features), dtype=bool)
+        for name, op, threshold in rule.conditions:
+            column = churn_probs if name == "churn_probability" else features[:, FEATURE_INDEX[name]]
+            mask &= _OPERATORS[op](column, threshold)
+        if rule.excludes:
+            mask &= (factor_bits & _factor_mask(rule.excludes)) == 0
+        factor_bits[mask] |= np.uint16(1 << bit)
+
+    return factor_bits
+
+def select_interventions(risk_levels: np.ndarray, factor_bits: np.ndarray) -> np.ndarray:
+    """Index into INTERVENTION_RULES of the first matching rule for each row"""
+    conditions = []
+    for rule in INTERVENTION_RULES:
+        condition = risk_levels == RISK_LEVELS.index(rule.risk_level)
+        if rule.requires_any is not None:
+            condition = condition & ((factor_bits & _factor_mask(rule.requires_any)) != 0)
+        conditions.append(condition)
+    return np.select(conditions, np.arange(len(INTERVENTION_RULES)), default=len(INTERVENTION_RULES) - 1)
+
+@lru_cache(maxsize=None)
+def decode_risk_factors(factor_bits: int) -> Tuple[str, ...]:
+    """Factor messages for a bitmask, in rule table order"""
+    return tuple(rule.message for bit, rule in enumerate(RISK_FACTOR_RULES) if factor_bits & (1 << bit))
+
+def decode_intervention(intervention_index: int) -> str:
+    """Intervention message for an index returned by select_interventions"""
+    return INTERVENTION_RULES[intervention_index].message
+
+def decode_factor_list(factor_bits: int) -> List[str]:
+    """Factor messages for a bitmask as a fresh list, ready for serialization"""
+    return list(decode_risk_factors(int(factor_bits)))
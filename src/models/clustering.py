@@ -3,14 +3,12 @@ User behavioral clustering using KMeans model - requires trained model
 """
 
 import numpy as np
-from typing import Dict, Any
+from typing import Dict, Any, List
 import logging
-from dotenv import load_dotenv
 from src.utils.model_loader import ModelLoader
-from src.utils.feature_prep import FeaturePreparator
-
-# Load environment variables
-load_dotenv()
+from src.utils.feature_prep import FeaturePreparator, scale_features
+from src.utils.kmeans_kernel import NearestCentroidKernel
+from src.utils.env import load_environment
 
 logger = logging.getLogger(__name__)
 
@@ -19,29 +17,49 @@ class UserClusterer:
     Clusters users into behavioral segments using early activity data - requires trained model
     """
     
-    def __init__(self):
+    ARTIFACT_NAME = "kmeans_model.welli"
+    SOURCE_FILES = ("kmeans_model.joblib", "clustering_scaler.joblib")
+    # Column order of FeaturePreparator.prepare_clustering_features
+    FEATURES = ("session_count", "avg_session_duration", "streak_length", "preferred_time_of_day",
+                "content_engagement_rate", "notification_response_rate")
+    
+    def __init__(self, use_artifact: bool = True):
+        load_environment()
         self.model_loader = ModelLoader(base_path="ml_models/clustering")
         self.feature_prep = FeaturePreparator()
         self.kmeans_model = None
         self.clustering_scaler = None
         self.cluster_info = None
+        # (name, description) per cluster id, built once from cluster_info
+        self.cluster_table = ()
+        self.centroid_kernel = None
+        self.scaler_fused = False
+        # Memory-map the exported centroids instead of unpickling sklearn when they are up to date
+        self.use_artifact = use_artifact
+        self.loaded_from_artifact = False
         
         # Load and validate models
         self._load_models()
     
     def _load_models(self):
         """Load KMeans model, scaler, and cluster information - required, no fallback"""
-        # Load trained KMeans model - required
-        self.kmeans_model = self.model_loader.load_joblib_model("kmeans_model.joblib")
-        
-        if not self.kmeans_model:
-            raise Exception("KMeans model not found. Please ensure kmeans_model.joblib exists in ml_models/clustering/ directory")
-        
-        # Load clustering scaler - required
-        self.clustering_scaler = self.model_loader.load_joblib_model("clustering_scaler.joblib")
+        # Fingerprint the artifacts first so a retrain during loading is picked up by the next reload
+        self.model_version = self.model_loader.directory_version()
         
-        if not self.clustering_scaler:
-            raise Exception("Clustering scaler not found. Please ensure clustering_scaler.joblib exists in ml_models/clustering/ directory")
+        if not (self.use_artifact and self._load_artifact()):
+            # Load trained KMeans model - required
+            self.kmeans_model = self.model_loader.load_joblib_model("kmeans_model.joblib")
+            
+            if not self.kmeans_model:
+                raise Exception("KMeans model not found. Please ensure kmeans_model.joblib exists in ml_models/clustering/ directory")
+            
+            # Load clustering scaler - required
+            self.clustering_scaler = self.model_loader.load_joblib_model("clustering_scaler.joblib")
+            
+            if not self.clustering_scaler:
+                raise Exception("Clustering scaler not found. Please ensure clustering_scaler.joblib exists in ml_models/clustering/ directory")
+            
+            self._build_centroid_kernel()
         
         # Load cluster information - required
         self.cluster_info = self.model_loader.load_json_data("cluster_info.json")
@@ -49,8 +67,124 @@ class UserClusterer:
         if not self.cluster_info:
             raise Exception("Cluster info not found. Please ensure cluster_info.json exists in ml_models/clustering/ directory")
         
+        self.cluster_table = self._build_cluster_table()
+        
         logger.info("Successfully loaded KMeans model, scaler, and cluster info")
     
+    def _build_cluster_table(self) -> tuple:
+        """
+        Resolve cluster names and descriptions once, indexed by cluster id
+        
+        Ids the centroids can produce but cluster_info.json does not describe get
+        the same "Cluster N" / "Unknown cluster" fallback as before.
+        """
+        clusters = self.cluster_info.get("clusters", {})
+        table = []
+        for cluster_id in range(self.centroid_kernel.n_clusters):
+            cluster_data = clusters.get(str(cluster_id), {})
+            table.append((
+                cluster_data.get("name", f"Cluster {cluster_id}"),
+                cluster_data.get("description", "Unknown cluster")
+            ))
+        return tuple(table)
+    
+    def _load_artifact(self) -> bool:
+        """
+        Use the fused centroids from kmeans_model.welli if they were exported from the current
+        joblib files. Returns False (so joblib is loaded instead) if missing or stale.
+        """
+        loaded = self.model_loader.load_array_artifact(self.ARTIFACT_NAME)
+        if loaded is None:
+            return False
+        arrays, metadata = loaded
+        
+        # Size and mtime only: hashing the joblib files would cost as much as unpickling them
+        source_stamp = self.model_loader.file_stamp(*self.SOURCE_FILES)
+        if source_stamp is not None and source_stamp != metadata.get("source_stamp"):
+            logger.warning(f"{self.ARTIFACT_NAME} is older than the joblib models, ignoring it. Re-run scripts.export_model_artifacts")
+            return False
+        
+        self.centroid_kernel = NearestCentroidKernel.from_arrays(arrays)
+        self.scaler_fused = True
+        self.loaded_from_artifact = True
+        logger.info(f"Loaded fused KMeans centroids from {self.ARTIFACT_NAME}")
+        return True
+    
+    def export_artifact(self) -> bool:
+        """
+        Write the fused centroids, metric weights and scaler arrays to kmeans_model.welli
+        
+        Returns:
+            True if the artifact was written
+        """
+        if not self.scaler_fused or self.loaded_from_artifact:
+            raise Exception("Export requires centroids fused from the joblib models")
+        
+        arrays = self.centroid_kernel.to_arrays()
+        arrays["scaler_mean"] = np.asarray(self.clustering_scaler.mean_, dtype=np.float64)
+        arrays["scaler_scale"] = np.asarray(self.clustering_scaler.scale_, dtype=np.float64)
+        metadata = {
+            "model": "kmeans_centroids",
+            "n_clusters": self.centroid_kernel.n_clusters,
+            "scaler_fused": True,
+            "source_stamp": self.model_loader.file_stamp(*self.SOURCE_FILES)
+        }
+        return self.model_loader.save_array_artifact(arrays, metadata, self.ARTIFACT_NAME)
+    
+    def _build_centroid_kernel(self):
+        """
+        Build the nearest-centroid kernel with the scaler folded into centroids and metric
+        weights, so raw features need no transform per request. Keeps an explicit scaler
+        step if the fused kernel disagrees with the scaler -> KMeans pipeline.
+        """
+        kernel = NearestCentroidKernel.from_sklearn(self.kmeans_model)
+        
+        try:
+            fused = kernel.fuse_scaler(self.clustering_scaler.mean_, self.clustering_scaler.scale_)
+            
+            rng = np.random.default_rng(0)
+            probe = self.clustering_scaler.mean_ + rng.standard_normal((256, kernel.n_features)) * self.clustering_scaler.scale_ * 2.0
+            scaled_probe = scale_features(self.clustering_scaler, probe, self.FEATURES)
+            labels, distances = fused.assign(probe)
+            
+            if not (np.array_equal(labels, self.kmeans_model.predict(scaled_probe)) and
+                    np.allclose(distances, self.kmeans_model.transform(scaled_probe), rtol=1e-9, atol=1e-9)):
+                raise ValueError("fused distances differ from scaler -> KMeans pipeline")
+            
+            self.centroid_kernel = fused
+            self.scaler_fused = True
+        except Exception as e:
+            logger.warning(f"Could not fuse clustering scaler, scaling per request: {str(e)}")
+            self.centroid_kernel = kernel
+            self.scaler_fused = False
+    
+    def _assign_clusters(self, features: np.ndarray):
+        """
+        Nearest-centroid assignment and confidence for an (N, 6) feature matrix
+        
+        Confidence is 1 - (distance to own centroid / distance to farthest centroid),
+        with distances measured in the scaler's standardized space.
+        """
+        if not self.scaler_fused:
+            features = scale_features(self.clustering_scaler, features, self.FEATURES)
+        cluster_ids, distances = self.centroid_kernel.assign(features)
+        min_distances = distances[np.arange(len(distances)), cluster_ids]
+        max_distances = distances.max(axis=1)
+        max_distances[max_distances <= 0] = 1.0
+        confidences = 1.0 - (min_distances / max_distances)
+        return cluster_ids, confidences
+    
+    def _serialize_cluster(self, user_id: str, cluster_id: int, confidence: float) -> Dict[str, Any]:
+        """Assemble the response payload from the precomputed cluster table"""
+        cluster_name, cluster_description = self.cluster_table[cluster_id]
+        return {
+            "user_id": user_id,
+            "cluster_id": cluster_id,
+            "cluster_name": cluster_name,
+            "cluster_description": cluster_description,
+            "confidence_score": confidence
+        }
+    
     def cluster_user(self, user_data: Any) -> Dict[str, Any]:
         """
         Cluster user into behavioral segment - requires trained model
@@ -61,10 +195,10 @@ class UserClusterer:
         Returns:
             Dictionary with cluster assignment and metadata
         """
-        if not self.kmeans_model:
+        if self.centroid_kernel is None:
             raise Exception("KMeans model not loaded")
         
-        if not self.clustering_scaler:
+        if not self.scaler_fused and not self.clustering_scaler:
             raise Exception("Clustering scaler not loaded")
         
         if not self.cluster_info:
@@ -80,35 +214,56 @@ class UserClusterer:
             # Prepare features
             features = self.feature_prep.prepare_clustering_features(user_dict)
             
-            # Get cluster prediction using trained model
-            cluster_id = int(self.kmeans_model.predict(features)[0])
-            
-            # Calculate confidence as distance to cluster center
-            distances = self.kmeans_model.transform(features)[0]
-            min_distance = min(distances)
-            max_distance = max(distances) if max(distances) > 0 else 1.0
-            confidence = 1.0 - (min_distance / max_distance)
-            
-            # Get cluster information
-            cluster_data = self.cluster_info["clusters"].get(str(cluster_id), {
-                "name": f"Cluster {cluster_id}",
-                "description": "Unknown cluster"
-            })
-            
-            return {
-                "user_id": user_dict["user_id"],
-                "cluster_id": cluster_id,
-                "cluster_name": cluster_data["name"],
-                "cluster_description": cluster_data["description"],
-                "confidence_score": float(confidence)
-            }
+            # Assignment and confidence come from one centroid distance computation
+            cluster_ids, confidences = self._assign_clusters(features)
+            
+            return self._serialize_cluster(user_dict["user_id"], int(cluster_ids[0]), float(confidences[0]))
             
         except Exception as e:
             logger.error(f"Error in user clustering: {str(e)}")
             raise Exception(f"User clustering failed: {str(e)}")
     
+    def cluster_users_batch(self, users: List[Any]) -> Dict[str, Any]:
+        """
+        Cluster many users with a single centroid distance computation
+        
+        Args:
+            users: List of UserBehaviorData objects (or dicts) with user metrics
+            
+        Returns:
+            Dictionary with one cluster assignment per user, in input order
+        """
+        if self.centroid_kernel is None:
+            raise Exception("KMeans model not loaded")
+        
+        if not self.scaler_fused and not self.clustering_scaler:
+            raise Exception("Clustering scaler not loaded")
+        
+        if not self.cluster_info:
+            raise Exception("Cluster info not loaded")
+        
+        try:
+            user_dicts = [user.dict() if hasattr(user, 'dict') else user for user in users]
+            if not user_dicts:
+                return {"clusters": [], "total_users": 0}
+            
+            features = self.feature_prep.prepare_clustering_features_batch(user_dicts)
+            cluster_ids, confidences = self._assign_clusters(features)
+            
+            # tolist() converts to Python ints and floats in one pass instead of per element
+            clusters = [
+                self._serialize_cluster(user_dict["user_id"], cluster_id, confidence)
+                for user_dict, cluster_id, confidence in zip(user_dicts, cluster_ids.tolist(), confidences.tolist())
+            ]
+            
+            return {"clusters": clusters, "total_users": len(clusters)}
+            
+        except Exception as e:
+            logger.error(f"Error in batch user clustering: {str(e)}")
+            raise Exception(f"Batch user clustering failed: {str(e)}")
+    
     def is_ready(self) -> bool:
         """Check if the clusterer is ready to use"""
-        return (self.kmeans_model is not None and 
-                self.clustering_scaler is not None and
+        return (self.centroid_kernel is not None and 
+                (self.scaler_fused or self.clustering_scaler is not None) and
                 self.cluster_info is not None)
@@ -3,15 +3,19 @@ Content matching using FAISS vector database with OpenAI embeddings for goal-to-
 """
 
 import numpy as np
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 import logging
 import os
 import json
-from dotenv import load_dotenv
 from src.utils.model_loader import ModelLoader
-
-# Load environment variables from .env file
-load_dotenv()
+from src.utils.embedding_store import EmbeddingStore
+from src.utils.embedding_cache import EmbeddingCache, create_shared_backend
+from src.utils.embedding_batcher import EmbeddingBatcher
+from src.utils.openai_clients import get_openai_clients
+from src.utils.llm_gateway import (
+    PRIORITY_BATCH, PRIORITY_INTERACTIVE, LLMRateLimitError, estimate_tokens, get_llm_gateway
+)
+from src.utils.env import load_environment
 
 logger = logging.getLogger(__name__)
 
@@ -21,30 +25,58 @@ class ContentMatcher:
     """
     
     def __init__(self):
+        load_environment()
         self.model_loader = ModelLoader()
-        self.openai_client = None
+        self.openai_clients = None
         self.faiss_index = None
         self.content_data = []
+        self.content_items = []
+        self.catalog_version = None
         self.embedding_dimension = 1536  # text-embedding-3-small dimension
         self.embedding_model = "text-embedding-3-small"  # Can be changed to text-embedding-3-large
+        self.embedding_store = EmbeddingStore(
+            model=self.embedding_model,
+            dimension=self.embedding_dimension,
+            base_path=os.getenv("EMBEDDING_STORE_PATH", "data/embeddings")
+        )
+        # Onboarding goals repeat a lot, so goal embeddings are cached by normalized text
+        self.goal_cache = EmbeddingCache(
+            model=self.embedding_model,
+            max_size=int(os.getenv("GOAL_CACHE_SIZE", "1024")),
+            ttl_seconds=float(os.getenv("GOAL_CACHE_TTL_SECONDS", "86400")),
+            backend=create_shared_backend(os.getenv("GOAL_CACHE_REDIS_URL"))
+        )
+        # Cache misses arriving within a few milliseconds share one embeddings call
+        self.embedding_batcher = EmbeddingBatcher(
+            self._get_openai_embeddings_async,
+            max_batch_size=int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "64")),
+            max_wait_ms=float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", "5"))
+        )
+        
+        # Shared with MicroCoach so both stay within the account's rate limits
+        self.llm_gateway = get_llm_gateway()
         
         # Initialize everything
         self._setup_openai()
         self._load_content_and_build_index()
     
+    @property
+    def openai_client(self):
+        """Shared sync OpenAI client, used for catalog embedding"""
+        return self.openai_clients.sync_client() if self.openai_clients is not None else None
+    
+    @property
+    def async_openai_client(self):
+        """Shared async OpenAI client, used by the request path so embedding calls don't block the event loop"""
+        return self.openai_clients.async_client() if self.openai_clients is not None else None
+    
     def _setup_openai(self):
         """Setup OpenAI client - required, no fallback"""
         try:
-            import openai
-            
-            api_key = os.getenv("OPENAI_API_KEY")
-            if not api_key:
-                raise ValueError("OPENAI_API_KEY is required but not found in environment variables")
-            
-            # Remove quotes if present
-            api_key = api_key.strip("'\"")
-            
-            self.openai_client = openai.OpenAI(api_key=api_key)
+            # Pooled clients shared with MicroCoach; creating them here checks the API key
+            self.openai_clients = get_openai_clients()
+            self.openai_clients.sync_client()
+            self.openai_clients.async_client()
             logger.info("OpenAI client initialized successfully")
             
         except ImportError:
@@ -66,9 +98,56 @@ class ContentMatcher:
         except Exception as e:
             raise Exception(f"Failed to setup FAISS index: {str(e)}")
     
+    def _load_faiss_snapshot(self, index_path) -> bool:
+        """Memory-map a prebuilt FAISS index for the current catalog version, if one exists"""
+        if not index_path.exists():
+            return False
+        
+        try:
+            import faiss
+            
+            # IO_FLAG_MMAP_IFC maps flat codes read-only so workers share the page cache; older faiss
+            # releases (e.g. the pinned 1.7.4) lack it, and IO_FLAG_MMAP reads flat indexes into memory
+            mmap_flag = getattr(faiss, "IO_FLAG_MMAP_IFC", None)
+            if mmap_flag is None:
+                logger.warning(
+                    f"faiss {getattr(faiss, '__version__', 'unknown')} has no IO_FLAG_MMAP_IFC: the FAISS snapshot is "
+                    f"copied into each worker's memory instead of shared; upgrade faiss-cpu to a release that has it"
+                )
+                mmap_flag = faiss.IO_FLAG_MMAP
+            index = faiss.read_index(str(index_path), mmap_flag | faiss.IO_FLAG_READ_ONLY)
+            
+            if index.d != self.embedding_dimension or index.ntotal != len(self.content_data):
+                logger.warning(f"FAISS snapshot {index_path} does not match catalog, rebuilding")
+                return False
+            
+            self.faiss_index = index
+            self.embedding_store.touch_version(self.catalog_version)
+            logger.info(f"Loaded FAISS snapshot {index_path} with {index.ntotal} vectors")
+            return True
+            
+        except ImportError:
+            raise ImportError("FAISS library is required. Install with: pip install faiss-cpu")
+        except Exception as e:
+            logger.warning(f"Could not load FAISS snapshot {index_path}: {str(e)}")
+            return False
+    
+    def export_faiss_index(self) -> str:
+        """Write the current FAISS index next to the catalog embeddings for its catalog version"""
+        if not self.faiss_index or self.faiss_index.ntotal == 0:
+            raise Exception("FAISS index not ready")
+        
+        import faiss
+        
+        index_path = self.embedding_store.index_path(self.catalog_version)
+        tmp_path = index_path.with_name(f"{index_path.name}.{os.getpid()}.tmp")
+        faiss.write_index(self.faiss_index, str(tmp_path))
+        os.replace(tmp_path, index_path)
+        logger.info(f"Exported FAISS index snapshot to {index_path}")
+        return str(index_path)
     
     def _load_content_and_build_index(self):
-        """Load content catalog and build FAISS index with embeddings"""
+        """Load content catalog and the FAISS index, from snapshot when available"""
         # Load content catalog
         content_catalog = self.model_loader.load_json_data("content_catalog.json")
         if not content_catalog:
@@ -77,46 +156,100 @@ class ContentMatcher:
         self.content_data = content_catalog["content"]
         logger.info(f"Loaded {len(self.content_data)} content items")
         
-        # Setup FAISS and build embeddings index
+        self.content_items = self._get_content_items()
+        self.catalog_version = self.embedding_store.catalog_version(
+            [self.embedding_store.hash_text(text) for _, text in self.content_items]
+        )
+        
+        if self._load_faiss_snapshot(self.embedding_store.index_path(self.catalog_version)):
+            return
+        
+        # Setup FAISS and build embeddings index, then snapshot it for the next start
         self._setup_faiss_index()
         self._build_embeddings_index()
+        try:
+            self.export_faiss_index()
+        except Exception as e:
+            logger.warning(f"Could not export FAISS snapshot: {str(e)}")
     
-    def _get_openai_embeddings(self, texts: List[str]) -> List[List[float]]:
-        """Get embeddings from OpenAI API"""
+    def _get_content_items(self) -> List[Tuple[str, str]]:
+        """Texts to embed for each catalog item, as (item_id, text) pairs"""
+        content_items = []
+        for item in self.content_data:
+            # Combine title, description, and tags for embedding
+            text = f"{item['title']} {item['description']} {' '.join(item.get('tags', []))}"
+            content_items.append((item["id"], text))
+        return content_items
+    
+    def _get_openai_embeddings(self, texts: List[str], priority: int = PRIORITY_BATCH) -> List[List[float]]:
+        """Get embeddings from OpenAI API; catalog embedding runs at batch priority by default"""
         if not self.openai_client:
             raise Exception("OpenAI client not initialized")
         
         try:
-            response = self.openai_client.embeddings.create(
-                model=self.embedding_model,
-                input=texts
+            response = self.llm_gateway.submit_sync(
+                lambda: self.openai_client.embeddings.create(
+                    model=self.embedding_model,
+                    input=texts
+                ),
+                estimated_tokens=sum(estimate_tokens(text) for text in texts),
+                priority=priority,
+                operation="embeddings.content"
+            )
+            return [embedding.embedding for embedding in response.data]
+        except Exception as e:
+            logger.error(f"Error getting OpenAI embeddings: {str(e)}")
+            raise
+    
+    async def _get_openai_embeddings_async(self, texts: List[str]) -> List[List[float]]:
+        """Get embeddings from OpenAI API without blocking the event loop"""
+        if not self.async_openai_client:
+            raise Exception("OpenAI client not initialized")
+        
+        try:
+            response = await self.llm_gateway.submit(
+                lambda: self.async_openai_client.embeddings.create(
+                    model=self.embedding_model,
+                    input=texts
+                ),
+                estimated_tokens=sum(estimate_tokens(text) for text in texts),
+                priority=PRIORITY_INTERACTIVE,
+                operation="embeddings.goal"
             )
             return [embedding.embedding for embedding in response.data]
         except Exception as e:
             logger.error(f"Error getting OpenAI embeddings: {str(e)}")
             raise
     
+    def _get_goal_embedding(self, goal: str) -> np.ndarray:
+        """Get the goal embedding from cache, calling OpenAI only on a miss"""
+        goal_embedding = self.goal_cache.get(goal)
+        if goal_embedding is None:
+            goal_embedding = np.array(self._get_openai_embeddings([goal], PRIORITY_INTERACTIVE)[0], dtype=np.float32)
+            self.goal_cache.set(goal, goal_embedding)
+        return goal_embedding
+    
+    async def _get_goal_embedding_async(self, goal: str) -> np.ndarray:
+        """Async variant of _get_goal_embedding, batching misses with concurrent requests"""
+        goal_embedding = await self.goal_cache.aget(goal)
+        if goal_embedding is None:
+            embedding = await self.embedding_batcher.embed(goal)
+            goal_embedding = np.array(embedding, dtype=np.float32)
+            await self.goal_cache.aset(goal, goal_embedding)
+        return goal_embedding
+    
     def _build_embeddings_index(self):
-        """Build FAISS index with content embeddings"""
+        """Build FAISS index with content embeddings, reusing stored embeddings where possible"""
         if not self.faiss_index or not self.content_data:
             raise Exception("FAISS index or content data not available")
         
         try:
-            # Prepare texts for embedding
-            content_texts = []
-            for item in self.content_data:
-                # Combine title, description, and tags for embedding
-                text = f"{item['title']} {item['description']} {' '.join(item.get('tags', []))}"
-                content_texts.append(text)
-            
-            # Get embeddings from OpenAI
-            embeddings = self._get_openai_embeddings(content_texts)
+            # Only new or edited items are sent to OpenAI
+            embeddings_array = self.embedding_store.get_embeddings(self.content_items, self._get_openai_embeddings)
             
-            if embeddings:
-                # Convert to numpy array and add to FAISS index
-                embeddings_array = np.array(embeddings, dtype=np.float32)
-                self.faiss_index.add(embeddings_array)
-                logger.info(f"Built FAISS index with {len(embeddings)} content embeddings")
+            if len(embeddings_array) > 0:
+                self.faiss_index.add(np.ascontiguousarray(embeddings_array, dtype=np.float32))
+                logger.info(f"Built FAISS index with {len(embeddings_array)} content embeddings")
             else:
                 raise Exception("Failed to get embeddings from OpenAI")
                 
@@ -124,6 +257,48 @@ class ContentMatcher:
             logger.error(f"Error building embeddings index: {str(e)}")
             raise
     
+    def _check_ready_for_matching(self):
+        """Raise if content, OpenAI client or FAISS index are not available"""
+        if not self.content_data:
+            raise Exception("No content data available")
+        
+        if not self.openai_client:
+            raise Exception("OpenAI client not initialized")
+            
+        if not self.faiss_index or self.faiss_index.ntotal == 0:
+            raise Exception("FAISS index not ready")
+    
+    def _search_content(self, goal: str, goal_embedding: np.ndarray, limit: int) -> Dict[str, Any]:
+        """Search FAISS index for the goal embedding and build the match response"""
+        distances, indices = self.faiss_index.search(
+            goal_embedding.reshape(1, -1), 
+            min(limit, self.faiss_index.ntotal)
+        )
+        
+        # Convert distances to similarities (lower distance = higher similarity)
+        matched_content = []
+        for distance, idx in zip(distances[0], indices[0]):
+            if idx < len(self.content_data):
+                item = self.content_data[idx]
+                # Convert L2 distance to similarity score (0-1 range)
+                similarity = 1.0 / (1.0 + distance)
+                
+                matched_content.append({
+                    "id": item["id"],
+                    "title": item["title"],
+                    "description": item["description"],
+                    "category": item["category"],
+                    "similarity_score": float(similarity)
+                })
+        
+        logger.info(f"Found {len(matched_content)} matches using FAISS + OpenAI")
+        
+        return {
+            "user_goal": goal,
+            "matched_content": matched_content,
+            "total_results": len(matched_content)
+        }
+    
     def match_goal_to_content(self, goal: str, limit: int = 5) -> Dict[str, Any]:
         """
         Match user goal to semantically similar content using FAISS and OpenAI embeddings
@@ -135,53 +310,36 @@ class ContentMatcher:
         Returns:
             Dictionary with matched content and metadata
         """
-        if not self.content_data:
-            raise Exception("No content data available")
-        
-        if not self.openai_client:
-            raise Exception("OpenAI client not initialized")
-            
-        if not self.faiss_index or self.faiss_index.ntotal == 0:
-            raise Exception("FAISS index not ready")
+        self._check_ready_for_matching()
         
         try:
-            # Get goal embedding
-            response = self.openai_client.embeddings.create(
-                model=self.embedding_model,
-                input=[goal]
-            )
-            goal_embedding = np.array(response.data[0].embedding, dtype=np.float32)
-            
-            # Search FAISS index
-            distances, indices = self.faiss_index.search(
-                goal_embedding.reshape(1, -1), 
-                min(limit, self.faiss_index.ntotal)
-            )
-            
-            # Convert distances to similarities (lower distance = higher similarity)
-            matched_content = []
-            for distance, idx in zip(distances[0], indices[0]):
-                if idx < len(self.content_data):
-                    item = self.content_data[idx]
-                    # Convert L2 distance to similarity score (0-1 range)
-                    similarity = 1.0 / (1.0 + distance)
-                    
-                    matched_content.append({
-                        "id": item["id"],
-                        "title": item["title"],
-                        "description": item["description"],
-                        "category": item["category"],
-                        "similarity_score": float(similarity)
-                    })
+            goal_embedding = self._get_goal_embedding(goal)
+            return self._search_content(goal, goal_embedding, limit)
             
-            logger.info(f"Found {len(matched_content)} matches using FAISS + OpenAI")
+        except Exception as e:
+            logger.error(f"Error in goal matching: {str(e)}")
+            raise Exception(f"Goal matching failed: {str(e)}")
+    
+    async def match_goal_to_content_async(self, goal: str, limit: int = 5) -> Dict[str, Any]:
+        """
+        Non-blocking variant of match_goal_to_content for use from async endpoints
+        
+        Args:
+            goal: User's wellness goal in natural language
+            limit: Number of content items to return
             
-            return {
-                "user_goal": goal,
-                "matched_content": matched_content,
-                "total_results": len(matched_content)
-            }
+        Returns:
+            Dictionary with matched content and metadata
+        """
+        self._check_ready_for_matching()
+        
+        try:
+            goal_embedding = await self._get_goal_embedding_async(goal)
+            return self._search_content(goal, goal_embedding, limit)
             
+        except LLMRateLimitError:
+            # Surfaced as 503 with Retry-After rather than a generic failure
+            raise
         except Exception as e:
             logger.error(f"Error in goal matching: {str(e)}")
             raise Exception(f"Goal matching failed: {str(e)}")
@@ -200,5 +358,9 @@ class ContentMatcher:
             "openai_client_ready": self.openai_client is not None,
             "faiss_index_ready": self.faiss_index is not None,
             "embeddings_count": self.faiss_index.ntotal if self.faiss_index else 0,
+            "catalog_version": self.catalog_version,
+            "goal_cache": self.goal_cache.stats(),
+            "embedding_batcher": self.embedding_batcher.stats(),
+            "llm_gateway": self.llm_gateway.stats(),
             "fully_ready": self.is_ready()
         }
@@ -4,43 +4,133 @@ Micro-coach using OpenAI's GPT-4o-mini for daily wellness planning - requires Op
 
 import asyncio
 import json
-from typing import Dict, Any, List
+from contextlib import aclosing
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
 from datetime import datetime, timedelta
 import logging
 import os
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
+from src.utils.env import load_environment
+from src.utils.embedding_cache import create_shared_backend
+from src.utils.plan_cache import PlanCache, canonical_context, context_signature
+from src.utils.plan_store import PlanStore
+from src.utils.json_stream import JSONStreamParser
+from src.utils.llm_gateway import PRIORITY_INTERACTIVE, LLMRateLimitError, count_tokens, estimate_tokens, get_llm_gateway
+from src.utils.model_loader import ModelLoader
+from src.utils.openai_clients import get_openai_clients
+from src.utils.template_planner import TemplatePlanner
 
 logger = logging.getLogger(__name__)
 
+# llm: always GPT; fallback: GPT, template plan when the LLM gateway is saturated;
+# template_first: template plan for common requests, GPT otherwise with fallback; template: never call GPT
+PLAN_ROUTING_POLICIES = ("llm", "fallback", "template_first", "template")
+
+PLAN_CATEGORIES = ["meditation", "exercise", "nutrition", "sleep", "mental_health"]
+
+SYSTEM_PROMPT = (
+    "You are a supportive wellness micro-coach. Plan today with 1-2 specific, achievable activities "
+    "that fit the available time, build on the streak, complement recent activities and serve the goal. "
+    "Favor small wins; describe clearly what to do; add a brief encouraging motivational message."
+)
+
+# Only sent when structured outputs are disabled; otherwise the response schema carries the format
+JSON_FORMAT_PROMPT = (
+    ' Reply only with JSON: {"motivational_message": str, "daily_items": [{"activity": str, '
+    '"duration_minutes": int, "description": str, "category": "' + "|".join(PLAN_CATEGORIES) + '"}], '
+    '"follow_up_time": str}'
+)
+
+# Structured outputs schema; property order is generation order, so the message streams first
+PLAN_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "daily_plan",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "motivational_message": {"type": "string"},
+                "daily_items": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "activity": {"type": "string"},
+                            "duration_minutes": {"type": "integer"},
+                            "description": {"type": "string"},
+                            "category": {"type": "string", "enum": PLAN_CATEGORIES}
+                        },
+                        "required": ["activity", "duration_minutes", "description", "category"],
+                        "additionalProperties": False
+                    }
+                },
+                "follow_up_time": {"type": "string", "enum": ["morning", "afternoon", "evening"]}
+            },
+            "required": ["motivational_message", "daily_items", "follow_up_time"],
+            "additionalProperties": False
+        }
+    }
+}
+
 class MicroCoach:
     """
     AI-powered micro-coach for generating personalized daily wellness plans
     """
     
     def __init__(self):
-        self.openai_client = None
+        load_environment()
+        self.openai_clients = None
         self.model_name = "gpt-4o-mini"
+        self.embedding_model = "text-embedding-3-small"
         
-        # Initialize OpenAI client
-        self._initialize_openai()
+        # Plans are shared by users with the same bucketed context for the same day
+        self.max_recent_activities = int(os.getenv("PLAN_CACHE_RECENT_ACTIVITIES", "3"))
+        self.plan_cache = None
+        if os.getenv("PLAN_CACHE_ENABLED", "True").lower() == "true":
+            threshold = os.getenv("PLAN_CACHE_SIMILARITY_THRESHOLD")
+            self.plan_cache = PlanCache(
+                max_size=int(os.getenv("PLAN_CACHE_SIZE", "4096")),
+                ttl_seconds=float(os.getenv("PLAN_CACHE_TTL_SECONDS", "86400")),
+                backend=create_shared_backend(os.getenv("PLAN_CACHE_REDIS_URL")),
+                similarity_threshold=float(threshold) if threshold else None,
+                max_recent_activities=self.max_recent_activities
+            )
+        # Concurrent misses for the same context share one OpenAI call
+        self._pending_plans: Dict[Any, asyncio.Future] = {}
+        # Plans generated ahead of time by scripts.precompute_daily_plans
+        self.plan_store = PlanStore(os.getenv("PLAN_STORE_PATH", "data/plans/daily_plans.sqlite3"))
+        # Shared with ContentMatcher so both stay within the account's rate limits
+        self.llm_gateway = get_llm_gateway()
+        self.max_completion_tokens = 500
+        # JSON-schema constrained responses; disable for models or endpoints without structured outputs
+        self.structured_output = os.getenv("PLAN_STRUCTURED_OUTPUT", "True").lower() == "true"
+        
+        # Catalog-based plans for common requests and for when OpenAI capacity is exhausted
+        self.plan_routing_policy = os.getenv("PLAN_ROUTING_POLICY", "fallback").lower()
+        if self.plan_routing_policy not in PLAN_ROUTING_POLICIES:
+            raise ValueError(f"PLAN_ROUTING_POLICY must be one of {', '.join(PLAN_ROUTING_POLICIES)}")
+        self.template_max_minutes = int(os.getenv("PLAN_TEMPLATE_MAX_MINUTES", "15"))
+        # With a template fallback, GPT calls that would queue longer than this are not queued at all
+        self.fallback_max_wait = float(os.getenv("PLAN_FALLBACK_MAX_WAIT_SECONDS", "2"))
+        self.template_planner = self._load_template_planner()
+        self.route_counts = {"template": 0, "cache": 0, "llm": 0, "fallback": 0}
+        
+        # Initialize OpenAI client; template-only routing never calls GPT and needs no API key
+        self.openai_clients = None
+        if self.plan_routing_policy != "template":
+            self._initialize_openai()
+    
+    @property
+    def openai_client(self):
+        """Shared async OpenAI client for this process"""
+        return self.openai_clients.async_client() if self.openai_clients is not None else None
     
     def _initialize_openai(self):
         """Initialize OpenAI client - strict mode, no fallbacks"""
         try:
-            import openai
-            
-            # Get API key from environment
-            api_key = os.getenv("OPENAI_API_KEY")
-            if not api_key:
-                raise ValueError("OPENAI_API_KEY is required but not found in environment variables")
-            
-            # Remove quotes if present
-            api_key = api_key.strip("'\"")
-            
-            self.openai_client = openai.AsyncOpenAI(api_key=api_key)
+            # Pooled client shared with ContentMatcher; creating it here checks the API key
+            self.openai_clients = get_openai_clients()
+            self.openai_clients.async_client()
             logger.info("OpenAI client initialized successfully")
             
         except ImportError:
@@ -48,128 +138,464 @@ class MicroCoach:
         except Exception as e:
             raise Exception(f"Failed to initialize OpenAI client: {str(e)}")
     
+    def _load_template_planner(self) -> Optional[TemplatePlanner]:
+        """Template planner over the content catalog; None (GPT only) if the catalog is missing"""
+        if self.plan_routing_policy == "llm":
+            return None
+        catalog = ModelLoader().load_json_data("content_catalog.json")
+        if not catalog:
+            if self.plan_routing_policy == "template":
+                raise Exception("PLAN_ROUTING_POLICY=template requires data/content_catalog.json")
+            logger.warning("Content catalog not found, template plans disabled")
+            return None
+        return TemplatePlanner(catalog["content"])
+    
+    def _use_template(self, user_dict: Dict[str, Any]) -> bool:
+        """Whether the routing policy sends this request to the template planner instead of GPT"""
+        if self.template_planner is None:
+            return False
+        if self.plan_routing_policy == "template":
+            return True
+        return (self.plan_routing_policy == "template_first"
+                and self.template_planner.can_plan(user_dict, self.template_max_minutes))
+    
+    def _template_plan(self, user_dict: Dict[str, Any], route: str) -> Dict[str, Any]:
+        self.route_counts[route] += 1
+        return self.template_planner.plan(user_dict)
+    
+    def _check_capacity(self, estimated_tokens: int, priority: int, operation: str):
+        """Raise LLMRateLimitError at once, instead of queueing, when the gateway is too busy to answer in time"""
+        wait = self.llm_gateway.estimated_wait(estimated_tokens, priority, operation)
+        if wait > self.fallback_max_wait:
+            raise LLMRateLimitError(f"LLM gateway saturated: {operation} would wait about {wait:.1f}s", retry_after=max(1.0, wait))
+    
+    def _fallback_plan(self, user_dict: Dict[str, Any], error: LLMRateLimitError) -> Dict[str, Any]:
+        """Template plan when OpenAI capacity is exhausted, or the error if the policy has no fallback"""
+        if self.template_planner is None:
+            raise error
+        logger.warning(f"LLM gateway saturated, serving template plan for user {user_dict.get('user_id')}: {str(error)}")
+        return self._template_plan(user_dict, "fallback")
+    
     def _create_system_prompt(self) -> str:
         """Create system prompt for the micro-coach"""
-        return """You are a supportive wellness micro-coach. Your role is to create personalized, 
-        achievable daily wellness plans that help users build sustainable habits.
-
-        Guidelines:
-        - Keep plans simple with 1-2 activities maximum
-        - Focus on small wins and building momentum
-        - Be encouraging and supportive in tone
-        - Consider the user's available time and current streak
-        - Adapt recommendations based on recent activities
-        - Include specific, actionable items with time estimates
-        - Provide a motivational message
-        
-        Respond ONLY with valid JSON in this exact format:
-        {
-            "motivational_message": "Brief, encouraging message",
-            "daily_items": [
-                {
-                    "activity": "Specific activity name",
-                    "duration_minutes": 10,
-                    "description": "Clear description of what to do",
-                    "category": "meditation|exercise|nutrition|sleep|mental_health"
-                }
-            ],
-            "follow_up_time": "evening"
-        }"""
+        if self.structured_output:
+            return SYSTEM_PROMPT
+        return SYSTEM_PROMPT + JSON_FORMAT_PROMPT
     
     def _create_user_prompt(self, user_data: Dict[str, Any]) -> str:
-        """Create user-specific prompt"""
-        goal = user_data.get("goal", "improve overall wellness")
-        streak = user_data.get("current_streak", 0)
-        recent_activities = user_data.get("recent_activities", [])
-        available_time = user_data.get("available_time_minutes", 15)
-        preferred_time = user_data.get("preferred_time", "morning")
-        mood = user_data.get("mood")
-        
-        prompt = f"""Create a personalized wellness plan for today.
-
-        User Context:
-        - Goal: {goal}
-        - Current streak: {streak} days
-        - Recent activities: {', '.join(recent_activities) if recent_activities else 'None'}
-        - Available time: {available_time} minutes
-        - Preferred time: {preferred_time}"""
+        """Create user-specific prompt, stating each part of the context once"""
+        recent_activities = user_data.get("recent_activities") or []
+        lines = [
+            f"Goal: {user_data.get('goal') or 'improve overall wellness'}",
+            f"Streak: {user_data.get('current_streak') or 0} days",
+            f"Recent: {', '.join(recent_activities) if recent_activities else 'none'}",
+            f"Time: {user_data.get('available_time_minutes') or 15} min, {user_data.get('preferred_time') or 'morning'}"
+        ]
         
+        mood = user_data.get("mood")
         if mood:
-            prompt += f"\n- Current mood: {mood}"
+            lines.append(f"Mood: {mood}")
         
-        prompt += f"""
-        
-        Create a plan that:
-        - Fits within {available_time} minutes
-        - Builds on their {streak}-day streak
-        - Complements recent activities: {recent_activities}
-        - Aligns with their goal: {goal}
+        return "\n".join(lines)
+    
+    def _messages(self, user_prompt: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": self._create_system_prompt()},
+            {"role": "user", "content": user_prompt}
+        ]
+    
+    def _completion_options(self) -> Dict[str, Any]:
+        """Chat completion parameters shared by the streaming and non-streaming calls"""
+        options = {"model": self.model_name, "temperature": 0.7, "max_tokens": self.max_completion_tokens}
+        if self.structured_output:
+            options["response_format"] = PLAN_RESPONSE_FORMAT
+        return options
+    
+    @staticmethod
+    def _response_format_text() -> str:
+        """The response_format JSON schema as serialized into the request; OpenAI bills it as prompt tokens"""
+        return json.dumps(PLAN_RESPONSE_FORMAT["json_schema"], separators=(",", ":"))
+    
+    def _estimated_tokens(self, messages: List[Dict[str, str]]) -> int:
+        """Gateway token estimate for a plan call: messages, response schema and the completion cap"""
+        schema_tokens = estimate_tokens(self._response_format_text()) if self.structured_output else 0
+        return sum(estimate_tokens(message["content"]) for message in messages) + schema_tokens + self.max_completion_tokens
+    
+    def prompt_token_report(self, user_data: Any) -> Dict[str, Any]:
         """
+        Prompt size of a plan request
         
-        return prompt
+        Args:
+            user_data: DailyPlanRequest object or dict
+            
+        Returns:
+            Dictionary with system, user, response schema and total prompt tokens, the completion cap
+            and whether counts are exact; the schema is counted as serialized JSON, which approximates
+            how OpenAI renders it into the prompt
+        """
+        user_dict = user_data.dict() if hasattr(user_data, 'dict') else user_data
+        system_tokens, exact = count_tokens(self._create_system_prompt(), self.model_name)
+        user_tokens, _ = count_tokens(self._create_user_prompt(user_dict), self.model_name)
+        schema_tokens = count_tokens(self._response_format_text(), self.model_name)[0] if self.structured_output else 0
+        return {
+            "system_tokens": system_tokens,
+            "user_tokens": user_tokens,
+            "schema_tokens": schema_tokens,
+            "prompt_tokens": system_tokens + user_tokens + schema_tokens,
+            "max_completion_tokens": self.max_completion_tokens,
+            "structured_output": self.structured_output,
+            "exact": exact
+        }
     
-    async def _call_openai(self, user_prompt: str) -> Dict[str, Any]:
-        """Make async call to OpenAI API - strict mode"""
+    async def _call_openai(self, user_prompt: str, priority: int = PRIORITY_INTERACTIVE,
+                           fail_fast: bool = False) -> Tuple[Dict[str, Any], int]:
+        """
+        Make async call to OpenAI API through the LLM gateway - strict mode
+        
+        Args:
+            user_prompt: Prompt from _create_user_prompt
+            priority: LLM gateway priority
+            fail_fast: Raise LLMRateLimitError instead of queueing when the gateway is saturated
+        
+        Returns:
+            Tuple of (parsed plan, total tokens used)
+        """
         if not self.openai_client:
             raise Exception("OpenAI client not initialized")
         
-        response = await self.openai_client.chat.completions.create(
-            model=self.model_name,
-            messages=[
-                {"role": "system", "content": self._create_system_prompt()},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.7,
-            max_tokens=500
+        messages = self._messages(user_prompt)
+        estimated_tokens = self._estimated_tokens(messages)
+        if fail_fast:
+            self._check_capacity(estimated_tokens, priority, "chat.daily_plan")
+        response = await self.llm_gateway.submit(
+            lambda: self.openai_client.chat.completions.create(messages=messages, **self._completion_options()),
+            estimated_tokens=estimated_tokens,
+            priority=priority,
+            operation="chat.daily_plan"
         )
         
-        content = response.choices[0].message.content.strip()
+        message = response.choices[0].message
+        if message.content is None:
+            raise Exception(f"OpenAI returned no plan: {getattr(message, 'refusal', None) or 'empty response'}")
+        content = message.content.strip()
+        tokens = response.usage.total_tokens if response.usage else 0
         
         # Parse JSON response
         try:
-            return json.loads(content)
+            return json.loads(content), tokens
         except json.JSONDecodeError:
             logger.error(f"Failed to parse OpenAI response as JSON: {content}")
             raise Exception("Invalid JSON response from OpenAI")
     
-    async def generate_daily_plan(self, user_data: Any) -> Dict[str, Any]:
+    async def _embed_goal(self, goal: str, priority: int = PRIORITY_INTERACTIVE) -> Optional[List[float]]:
+        """Goal embedding for semantic plan cache keys; None falls back to exact goal matching"""
+        if self.llm_gateway.estimated_wait(estimate_tokens(goal), priority, "embeddings.plan_goal") > self.fallback_max_wait:
+            logger.info("LLM gateway saturated, matching plan cache goal text exactly")
+            return None
+        try:
+            response = await self.llm_gateway.submit(
+                lambda: self.openai_client.embeddings.create(model=self.embedding_model, input=[goal]),
+                estimated_tokens=estimate_tokens(goal),
+                priority=priority,
+                operation="embeddings.plan_goal"
+            )
+            return response.data[0].embedding
+        except Exception as e:
+            logger.warning(f"Goal embedding for plan cache failed, matching goal text exactly: {str(e)}")
+            return None
+    
+    async def _plan_context(self, user_dict: Dict[str, Any], priority: int) -> Dict[str, Any]:
+        """Canonical cache context for a request, resolving similar goals when enabled"""
+        goal = user_dict.get("goal") or "improve overall wellness"
+        embedding = None
+        if self.plan_cache.needs_goal_embedding(goal):
+            embedding = await self._embed_goal(goal, priority)
+        return self.plan_cache.canonical_context(user_dict, self.plan_cache.resolve_goal(goal, embedding))
+    
+    async def _generate_cached_plan(self, context: Dict[str, Any], plan_date: str, priority: int,
+                                    fail_fast: bool) -> Tuple[Dict[str, Any], int]:
+        """Generate a plan from a canonical context and cache it for the day"""
+        plan_data, tokens = await self._call_openai(self._create_user_prompt(context), priority, fail_fast)
+        await self.plan_cache.aset(context, plan_date, plan_data, tokens)
+        return plan_data, tokens
+    
+    @staticmethod
+    def _pending_key(context: Dict[str, Any], plan_date: str) -> Tuple[str, str]:
+        return plan_date, json.dumps(context, sort_keys=True)
+    
+    async def _get_cached_plan(self, user_dict: Dict[str, Any], plan_date: str, priority: int,
+                               fail_fast: bool = False) -> Tuple[Dict[str, Any], bool]:
+        """
+        Serve the plan for the user's context from cache, generating it once on a miss
+        
+        Returns:
+            Tuple of (plan, whether it came from the cache or another request's generation)
+        """
+        context = await self._plan_context(user_dict, priority)
+        plan_data = await self.plan_cache.aget(context, plan_date)
+        if plan_data is not None:
+            return plan_data, True
+        
+        key = self._pending_key(context, plan_date)
+        pending = self._pending_plans.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._generate_cached_plan(context, plan_date, priority, fail_fast))
+            self._pending_plans[key] = pending
+            pending.add_done_callback(lambda _: self._pending_plans.pop(key, None))
+            plan_data, _ = await asyncio.shield(pending)
+            return plan_data, False
+        
+        plan_data, tokens = await asyncio.shield(pending)
+        self.plan_cache.record_coalesced(tokens)
+        return plan_data, True
+    
+    def plan_signature(self, user_data: Any) -> str:
+        """Signature of a request's bucketed context, stored with precomputed plans"""
+        user_dict = user_data.dict() if hasattr(user_data, 'dict') else user_data
+        return context_signature(canonical_context(user_dict, max_recent_activities=self.max_recent_activities))
+    
+    async def get_precomputed_plan(self, user_data: Any, plan_date: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Plan generated ahead of time for a user, if it was generated for the same request context
+        
+        Args:
+            user_data: DailyPlanRequest object
+            plan_date: Plan date (YYYY-MM-DD), defaults to today
+            
+        Returns:
+            Stored DailyPlanResponse payload or None
+        """
+        user_dict = user_data.dict() if hasattr(user_data, 'dict') else user_data
+        return await asyncio.to_thread(
+            self.plan_store.get,
+            user_dict["user_id"],
+            plan_date or datetime.now().strftime("%Y-%m-%d"),
+            self.plan_signature(user_dict)
+        )
+    
+    async def generate_daily_plan(self, user_data: Any, plan_date: Optional[str] = None,
+                                  priority: int = PRIORITY_INTERACTIVE, fallback: bool = True) -> Dict[str, Any]:
         """
         Generate personalized daily wellness plan using OpenAI - strict mode
         
         Args:
             user_data: DailyPlanRequest object with user preferences and history
+            plan_date: Date to plan for (YYYY-MM-DD), defaults to today
+            priority: LLM gateway priority; background jobs pass PRIORITY_BATCH
+            fallback: Serve a template plan when the LLM gateway is saturated (if the policy allows);
+                precompute jobs pass False to get LLMRateLimitError and retry later instead
             
         Returns:
             Dictionary with daily plan and motivational content
         """
-        if not self.openai_client:
-            raise Exception("OpenAI client not initialized")
-            
         # Convert Pydantic model to dict
         if hasattr(user_data, 'dict'):
             user_dict = user_data.dict()
         else:
             user_dict = user_data
         
-        # Generate plan using OpenAI
-        user_prompt = self._create_user_prompt(user_dict)
-        plan_data = await self._call_openai(user_prompt)
+        plan_date = plan_date or datetime.now().strftime("%Y-%m-%d")
+        
+        if self._use_template(user_dict):
+            return self._build_plan_response(user_dict, plan_date, self._template_plan(user_dict, "template"))
+        
+        if not self.openai_client:
+            raise Exception("OpenAI client not initialized")
+        
+        # Generate plan using OpenAI, or reuse one generated for the same context and date;
+        # with a template fallback a saturated gateway is detected before queueing
+        fail_fast = fallback and self.template_planner is not None
+        try:
+            if self.plan_cache is not None:
+                plan_data, cached = await self._get_cached_plan(user_dict, plan_date, priority, fail_fast)
+            else:
+                user_prompt = self._create_user_prompt(user_dict)
+                plan_data, _ = await self._call_openai(user_prompt, priority, fail_fast)
+                cached = False
+            self.route_counts["cache" if cached else "llm"] += 1
+        except LLMRateLimitError as e:
+            if not fallback:
+                raise
+            plan_data = self._fallback_plan(user_dict, e)
         
+        return self._build_plan_response(user_dict, plan_date, plan_data)
+    
+    @staticmethod
+    def _build_plan_response(user_dict: Dict[str, Any], plan_date: str, plan_data: Dict[str, Any]) -> Dict[str, Any]:
+        """DailyPlanResponse payload from a parsed model plan"""
         # Calculate total time
         total_time = sum(item.get("duration_minutes", 0) for item in plan_data.get("daily_items", []))
         
         # Add metadata
-        today = datetime.now().strftime("%Y-%m-%d")
-        
         return {
             "user_id": user_dict["user_id"],
-            "plan_date": today,
+            "plan_date": plan_date,
             "motivational_message": plan_data.get("motivational_message", "Have a great wellness day!"),
             "daily_items": plan_data.get("daily_items", []),
             "estimated_total_time": total_time,
             "follow_up_time": plan_data.get("follow_up_time", "evening")
         }
     
+    async def _stream_openai(self, user_prompt: str, priority: int,
+                             fail_fast: bool = False) -> AsyncIterator[Tuple[str, Optional[int], Any]]:
+        """
+        Stream a plan from OpenAI, yielding parser events as fields complete and finally (None, None, (plan, tokens))
+        """
+        messages = self._messages(user_prompt)
+        estimated_tokens = self._estimated_tokens(messages)
+        if fail_fast:
+            self._check_capacity(estimated_tokens, priority, "chat.daily_plan_stream")
+        # The gateway retries opening the stream and holds its concurrency slot until the stream closes
+        chunks = self.llm_gateway.stream(
+            lambda: self.openai_client.chat.completions.create(
+                messages=messages,
+                stream=True,
+                stream_options={"include_usage": True},
+                **self._completion_options()
+            ),
+            estimated_tokens=estimated_tokens,
+            priority=priority,
+            operation="chat.daily_plan_stream"
+        )
+        
+        parser = JSONStreamParser()
+        tokens = 0
+        # Closing the chunks releases the slot and pooled connection even when the client disconnects or parsing fails
+        async with aclosing(chunks):
+            async for chunk in chunks:
+                if getattr(chunk, "usage", None):
+                    tokens = chunk.usage.total_tokens
+                if not chunk.choices or not chunk.choices[0].delta.content:
+                    continue
+                for event in parser.feed(chunk.choices[0].delta.content):
+                    yield event
+        
+        try:
+            plan_data = parser.result()
+        except ValueError as e:
+            logger.error(f"Streamed OpenAI response is not a complete JSON object: {str(e)}")
+            raise Exception("Invalid JSON response from OpenAI")
+        yield None, None, (plan_data, tokens)
+    
+    async def stream_daily_plan(self, user_data: Any, plan_date: Optional[str] = None,
+                                priority: int = PRIORITY_INTERACTIVE) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Generate a daily plan, yielding each part as soon as the model has written it
+        
+        Args:
+            user_data: DailyPlanRequest object with user preferences and history
+            plan_date: Date to plan for (YYYY-MM-DD), defaults to today
+            priority: LLM gateway priority
+            
+        Yields:
+            ("message", {"motivational_message"}), then ("item", daily item) per activity,
+            then ("plan", full DailyPlanResponse payload)
+        """
+        user_dict = user_data.dict() if hasattr(user_data, 'dict') else user_data
+        plan_date = plan_date or datetime.now().strftime("%Y-%m-%d")
+        
+        if self._use_template(user_dict):
+            for event in self.plan_events(self._build_plan_response(user_dict, plan_date, self._template_plan(user_dict, "template"))):
+                yield event
+            return
+        
+        if not self.openai_client:
+            raise Exception("OpenAI client not initialized")
+        
+        started = False
+        try:
+            fail_fast = self.template_planner is not None
+            async with aclosing(self._stream_llm_plan(user_dict, plan_date, priority, fail_fast)) as events:
+                async for event in events:
+                    started = True
+                    yield event
+        except LLMRateLimitError as e:
+            # Capacity errors surface before the first event; a plan half-streamed from GPT is never mixed
+            if started:
+                raise
+            plan_data = self._fallback_plan(user_dict, e)
+            for event in self.plan_events(self._build_plan_response(user_dict, plan_date, plan_data)):
+                yield event
+    
+    async def _stream_llm_plan(self, user_dict: Dict[str, Any], plan_date: str, priority: int,
+                               fail_fast: bool) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """stream_daily_plan events from the plan cache or a streamed OpenAI completion"""
+        # Cached and in-flight plans are replayed at once
+        context = None
+        if self.plan_cache is not None:
+            context = await self._plan_context(user_dict, priority)
+            plan_data = await self.plan_cache.aget(context, plan_date)
+            pending = self._pending_plans.get(self._pending_key(context, plan_date))
+            if plan_data is None and pending is not None:
+                plan_data, tokens = await asyncio.shield(pending)
+                self.plan_cache.record_coalesced(tokens)
+            if plan_data is not None:
+                self.route_counts["cache"] += 1
+                for event in self.plan_events(self._build_plan_response(user_dict, plan_date, plan_data)):
+                    yield event
+                return
+        
+        # Register the generation so concurrent requests for the same context share it
+        shared = None
+        if context is not None:
+            pending_key = self._pending_key(context, plan_date)
+            shared = asyncio.get_running_loop().create_future()
+            # Mark failures as retrieved when nobody else was waiting on them
+            shared.add_done_callback(lambda future: future.cancelled() or future.exception())
+            self._pending_plans[pending_key] = shared
+        
+        user_prompt = self._create_user_prompt(context if context is not None else user_dict)
+        try:
+            async with aclosing(self._stream_openai(user_prompt, priority, fail_fast)) as events:
+                async for key, index, value in events:
+                    if key == "motivational_message" and index is None:
+                        yield "message", {"motivational_message": value}
+                    elif key == "daily_items" and index is not None:
+                        yield "item", value
+                    elif key is None:
+                        plan_data, tokens = value
+                        self.route_counts["llm"] += 1
+                        if shared is not None:
+                            shared.set_result((plan_data, tokens))
+                            await self.plan_cache.aset(context, plan_date, plan_data, tokens)
+                        yield "plan", self._build_plan_response(user_dict, plan_date, plan_data)
+        except Exception as e:
+            if shared is not None and not shared.done():
+                shared.set_exception(e)
+            raise
+        finally:
+            if shared is not None:
+                if not shared.done():
+                    shared.set_exception(Exception("Streamed plan generation ended before the plan was complete"))
+                if self._pending_plans.get(pending_key) is shared:
+                    del self._pending_plans[pending_key]
+    
+    @staticmethod
+    def plan_events(plan: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+        """The stream_daily_plan events for an already complete DailyPlanResponse payload"""
+        events = [("message", {"motivational_message": plan["motivational_message"]})]
+        events.extend(("item", item) for item in plan["daily_items"])
+        events.append(("plan", plan))
+        return events
+    
     def is_ready(self) -> bool:
         """Check if the micro-coach is ready to use"""
-        return self.openai_client is not None
+        return self.openai_client is not None or self.plan_routing_policy == "template"
+    
+    def get_status(self) -> Dict[str, Any]:
+        """Readiness and plan cache hit rate and saved tokens"""
+        return {
+            "openai_client_ready": self.openai_client is not None,
+            "model": self.model_name,
+            "structured_output": self.structured_output,
+            "plan_cache": self.plan_cache.stats() if self.plan_cache is not None else None,
+            "plan_store": self.plan_store.stats(),
+            "routing": {
+                "policy": self.plan_routing_policy,
+                "template_max_minutes": self.template_max_minutes,
+                "template_planner_ready": self.template_planner is not None,
+                "plans_by_route": dict(self.route_counts)
+            },
+            "llm_gateway": self.llm_gateway.stats(),
+            "fully_ready": self.is_ready()
+        }
@@ -0,0 +1,71 @@
+"""
+Compact model artifact format: a JSON header followed by raw, aligned NumPy arrays
+
+Layout:
+    8 bytes   magic b"WELLIAR1"
+    8 bytes   little-endian uint64 header length
+    N bytes   UTF-8 JSON header {"metadata": {...}, "arrays": {name: {dtype, shape, offset}}}
+    ...       array buffers, each starting on a 64-byte boundary (offsets from file start)
+
+Loading memory-maps the file and returns read-only array views into it, so there is
+no deserialization and pages are shared by every process that maps the same file.
+"""
+
+import json
+import os
+import struct
+import numpy as np
+from pathlib import Path
+from typing import Any, Dict, Tuple, Union
+
+MAGIC = b"WELLIAR1"
+ALIGNMENT = 64
+
+def _aligned(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def save_array_artifact(path: Union[str, Path], arrays: Dict[str, np.ndarray], metadata: Dict[str, Any]):
+    """Write arrays and JSON-serializable metadata to path atomically"""
+    path = Path(path)
+    arrays = {name: np.ascontiguousarray(array) for name, array in arrays.items()}
+
+    # Offsets depend on the header length, so lay out until the header size is stable
+    header_length = 0
+    while True:
+        offset = _aligned(len(MAGIC) + 8 + header_length)
+        layout = {}
+        for name, array in arrays.items():
+            layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+            offset = _aligned(offset + array.nbytes)
+        header = json.dumps({"metadata": metadata, "arrays": layout}).encode("utf-8")
+        if len(header) == header_length:
+            break
+        header_length = len(header)
+
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(layout[name]["offset"])
+            f.write(array.tobytes())
+    os.replace(tmp_path, path)
+
+def load_array_artifact(path: Union[str, Path]) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """Memory-map an artifact and return (read-only arrays, metadata)"""
+    buffer = np.memmap(path, dtype=np.uint8, mode="r")
+    if bytes(buffer[:len(MAGIC)]) != MAGIC:
+        raise ValueError(f"{path} is not a Welli array artifact")
+
+    (header_length,) = struct.unpack("<Q", bytes(buffer[len(MAGIC):len(MAGIC) + 8]))
+    header_start = len(MAGIC) + 8
+    header = json.loads(bytes(buffer[header_start:header_start + header_length]).decode("utf-8"))
+
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        array = np.frombuffer(buffer, dtype=dtype, count=count, offset=spec["offset"])
+        arrays[name] = array.reshape(spec["shape"])
+    return arrays, header["metadata"]
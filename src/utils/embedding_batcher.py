@@ -0,0 +1,99 @@
+"""
+Asyncio micro-batching of embedding requests into multi-input API calls
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+class EmbeddingBatcher:
+    """
+    Coalesces texts submitted within a short window into one embeddings call.
+
+    Each caller awaits its own future; a batch is flushed when it reaches
+    max_batch_size or max_wait_ms after its first text arrived, whichever
+    comes first. Identical texts in a batch are only embedded once.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], Awaitable[List[List[float]]]],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0
+    ):
+        self.embed_fn = embed_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_ms / 1000.0
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.requests = 0
+        self.batches = 0
+        self.embedded_texts = 0
+
+    async def embed(self, text: str) -> List[float]:
+        """Embed a single text as part of the next batch"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        self.requests += 1
+
+        if len(self._pending) >= self.max_batch_size:
+            self._schedule_flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait_seconds, self._schedule_flush)
+
+        return await future
+
+    def _schedule_flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = asyncio.get_running_loop().create_task(self._flush(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush(self, batch: List[Tuple[str, asyncio.Future]]):
+        """Send one embeddings call for the batch and fan results back out"""
+        unique_texts = list(dict.fromkeys(text for text, _ in batch))
+        self.batches += 1
+        self.embedded_texts += len(unique_texts)
+
+        try:
+            embeddings = await self.embed_fn(unique_texts)
+            if len(embeddings) != len(unique_texts):
+                raise ValueError(f"Expected {len(unique_texts)} embeddings, got {len(embeddings)}")
+            by_text = dict(zip(unique_texts, embeddings))
+            for text, future in batch:
+                if not future.done():
+                    future.set_result(by_text[text])
+        except Exception as e:
+            logger.error(f"Batched embedding call failed for {len(batch)} requests: {str(e)}")
+            self._fail(batch, e)
+        finally:
+            # Cancellation or any other early exit must not leave callers waiting forever
+            self._fail(batch, Exception("Batched embedding call ended without a result"))
+
+    @staticmethod
+    def _fail(batch: List[Tuple[str, asyncio.Future]], error: BaseException):
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    def stats(self) -> Dict[str, Any]:
+        """Request, batch and API call counters"""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_seconds * 1000.0,
+            "requests": self.requests,
+            "batches": self.batches,
+            "embedded_texts": self.embedded_texts,
+            "avg_batch_size": self.requests / self.batches if self.batches else 0.0
+        }
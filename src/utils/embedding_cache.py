@@ -0,0 +1,173 @@
+"""
+Bounded LRU + TTL cache for query embeddings, keyed by normalized text
+"""
+
+import asyncio
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from typing import Any, Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+class EmbeddingCache:
+    """
+    In-process LRU cache for embeddings with per-entry TTL and an optional shared backend.
+
+    The shared backend only needs the redis-py subset ``get(key)`` and
+    ``set(key, value, ex=ttl_seconds)``, so several workers can share hits.
+    Async callers use aget/aset, which run backend round-trips in a worker
+    thread so a slow backend never blocks the event loop.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        max_size: int = 1024,
+        ttl_seconds: float = 86400,
+        backend: Optional[Any] = None,
+        namespace: str = "goal-embedding"
+    ):
+        self.model = model
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self.namespace = namespace
+        self._entries: "OrderedDict[str, Tuple[float, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.backend_hits = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Lowercase, drop punctuation and collapse whitespace"""
+        return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+    def _key(self, text: str) -> str:
+        digest = hashlib.sha1(self.normalize(text).encode("utf-8")).hexdigest()
+        return f"{self.namespace}:{self.model}:{digest}"
+
+    def _local_get(self, key: str, now: float) -> Optional[np.ndarray]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, embedding = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return embedding
+                del self._entries[key]
+        return None
+
+    def _record_backend(self, key: str, embedding: Optional[np.ndarray], now: float):
+        with self._lock:
+            if embedding is None:
+                self.misses += 1
+                return
+            self.hits += 1
+            self.backend_hits += 1
+            self._store(key, embedding, now)
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        """Return the cached embedding for text, or None on a miss"""
+        key = self._key(text)
+        now = time.monotonic()
+        embedding = self._local_get(key, now)
+        if embedding is not None:
+            return embedding
+
+        embedding = self._backend_get(key)
+        self._record_backend(key, embedding, now)
+        return embedding
+
+    async def aget(self, text: str) -> Optional[np.ndarray]:
+        """Async variant of get; a backend lookup runs in a worker thread"""
+        key = self._key(text)
+        now = time.monotonic()
+        embedding = self._local_get(key, now)
+        if embedding is not None:
+            return embedding
+
+        embedding = await asyncio.to_thread(self._backend_get, key) if self.backend is not None else None
+        self._record_backend(key, embedding, now)
+        return embedding
+
+    def _prepare(self, text: str, embedding: np.ndarray) -> Tuple[str, np.ndarray]:
+        key = self._key(text)
+        embedding = np.asarray(embedding, dtype=np.float32)
+        embedding.setflags(write=False)
+
+        with self._lock:
+            self._store(key, embedding, time.monotonic())
+        return key, embedding
+
+    def set(self, text: str, embedding: np.ndarray):
+        """Cache an embedding locally and in the shared backend"""
+        self._backend_set(*self._prepare(text, embedding))
+
+    async def aset(self, text: str, embedding: np.ndarray):
+        """Async variant of set; the backend write runs in a worker thread"""
+        key, embedding = self._prepare(text, embedding)
+        if self.backend is not None:
+            await asyncio.to_thread(self._backend_set, key, embedding)
+
+    def _store(self, key: str, embedding: np.ndarray, now: float):
+        self._entries[key] = (now + self.ttl_seconds, embedding)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _backend_get(self, key: str) -> Optional[np.ndarray]:
+        if self.backend is None:
+            return None
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Embedding cache backend get failed: {str(e)}")
+            return None
+        if value is None:
+            return None
+        return np.frombuffer(value, dtype=np.float32)
+
+    def _backend_set(self, key: str, embedding: np.ndarray):
+        if self.backend is None:
+            return
+        try:
+            self.backend.set(key, embedding.tobytes(), ex=max(1, int(self.ttl_seconds)))
+        except Exception as e:
+            logger.warning(f"Embedding cache backend set failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "backend_hits": self.backend_hits,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "shared_backend": self.backend is not None
+            }
+
+def create_shared_backend(url: Optional[str]) -> Optional[Any]:
+    """Create a Redis backend for shared caches if a URL is configured and redis is installed"""
+    if not url:
+        return None
+    try:
+        import redis
+    except ImportError:
+        logger.warning("Shared cache backend requested but redis is not installed. Install with: pip install redis")
+        return None
+    try:
+        return redis.Redis.from_url(url)
+    except Exception as e:
+        logger.warning(f"Could not connect shared cache backend: {str(e)}")
+        return None
@@ -0,0 +1,169 @@
+"""
+Persistent on-disk store for content catalog embeddings, keyed by content hash
+"""
+
+import hashlib
+import os
+import time
+import numpy as np
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+import logging
+from src.utils.model_loader import ModelLoader
+
+logger = logging.getLogger(__name__)
+
+# Files of other catalog versions are only pruned once unused for this long (mtime, refreshed on load)
+STALE_VERSION_SECONDS = 7 * 24 * 3600
+
+class EmbeddingStore:
+    """
+    Stores catalog embeddings as a float32 .npy matrix plus a JSON manifest of
+    item id -> text hash, so only new or edited items need to be re-embedded.
+
+    Files are written to a temporary path and renamed into place, so readers never
+    map a partial matrix. Workers on different catalog versions (e.g. during a
+    rolling deploy) can share the directory: other versions' files are only pruned
+    after stale_seconds without being written or loaded.
+    """
+
+    def __init__(self, model: str, dimension: int, base_path: str = "data/embeddings",
+                 stale_seconds: float = STALE_VERSION_SECONDS):
+        self.model = model
+        self.dimension = dimension
+        self.stale_seconds = stale_seconds
+        self.model_loader = ModelLoader(base_path=base_path)
+        self.base_path = self.model_loader.base_path
+        self.manifest_file = f"{model}.manifest.json"
+
+    @staticmethod
+    def hash_text(text: str) -> str:
+        """Stable content hash for a single embedding input"""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def catalog_version(text_hashes: List[str]) -> str:
+        """Version identifier for an ordered list of item text hashes"""
+        digest = hashlib.sha256("\n".join(text_hashes).encode("utf-8"))
+        return digest.hexdigest()[:16]
+
+    def _embeddings_file(self, version: str) -> str:
+        return f"{self.model}-{version}.npy"
+
+    def index_path(self, version: str) -> Path:
+        """Location of the FAISS index snapshot for a catalog version"""
+        return self.base_path / f"{self.model}-{version}.faiss"
+
+    def _load_existing(self) -> Tuple[Dict[str, int], Optional[np.ndarray], Optional[str]]:
+        """Load the stored manifest and memory-mapped embeddings, if they are usable"""
+        if not self.model_loader.model_exists(self.manifest_file):
+            return {}, None, None
+
+        manifest = self.model_loader.load_json_data(self.manifest_file)
+        if not manifest or manifest.get("model") != self.model or manifest.get("dimension") != self.dimension:
+            logger.info("Embedding store manifest missing or stale, re-embedding catalog")
+            return {}, None, None
+
+        try:
+            embeddings = np.load(self.base_path / manifest["embeddings_file"], mmap_mode="r")
+        except Exception as e:
+            logger.warning(f"Could not load stored embeddings: {str(e)}")
+            return {}, None, None
+
+        items = manifest.get("items", [])
+        if embeddings.dtype != np.float32 or embeddings.shape != (len(items), self.dimension):
+            logger.warning("Stored embeddings do not match manifest, re-embedding catalog")
+            return {}, None, None
+
+        self.touch_version(manifest.get("version"))
+        rows = {item["text_hash"]: row for row, item in enumerate(items)}
+        return rows, embeddings, manifest.get("version")
+
+    def touch_version(self, version: str):
+        """Mark a catalog version's matrix and index snapshot as in use so other workers do not prune them"""
+        for path in (self.base_path / self._embeddings_file(version), self.index_path(version)):
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+
+    def get_embeddings(
+        self,
+        items: List[Tuple[str, str]],
+        embed_fn: Callable[[List[str]], List[List[float]]]
+    ) -> np.ndarray:
+        """
+        Return embeddings for catalog items, embedding only those not already stored
+
+        Args:
+            items: Ordered (item_id, text) pairs to embed
+            embed_fn: Callable that embeds a list of texts in a single request
+
+        Returns:
+            float32 array of shape (len(items), dimension) in input order
+        """
+        text_hashes = [self.hash_text(text) for _, text in items]
+        version = self.catalog_version(text_hashes)
+        stored_rows, stored, stored_version = self._load_existing()
+
+        # Unchanged catalog: serve the memory-mapped matrix directly
+        if stored is not None and stored_version == version:
+            logger.info(f"Loaded {len(items)} catalog embeddings from store (version {version})")
+            return stored
+
+        missing = [i for i, text_hash in enumerate(text_hashes) if text_hash not in stored_rows]
+        embeddings = np.empty((len(items), self.dimension), dtype=np.float32)
+
+        for i, text_hash in enumerate(text_hashes):
+            if text_hash in stored_rows:
+                embeddings[i] = stored[stored_rows[text_hash]]
+
+        if missing:
+            new_embeddings = embed_fn([items[i][1] for i in missing])
+            embeddings[missing] = np.asarray(new_embeddings, dtype=np.float32)
+
+        logger.info(f"Embedded {len(missing)} new or changed items, reused {len(items) - len(missing)} from store")
+        self._save(items, text_hashes, version, embeddings)
+        return embeddings
+
+    def _save(self, items: List[Tuple[str, str]], text_hashes: List[str], version: str, embeddings: np.ndarray):
+        """Write the embeddings matrix first, then point the manifest at it"""
+        embeddings_file = self._embeddings_file(version)
+        embeddings_path = self.base_path / embeddings_file
+        tmp_path = embeddings_path.with_name(f"{embeddings_file}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                np.save(f, embeddings)
+            os.replace(tmp_path, embeddings_path)
+        except Exception as e:
+            tmp_path.unlink(missing_ok=True)
+            logger.error(f"Error saving embeddings store: {str(e)}")
+            return
+
+        manifest = {
+            "model": self.model,
+            "dimension": self.dimension,
+            "version": version,
+            "embeddings_file": embeddings_file,
+            "items": [
+                {"id": item_id, "text_hash": text_hash}
+                for (item_id, _), text_hash in zip(items, text_hashes)
+            ]
+        }
+        if not self.model_loader.save_json_data(manifest, self.manifest_file):
+            return
+
+        self._prune(version)
+
+    def _prune(self, version: str):
+        """Drop matrices and index snapshots of other catalog versions that nobody has used for stale_seconds"""
+        cutoff = time.time() - self.stale_seconds
+        for pattern in (f"{self.model}-*.npy", f"{self.model}-*.faiss"):
+            for stale in self.base_path.glob(pattern):
+                if stale.stem == f"{self.model}-{version}":
+                    continue
+                try:
+                    if stale.stat().st_mtime < cutoff:
+                        stale.unlink()
+                except OSError:
+                    pass
@@ -0,0 +1,16 @@
+"""
+Process-wide environment configuration
+"""
+
+from functools import lru_cache
+from dotenv import load_dotenv
+
+@lru_cache(maxsize=None)
+def load_environment() -> bool:
+    """
+    Load variables from the .env file into os.environ once per process
+    
+    Returns:
+        True if a .env file was found; repeat calls return the first result without re-reading it
+    """
+    return load_dotenv()
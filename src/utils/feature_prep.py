@@ -3,11 +3,37 @@ Feature preparation utilities for ML models
 """
 
 import numpy as np
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Sequence
 import logging
 
 logger = logging.getLogger(__name__)
 
+def scale_features(scaler: Any, features: np.ndarray, feature_names: Sequence[str]) -> np.ndarray:
+    """
+    Apply a fitted StandardScaler to a feature matrix whose columns are feature_names
+    
+    Same arithmetic as scaler.transform, but checks the column order against the names
+    the scaler was fitted with instead of requiring a DataFrame (sklearn warns on bare arrays).
+    
+    Args:
+        scaler: Fitted StandardScaler
+        features: (N, len(feature_names)) raw feature matrix
+        feature_names: Column names of features, in order
+        
+    Returns:
+        Scaled copy of features
+    """
+    fitted_names = getattr(scaler, "feature_names_in_", None)
+    if fitted_names is not None and list(fitted_names) != list(feature_names):
+        raise ValueError(f"Scaler was fitted on features {list(fitted_names)}, got {list(feature_names)}")
+    
+    scaled = np.array(features, dtype=np.float64)
+    if scaler.with_mean:
+        scaled -= scaler.mean_
+    if scaler.with_std:
+        scaled /= scaler.scale_
+    return scaled
+
 class FeaturePreparator:
     """Utility class for preparing features for ML models"""
     
@@ -43,6 +69,28 @@ class FeaturePreparator:
             logger.error(f"Error preparing clustering features: {str(e)}")
             return np.zeros((1, 6))
     
+    def prepare_clustering_features_batch(self, users: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Prepare clustering features for many users at once
+        
+        Args:
+            users: List of dictionaries containing user behavior data
+            
+        Returns:
+            numpy array of shape (len(users), 6), one row per user in input order
+        """
+        features = np.zeros((len(users), 6))
+        for row, user_data in enumerate(users):
+            features[row] = (
+                user_data.get("session_count", 0),
+                user_data.get("avg_session_duration", 0.0),
+                user_data.get("streak_length", 0),
+                self.time_encoding.get(user_data.get("preferred_time_of_day", "morning"), 0),
+                user_data.get("content_engagement_rate", 0.0),
+                user_data.get("notification_response_rate", 0.0)
+            )
+        return features
+    
     def prepare_churn_features(self, user_data: Dict[str, Any]) -> np.ndarray:
         """
         Prepare features for churn prediction
@@ -69,3 +117,27 @@ class FeaturePreparator:
         except Exception as e:
             logger.error(f"Error preparing churn features: {str(e)}")
             return np.zeros((1, 8))
+    
+    def prepare_churn_features_batch(self, users: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Prepare churn features for many users at once
+        
+        Args:
+            users: List of dictionaries containing user behavior data
+            
+        Returns:
+            numpy array of shape (len(users), 8), one row per user in input order
+        """
+        features = np.zeros((len(users), 8))
+        for row, user_data in enumerate(users):
+            features[row] = (
+                user_data.get("days_since_signup", 0),
+                user_data.get("total_sessions", 0),
+                user_data.get("avg_session_duration", 0.0),
+                user_data.get("streak_length", 0),
+                user_data.get("last_login_days_ago", 0),
+                user_data.get("content_completion_rate", 0.0),
+                user_data.get("notification_response_rate", 0.0),
+                user_data.get("goal_progress_percentage", 0.0)
+            )
+        return features
@@ -0,0 +1,234 @@
+"""
+Compiles a fitted sklearn RandomForestClassifier into flat NumPy node arrays with vectorized traversal
+"""
+
+import numpy as np
+from typing import Any, Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Rows traversed together; keeps the (rows, n_trees) node and gather arrays cache-sized for large batches
+CHUNK_ROWS = 512
+
+class CompiledForest:
+    """
+    Flat-array random forest for fast, dependency-light predict_proba.
+
+    All trees are concatenated into one set of node arrays. Leaves point to
+    themselves, so every row walks every tree for exactly max_depth steps with
+    no per-tree Python loop. Probabilities are bit-identical to sklearn: inputs
+    are compared as float32, leaf values are normalized the same way, and tree
+    outputs are summed sequentially in estimator order before averaging.
+    """
+
+    def __init__(
+        self,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        left: np.ndarray,
+        right: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        max_depth: int,
+        n_features: int,
+        input_dtype: type = np.float32,
+        children: Optional[np.ndarray] = None
+    ):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.n_features = n_features
+        # sklearn compares float32 inputs; forests with fused scalers compare raw float64 inputs
+        self.input_dtype = input_dtype
+        self.n_trees = len(roots)
+        self.n_classes = value.shape[1]
+        # children[2 * node + went_left] gives the next node in a single gather
+        if children is None:
+            children = np.stack([right, left], axis=1).ravel()
+        # asarray leaves memory-mapped intp arrays in place instead of copying them
+        self._children = np.asarray(children, dtype=np.intp)
+        self._feature = np.asarray(feature, dtype=np.intp)
+        self._roots = np.asarray(roots, dtype=np.intp)
+
+        # Never written after construction; read-only keeps pages shared across forked workers
+        for array in (self.feature, self.threshold, self.left, self.right, self.value, self.roots,
+                      self._children, self._feature, self._roots):
+            array.setflags(write=False)
+
+    @classmethod
+    def from_sklearn(cls, forest: Any) -> "CompiledForest":
+        """Flatten the estimators of a fitted single-output RandomForestClassifier"""
+        if getattr(forest, "n_outputs_", 1) != 1:
+            raise ValueError("Only single-output forests can be compiled")
+
+        n_classes = int(forest.n_classes_)
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            node_ids = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+
+            # Leaves loop back to themselves so traversal can run a fixed number of steps
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold).astype(np.float64))
+            lefts.append((np.where(is_leaf, node_ids, tree.children_left) + offset).astype(np.int32))
+            rights.append((np.where(is_leaf, node_ids, tree.children_right) + offset).astype(np.int32))
+
+            # Same normalization as DecisionTreeClassifier.predict_proba
+            proba = tree.value[:, 0, :n_classes].astype(np.float64)
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(proba / normalizer)
+
+            roots.append(offset)
+            offset += tree.node_count
+            max_depth = max(max_depth, int(tree.max_depth))
+
+        compiled = cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            value=np.ascontiguousarray(np.concatenate(values)),
+            roots=np.asarray(roots, dtype=np.int32),
+            max_depth=max_depth,
+            n_features=int(forest.n_features_in_)
+        )
+        logger.info(f"Compiled forest with {compiled.n_trees} trees and {offset} nodes")
+        return compiled
+
+    def to_arrays(self) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+        """Node arrays and scalar attributes, in the layout from_arrays expects"""
+        arrays = {
+            "feature": self._feature,
+            "threshold": self.threshold,
+            "left": self.left,
+            "right": self.right,
+            "value": self.value,
+            "roots": self._roots,
+            "children": self._children
+        }
+        metadata = {
+            "max_depth": self.max_depth,
+            "n_features": self.n_features,
+            "input_dtype": np.dtype(self.input_dtype).name
+        }
+        return arrays, metadata
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], metadata: Dict[str, Any]) -> "CompiledForest":
+        """Rebuild a forest from to_arrays output, e.g. memory-mapped from an array artifact"""
+        return cls(
+            feature=arrays["feature"],
+            threshold=arrays["threshold"],
+            left=arrays["left"],
+            right=arrays["right"],
+            value=arrays["value"],
+            roots=arrays["roots"],
+            max_depth=int(metadata["max_depth"]),
+            n_features=int(metadata["n_features"]),
+            input_dtype=np.dtype(metadata["input_dtype"]).type,
+            children=arrays.get("children")
+        )
+
+    def fuse_scaler(self, mean: np.ndarray, scale: np.ndarray) -> "CompiledForest":
+        """
+        Fold a StandardScaler into the split thresholds so raw features can be fed directly
+
+        Each split "float32((x - mean) / scale) <= threshold" is monotone in x, so it is
+        equivalent to "x <= boundary" for the largest float64 boundary that still passes.
+        Boundaries are found by bisection, which keeps predictions bit-identical to
+        running the scaler and then the forest.
+        """
+        if self.input_dtype != np.float32:
+            raise ValueError("Scaler is already fused into this forest")
+
+        mean = np.asarray(mean, dtype=np.float64)[self.feature]
+        scale = np.asarray(scale, dtype=np.float64)[self.feature]
+        threshold = self.threshold
+
+        def passes(x):
+            return ((x - mean) / scale).astype(np.float32) <= threshold
+
+        # Bracket the boundary around the algebraic answer, widening until it holds
+        guess = threshold * scale + mean
+        step = (np.abs(guess) + scale) * 2.0 ** -16
+        low, high = guess - step, guess + step
+        for _ in range(64):
+            low_fails, high_passes = ~passes(low), passes(high)
+            if not (low_fails.any() or high_passes.any()):
+                break
+            low = np.where(low_fails, low - step, low)
+            high = np.where(high_passes, high + step, high)
+            step *= 2.0
+        else:
+            raise ValueError("Could not bracket fused split thresholds")
+
+        # Bisect until low and high are adjacent floats
+        for _ in range(2048):
+            mid = low + (high - low) / 2.0
+            open_interval = (mid != low) & (mid != high)
+            if not open_interval.any():
+                break
+            mid_passes = passes(mid)
+            low = np.where(open_interval & mid_passes, mid, low)
+            high = np.where(open_interval & ~mid_passes, mid, high)
+
+        return CompiledForest(
+            feature=self.feature,
+            threshold=low,
+            left=self.left,
+            right=self.right,
+            value=self.value,
+            roots=self.roots,
+            max_depth=self.max_depth,
+            n_features=self.n_features,
+            input_dtype=np.float64
+        )
+
+    def _check_input(self, X: np.ndarray) -> np.ndarray:
+        X = np.ascontiguousarray(X, dtype=self.input_dtype)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected input of shape (N, {self.n_features}), got {X.shape}")
+        return X
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """Leaf node index reached in every tree, shape (N, n_trees)"""
+        X = self._check_input(X)
+        if X.shape[0] <= CHUNK_ROWS:
+            return self._apply_chunk(X)
+        return np.concatenate([self._apply_chunk(X[start:start + CHUNK_ROWS])
+                               for start in range(0, X.shape[0], CHUNK_ROWS)])
+
+    def _apply_chunk(self, X: np.ndarray) -> np.ndarray:
+        flat_X = X.ravel()
+        row_offsets = (np.arange(X.shape[0], dtype=np.intp) * self.n_features)[:, np.newaxis]
+        nodes = np.broadcast_to(self._roots, (X.shape[0], self.n_trees))
+
+        for _ in range(self.max_depth):
+            values = np.take(flat_X, row_offsets + np.take(self._feature, nodes))
+            went_left = values <= np.take(self.threshold, nodes)
+            nodes = np.take(self._children, 2 * nodes + went_left)
+
+        return nodes
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Class probabilities averaged over trees, shape (N, n_classes)"""
+        X = self._check_input(X)
+        proba = np.empty((X.shape[0], self.n_classes), dtype=np.float64)
+        for start in range(0, X.shape[0], CHUNK_ROWS):
+            leaves = self._apply_chunk(X[start:start + CHUNK_ROWS])
+            # Adding trees one at a time in estimator order matches sklearn's summation exactly
+            total = np.zeros((leaves.shape[0], self.n_classes), dtype=np.float64)
+            for tree in range(self.n_trees):
+                total += np.take(self.value, leaves[:, tree], axis=0)
+            proba[start:start + CHUNK_ROWS] = total / self.n_trees
+        return proba
@@ -0,0 +1,138 @@
+"""
+Incremental parser for JSON objects streamed token by token from an LLM
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+class JSONStreamParser:
+    """
+    Reports the fields of a streamed JSON object as soon as each one is complete.
+
+    Feed text chunks as they arrive; every complete top-level field is returned
+    as ``(key, None, value)``, and every complete element of a top-level array as
+    ``(key, index, value)`` before the array itself closes. Text before the opening
+    brace and after the closing one (e.g. markdown code fences) is ignored and
+    not kept; once the object has closed, further chunks are not scanned.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._expect_key = False
+        self._done = False
+        self._key: Optional[str] = None
+        self._key_start: Optional[int] = None
+        self._item_index = 0
+        # Start offset and kind ("scalar" or "compound") of the value tracked at each depth
+        self._starts: Dict[int, Tuple[int, str]] = {}
+        self._root_start: Optional[int] = None
+        self._root_end: Optional[int] = None
+
+    def _tracked(self, depth: int) -> bool:
+        """Whether values opening at this depth are reported: object fields and elements of their arrays"""
+        if depth == 1:
+            return not self._expect_key
+        return depth == 2 and self._stack[1] == "["
+
+    def _open(self, position: int, kind: str):
+        depth = len(self._stack)
+        if depth == 1 and self._expect_key:
+            self._key_start = position
+        elif self._tracked(depth) and depth not in self._starts:
+            self._starts[depth] = (position, kind)
+            if depth == 1:
+                self._item_index = 0
+
+    def _close(self, depth: int, end: int, kind: str, events: List[Tuple[str, Optional[int], Any]]):
+        start = self._starts.get(depth)
+        if start is None or start[1] != kind:
+            return
+        del self._starts[depth]
+        value = json.loads(self._text[start[0]:end])
+        if depth == 1:
+            events.append((self._key, None, value))
+        else:
+            events.append((self._key, self._item_index, value))
+            self._item_index += 1
+
+    def feed(self, chunk: str) -> List[Tuple[str, Optional[int], Any]]:
+        """
+        Consume the next chunk of text
+
+        Args:
+            chunk: Next piece of the streamed response
+
+        Returns:
+            (key, array index or None, value) for every field or array element completed by this chunk
+        """
+        events: List[Tuple[str, Optional[int], Any]] = []
+        if self._done:
+            # Anything after the top-level object (e.g. a closing code fence) is dropped, not buffered
+            return events
+        offset = len(self._text)
+        self._text += chunk
+
+        for position in range(offset, len(self._text)):
+            char = self._text[position]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._key_start is not None:
+                        self._key = json.loads(self._text[self._key_start:position + 1])
+                        self._key_start = None
+                    else:
+                        self._close(len(self._stack), position + 1, "string", events)
+                continue
+
+            if not self._stack:
+                if char == "{":
+                    self._root_start = position
+                    self._stack.append(char)
+                    self._expect_key = True
+                continue
+
+            if char in " \t\r\n":
+                self._close(len(self._stack), position, "scalar", events)
+            elif char == '"':
+                self._open(position, "string")
+                self._in_string = True
+            elif char in "{[":
+                self._open(position, "compound")
+                self._stack.append(char)
+            elif char in "}]":
+                self._close(len(self._stack), position, "scalar", events)
+                self._stack.pop()
+                if not self._stack:
+                    self._root_end = position + 1
+                    self._done = True
+                    self._text = self._text[:self._root_end]
+                    break
+                self._close(len(self._stack), position + 1, "compound", events)
+            elif char == ",":
+                self._close(len(self._stack), position, "scalar", events)
+                if len(self._stack) == 1:
+                    self._expect_key = True
+            elif char == ":":
+                if len(self._stack) == 1:
+                    self._expect_key = False
+            else:
+                self._open(position, "scalar")
+        return events
+
+    @property
+    def complete(self) -> bool:
+        """Whether the top-level object has been closed"""
+        return self._done
+
+    def result(self) -> Dict[str, Any]:
+        """Parse the complete object; raises ValueError if the stream ended before it closed"""
+        if not self._done:
+            raise ValueError(f"Incomplete JSON object after {len(self._text)} characters")
+        return json.loads(self._text[self._root_start:self._root_end])
@@ -0,0 +1,80 @@
+"""
+Lightweight nearest-centroid assignment for fitted KMeans models, in pure NumPy
+"""
+
+import numpy as np
+from typing import Any, Dict, Optional, Tuple
+
+class NearestCentroidKernel:
+    """
+    Nearest-centroid assignment without sklearn's per-call validation and threadpool setup.
+
+    Squared distances use the expansion ||x||^2 - 2 x.c + ||c||^2 with the
+    centroid norms precomputed once, and work for single rows or batches.
+    Optional per-feature weights give the metric sum_j w_j (x_j - c_j)^2.
+    """
+
+    def __init__(self, centers: np.ndarray, weights: Optional[np.ndarray] = None):
+        self.centers = np.ascontiguousarray(centers, dtype=np.float64)
+        self.n_clusters, self.n_features = self.centers.shape
+        self.weights = None if weights is None else np.asarray(weights, dtype=np.float64)
+
+        weighted_centers = self.centers if self.weights is None else self.centers * self.weights
+        self.centers_t = np.ascontiguousarray(weighted_centers.T)
+        self.center_sq_norms = np.einsum("ij,ij->i", weighted_centers, self.centers)
+        for array in (self.centers, self.centers_t, self.center_sq_norms, self.weights):
+            if array is not None:
+                array.setflags(write=False)
+
+    @classmethod
+    def from_sklearn(cls, kmeans: Any) -> "NearestCentroidKernel":
+        """Extract cluster_centers_ from a fitted sklearn KMeans"""
+        return cls(kmeans.cluster_centers_)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Centroids and optional metric weights, in the layout from_arrays expects"""
+        arrays = {"centers": self.centers}
+        if self.weights is not None:
+            arrays["weights"] = self.weights
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "NearestCentroidKernel":
+        """Rebuild a kernel from to_arrays output, e.g. memory-mapped from an array artifact"""
+        return cls(arrays["centers"], weights=arrays.get("weights"))
+
+    def fuse_scaler(self, mean: np.ndarray, scale: np.ndarray) -> "NearestCentroidKernel":
+        """
+        Fold a StandardScaler into the centroids and metric so raw features can be fed directly
+
+        ||(x - mean) / scale - c||^2 == sum_j (x_j - c'_j)^2 / scale_j^2 with c' = mean + scale * c
+        """
+        if self.weights is not None:
+            raise ValueError("Scaler is already fused into this kernel")
+        mean = np.asarray(mean, dtype=np.float64)
+        scale = np.asarray(scale, dtype=np.float64)
+        return NearestCentroidKernel(mean + scale * self.centers, weights=1.0 / scale ** 2)
+
+    def squared_distances(self, X: np.ndarray) -> np.ndarray:
+        """Squared (weighted) Euclidean distance from each row to each centroid, shape (N, n_clusters)"""
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected input of shape (N, {self.n_features}), got {X.shape}")
+
+        weighted_X = X if self.weights is None else X * self.weights
+        sq_distances = X @ self.centers_t
+        sq_distances *= -2.0
+        sq_distances += np.einsum("ij,ij->i", weighted_X, X)[:, np.newaxis]
+        sq_distances += self.center_sq_norms
+        # Cancellation can leave tiny negative values for points on a centroid
+        np.maximum(sq_distances, 0.0, out=sq_distances)
+        return sq_distances
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        """Euclidean distances to each centroid, like KMeans.transform"""
+        return np.sqrt(self.squared_distances(X))
+
+    def assign(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Nearest centroid label and Euclidean distances to all centroids for each row"""
+        distances = self.transform(X)
+        return distances.argmin(axis=1), distances
@@ -0,0 +1,566 @@
+"""
+Rate-limit-aware gateway for OpenAI calls: token buckets, priority scheduling, jittered retries and metrics
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from functools import lru_cache
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple, TypeVar
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Lower values are scheduled first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+class LLMRateLimitError(Exception):
+    """Raised when a call cannot be scheduled or keeps being rate limited; retry_after is in seconds"""
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """
+    Continuous-refill token bucket for per-minute limits.
+
+    The level may go negative when a call turns out to use more tokens than
+    estimated; later acquisitions then wait until the debt is refilled.
+    """
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount can be taken; 0 if it can be taken now"""
+        self._refill(now)
+        # Requests larger than the whole bucket only wait for a full bucket
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self.level -= amount
+
+    def adjust(self, delta: float):
+        """Return (positive) or charge (negative) tokens once actual usage is known"""
+        self.level = min(self.capacity, self.level + delta)
+
+class _Metrics:
+    """Rolling per-operation call metrics"""
+
+    def __init__(self, window: int = 1024):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.queue_waits: Deque[float] = deque(maxlen=window)
+
+    @staticmethod
+    def _percentiles(values: Deque[float]) -> Dict[str, Optional[float]]:
+        if not values:
+            return {"p50_ms": None, "p95_ms": None, "max_ms": None}
+        ordered = sorted(values)
+        return {
+            "p50_ms": round(ordered[len(ordered) // 2] * 1000.0, 1),
+            "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000.0, 1),
+            "max_ms": round(ordered[-1] * 1000.0, 1)
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "latency": self._percentiles(self.latencies),
+            "queue_wait": self._percentiles(self.queue_waits)
+        }
+
+class _Waiter:
+    """A queued call; notify wakes its owner to re-check admission"""
+
+    __slots__ = ("tokens", "notify", "admitted", "cancelled", "at_head")
+
+    def __init__(self, tokens: int, notify: Callable[[], None]):
+        self.tokens = tokens
+        self.notify = notify
+        self.admitted = False
+        self.cancelled = False
+        self.at_head = False
+
+def _default_usage(result: Any) -> Tuple[int, int]:
+    """(prompt tokens, completion tokens) from an OpenAI response's usage, if present"""
+    usage = getattr(result, "usage", None)
+    if usage is None:
+        return 0, 0
+    return int(getattr(usage, "prompt_tokens", 0) or 0), int(getattr(usage, "completion_tokens", 0) or 0)
+
+class LLMGateway:
+    """
+    Schedules LLM calls within requests/min, tokens/min and concurrency limits.
+
+    Waiting calls are admitted strictly by (priority, arrival order). A call takes
+    one request and its estimated tokens from the buckets when admitted; the token
+    estimate is corrected from the response usage afterwards. Rate limits, timeouts
+    and 5xx responses are retried with full-jitter exponential backoff, honouring
+    Retry-After, and a 429 pauses admissions for everyone until it has passed.
+
+    Streaming calls go through stream, which keeps their slot until the stream closes
+    and corrects the token estimate from the final usage chunk.
+
+    Scheduler state is guarded by a thread lock, so async callers on any event loop
+    and sync callers in worker threads share the same limits. Waiters sleep until
+    they are admitted by a release, or, at the head of the queue, until the buckets
+    or a 429 pause allow them in; abandoned tickets are dropped lazily from the heap.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 500,
+        tokens_per_minute: float = 200000,
+        max_concurrency: int = 16,
+        max_retries: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 20.0,
+        max_queue_seconds: float = 30.0
+    ):
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_queue_seconds = max_queue_seconds
+        self._lock = threading.Lock()
+        self._waiting: List[Tuple[int, int, _Waiter]] = []
+        self._queued = 0
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._metrics: Dict[str, _Metrics] = defaultdict(_Metrics)
+
+    # Admission
+
+    def _enqueue(self, priority: int, tokens: int, notify: Callable[[], None]) -> _Waiter:
+        waiter = _Waiter(tokens, notify)
+        with self._lock:
+            heapq.heappush(self._waiting, (priority, next(self._sequence), waiter))
+            self._queued += 1
+        return waiter
+
+    def _dispatch(self, now: float) -> float:
+        """
+        Admit waiters from the head of the queue while capacity allows; call with the lock held
+
+        Returns:
+            Seconds the head must wait for the buckets or a 429 pause; 0 if it waits for a free slot or nobody waits
+        """
+        while self._waiting:
+            waiter = self._waiting[0][2]
+            if waiter.cancelled:
+                heapq.heappop(self._waiting)
+                continue
+            if self._in_flight >= self.max_concurrency:
+                return 0.0
+            wait = max(
+                self._paused_until - now,
+                self.request_bucket.wait_time(1, now),
+                self.token_bucket.wait_time(waiter.tokens, now)
+            )
+            if wait > 0:
+                # A waiter that just reached the head sleeps on that wait itself from now on
+                if not waiter.at_head:
+                    waiter.at_head = True
+                    waiter.notify()
+                return wait
+
+            heapq.heappop(self._waiting)
+            self._queued -= 1
+            self.request_bucket.take(1)
+            self.token_bucket.take(waiter.tokens)
+            self._in_flight += 1
+            waiter.admitted = True
+            waiter.notify()
+        return 0.0
+
+    def _poll(self, waiter: _Waiter) -> Optional[float]:
+        """None once the waiter is admitted, else its known wait at the head, or 0 to sleep until notified"""
+        with self._lock:
+            wait = self._dispatch(time.monotonic())
+            if waiter.admitted:
+                return None
+            if self._waiting and self._waiting[0][2] is waiter:
+                return wait
+            waiter.at_head = False
+            return 0.0
+
+    def _abandon(self, waiter: _Waiter):
+        """Drop a waiter that gave up, handing back capacity if it was admitted meanwhile"""
+        with self._lock:
+            if waiter.admitted:
+                self._in_flight -= 1
+                self.request_bucket.adjust(1)
+                self.token_bucket.adjust(waiter.tokens)
+            elif not waiter.cancelled:
+                waiter.cancelled = True
+                self._queued -= 1
+            self._dispatch(time.monotonic())
+
+    def _release(self, estimated_tokens: int, used_tokens: Optional[int]):
+        with self._lock:
+            self._in_flight -= 1
+            if used_tokens is not None:
+                self.token_bucket.adjust(estimated_tokens - used_tokens)
+            self._dispatch(time.monotonic())
+
+    def _queue_timeout(self, operation: str, waited: float, wait: float):
+        with self._lock:
+            self._metrics[operation].rate_limited += 1
+        raise LLMRateLimitError(
+            f"LLM gateway saturated: {operation} waited {waited:.1f}s for capacity",
+            retry_after=max(1.0, wait)
+        )
+
+    async def _acquire(self, priority: int, tokens: int, operation: str) -> float:
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+
+        def notify():
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # The caller's loop is closed; its waiter is abandoned when the acquire unwinds
+                pass
+
+        waiter = self._enqueue(priority, tokens, notify)
+        started = time.monotonic()
+        deadline = started + self.max_queue_seconds
+        try:
+            while True:
+                event.clear()
+                wait = self._poll(waiter)
+                now = time.monotonic()
+                if wait is None:
+                    return now - started
+                if now + wait > deadline or now >= deadline:
+                    self._queue_timeout(operation, now - started, wait)
+                try:
+                    await asyncio.wait_for(event.wait(), wait or deadline - now)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            self._abandon(waiter)
+            raise
+
+    def _acquire_sync(self, priority: int, tokens: int, operation: str) -> float:
+        event = threading.Event()
+        waiter = self._enqueue(priority, tokens, event.set)
+        started = time.monotonic()
+        deadline = started + self.max_queue_seconds
+        try:
+            while True:
+                event.clear()
+                wait = self._poll(waiter)
+                now = time.monotonic()
+                if wait is None:
+                    return now - started
+                if now + wait > deadline or now >= deadline:
+                    self._queue_timeout(operation, now - started, wait)
+                event.wait(wait or deadline - now)
+        except BaseException:
+            self._abandon(waiter)
+            raise
+
+    def estimated_wait(self, estimated_tokens: int, priority: int = PRIORITY_INTERACTIVE, operation: str = "llm") -> float:
+        """
+        Rough seconds a call submitted now would queue before admission, without queueing it
+
+        Takes the 429 pause, the buckets, the calls queued ahead at the same or higher priority and,
+        when all slots would be busy, the operation's median latency into account.
+        """
+        with self._lock:
+            now = time.monotonic()
+            ahead = sum(1 for ticket in self._waiting if ticket[0] <= priority and not ticket[2].cancelled)
+            wait = max(
+                self._paused_until - now,
+                self.request_bucket.wait_time(ahead + 1, now),
+                self.token_bucket.wait_time(estimated_tokens, now),
+                0.0
+            )
+            busy = self._in_flight + ahead + 1 - self.max_concurrency
+            if busy > 0:
+                latencies = sorted(self._metrics[operation].latencies) if operation in self._metrics else []
+                typical = latencies[len(latencies) // 2] if latencies else 1.0
+                wait = max(wait, -(-busy // self.max_concurrency) * typical)
+            return wait
+
+    # Retries
+
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Backoff before retrying error, or None if it is not retryable"""
+        status = getattr(error, "status_code", None)
+        retryable = status in RETRYABLE_STATUS_CODES or (
+            status is None and type(error).__name__ in ("APITimeoutError", "APIConnectionError")
+        )
+        if not retryable or attempt >= self.max_retries:
+            return None
+
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        response = getattr(error, "response", None)
+        retry_after = getattr(response, "headers", {}).get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+
+        if status == 429:
+            with self._lock:
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        return delay
+
+    def _record(self, operation: str, latency: float, queue_wait: float, usage: Tuple[int, int]):
+        with self._lock:
+            metrics = self._metrics[operation]
+            metrics.calls += 1
+            metrics.latencies.append(latency)
+            metrics.queue_waits.append(queue_wait)
+            metrics.prompt_tokens += usage[0]
+            metrics.completion_tokens += usage[1]
+
+    def _record_failure(self, operation: str, error: Exception, retrying: bool):
+        with self._lock:
+            metrics = self._metrics[operation]
+            if getattr(error, "status_code", None) == 429:
+                metrics.rate_limited += 1
+            if retrying:
+                metrics.retries += 1
+            else:
+                metrics.errors += 1
+
+    def _next_delay(self, operation: str, error: Exception, attempt: int) -> float:
+        """Record a failed attempt and return the backoff before retrying it, or raise the error to give up"""
+        delay = self._retry_delay(error, attempt)
+        # A Retry-After beyond the queue budget is surfaced to the caller rather than slept through
+        retrying = delay is not None and delay <= self.max_queue_seconds
+        self._record_failure(operation, error, retrying=retrying)
+        if retrying:
+            logger.warning(f"{operation} failed ({str(error)}), retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+            return delay
+        if getattr(error, "status_code", None) == 429:
+            raise LLMRateLimitError(
+                f"{operation} rate limited after {attempt} retries: {str(error)}",
+                retry_after=max(1.0, delay or self.base_delay)
+            ) from error
+        raise error
+
+    # Public API
+
+    async def submit(
+        self,
+        call: Callable[[], Awaitable[T]],
+        estimated_tokens: int,
+        priority: int = PRIORITY_INTERACTIVE,
+        operation: str = "llm",
+        usage_fn: Callable[[Any], Tuple[int, int]] = _default_usage
+    ) -> T:
+        """
+        Run an async OpenAI call within the gateway's limits, retrying transient failures
+
+        Args:
+            call: Zero-argument coroutine factory; called again for every retry
+            estimated_tokens: Prompt plus maximum completion tokens, charged before the call
+            priority: PRIORITY_INTERACTIVE for user-facing calls, PRIORITY_BATCH for background work
+            operation: Metrics label, e.g. "chat.daily_plan"
+            usage_fn: Extracts (prompt tokens, completion tokens) from the result
+
+        Returns:
+            The call's result
+        """
+        attempt = 0
+        while True:
+            queue_wait = await self._acquire(priority, estimated_tokens, operation)
+            started = time.monotonic()
+            used_tokens = None
+            try:
+                result = await call()
+                usage = usage_fn(result)
+                used_tokens = sum(usage) or None
+                self._record(operation, time.monotonic() - started, queue_wait, usage)
+                return result
+            except Exception as e:
+                delay = self._next_delay(operation, e, attempt)
+            finally:
+                self._release(estimated_tokens, used_tokens)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def stream(
+        self,
+        call: Callable[[], Awaitable[Any]],
+        estimated_tokens: int,
+        priority: int = PRIORITY_INTERACTIVE,
+        operation: str = "llm",
+        usage_fn: Callable[[Any], Tuple[int, int]] = _default_usage
+    ) -> AsyncIterator[Any]:
+        """
+        Run a streaming OpenAI call within the gateway's limits, yielding its chunks
+
+        Opening the stream is retried like submit. The concurrency slot is held until the
+        stream is exhausted or closed, and the token estimate is corrected from the final
+        usage chunk (stream_options={"include_usage": True}) when the stream sends one.
+        Close the generator (e.g. with contextlib.aclosing) when not reading to the end.
+
+        Args:
+            call: Zero-argument coroutine factory returning an async stream with close()
+            estimated_tokens: Prompt plus maximum completion tokens, charged before the call
+            priority: PRIORITY_INTERACTIVE for user-facing calls, PRIORITY_BATCH for background work
+            operation: Metrics label, e.g. "chat.daily_plan_stream"
+            usage_fn: Extracts (prompt tokens, completion tokens) from the chunk carrying usage
+
+        Yields:
+            The stream's chunks
+        """
+        attempt = 0
+        while True:
+            queue_wait = await self._acquire(priority, estimated_tokens, operation)
+            started = time.monotonic()
+            try:
+                stream = await call()
+                break
+            except Exception as e:
+                self._release(estimated_tokens, None)
+                delay = self._next_delay(operation, e, attempt)
+            except BaseException:
+                self._release(estimated_tokens, None)
+                raise
+            attempt += 1
+            await asyncio.sleep(delay)
+
+        usage = (0, 0)
+        try:
+            async for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    usage = usage_fn(chunk)
+                yield chunk
+            self._record(operation, time.monotonic() - started, queue_wait, usage)
+        except Exception as e:
+            self._record_failure(operation, e, retrying=False)
+            raise
+        finally:
+            try:
+                await stream.close()
+            finally:
+                self._release(estimated_tokens, sum(usage) or None)
+
+    def submit_sync(
+        self,
+        call: Callable[[], T],
+        estimated_tokens: int,
+        priority: int = PRIORITY_INTERACTIVE,
+        operation: str = "llm",
+        usage_fn: Callable[[Any], Tuple[int, int]] = _default_usage
+    ) -> T:
+        """Blocking variant of submit for sync clients, e.g. catalog embedding at startup"""
+        attempt = 0
+        while True:
+            queue_wait = self._acquire_sync(priority, estimated_tokens, operation)
+            started = time.monotonic()
+            used_tokens = None
+            try:
+                result = call()
+                usage = usage_fn(result)
+                used_tokens = sum(usage) or None
+                self._record(operation, time.monotonic() - started, queue_wait, usage)
+                return result
+            except Exception as e:
+                delay = self._next_delay(operation, e, attempt)
+            finally:
+                self._release(estimated_tokens, used_tokens)
+            attempt += 1
+            time.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        """Limits, current queue and per-operation latency and token metrics"""
+        with self._lock:
+            now = time.monotonic()
+            self.request_bucket._refill(now)
+            self.token_bucket._refill(now)
+            return {
+                "limits": {
+                    "requests_per_minute": self.request_bucket.rate * 60.0,
+                    "tokens_per_minute": self.token_bucket.rate * 60.0,
+                    "max_concurrency": self.max_concurrency,
+                    "max_retries": self.max_retries,
+                    "max_queue_seconds": self.max_queue_seconds
+                },
+                "in_flight": self._in_flight,
+                "queued": self._queued,
+                "paused_seconds": round(max(0.0, self._paused_until - now), 3),
+                "available_requests": round(self.request_bucket.level, 1),
+                "available_tokens": round(self.token_bucket.level, 1),
+                "operations": {name: metrics.snapshot() for name, metrics in self._metrics.items()}
+            }
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English)"""
+    return len(text) // 4 + 1
+
+@lru_cache(maxsize=8)
+def _token_encoding(model: str):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> Tuple[int, bool]:
+    """
+    Token count for reports and benchmarks
+
+    Returns:
+        Tuple of (token count, whether it is exact); exact counts need tiktoken, otherwise estimate_tokens is used
+    """
+    encoding = _token_encoding(model)
+    if encoding is None:
+        return estimate_tokens(text), False
+    return len(encoding.encode(text)), True
+
+@lru_cache(maxsize=None)
+def get_llm_gateway() -> LLMGateway:
+    """Process-wide gateway shared by every model that calls OpenAI, configured from the environment"""
+    return LLMGateway(
+        requests_per_minute=float(os.getenv("LLM_REQUESTS_PER_MINUTE", "500")),
+        tokens_per_minute=float(os.getenv("LLM_TOKENS_PER_MINUTE", "200000")),
+        max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "16")),
+        max_retries=int(os.getenv("LLM_MAX_RETRIES", "4")),
+        max_queue_seconds=float(os.getenv("LLM_MAX_QUEUE_SECONDS", "30"))
+    )
@@ -2,12 +2,12 @@
 Utilities for loading and managing ML models
 """
 
+import hashlib
 import pickle
-import joblib
 import json
 import os
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
@@ -17,7 +17,7 @@ class ModelLoader:
     
     def __init__(self, base_path: str = "data"):
         self.base_path = Path(base_path)
-        self.base_path.mkdir(exist_ok=True)
+        self.base_path.mkdir(parents=True, exist_ok=True)
     
     def load_pickle_model(self, model_path: str) -> Any:
         """Load a pickle model file"""
@@ -43,6 +43,8 @@ class ModelLoader:
             return None
             
         try:
+            # joblib (and the sklearn classes it unpickles) is only imported when a model is actually loaded
+            import joblib
             model = joblib.load(full_path)
             logger.info(f"Loaded joblib model from {full_path}")
             return model
@@ -67,21 +69,73 @@ class ModelLoader:
             return None
     
     def save_json_data(self, data: Dict, data_path: str) -> bool:
-        """Save data to JSON file"""
+        """Save data to JSON file, replacing it atomically so concurrent readers never see a partial file"""
         full_path = self.base_path / data_path
         full_path.parent.mkdir(parents=True, exist_ok=True)
         
+        tmp_path = full_path.with_name(f"{full_path.name}.{os.getpid()}.tmp")
         try:
-            with open(full_path, 'w', encoding='utf-8') as f:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
                 json.dump(data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, full_path)
             logger.info(f"Saved JSON data to {full_path}")
             return True
         except Exception as e:
+            tmp_path.unlink(missing_ok=True)
             logger.error(f"Error saving JSON data {full_path}: {str(e)}")
             return False
     
+    def load_array_artifact(self, artifact_path: str) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """Memory-map an array artifact, returning (read-only arrays, metadata)"""
+        full_path = self.base_path / artifact_path
+        if not full_path.exists():
+            return None
+        
+        try:
+            from src.utils.array_artifact import load_array_artifact
+            arrays, metadata = load_array_artifact(full_path)
+            logger.info(f"Memory-mapped array artifact from {full_path}")
+            return arrays, metadata
+        except Exception as e:
+            logger.error(f"Error loading array artifact {full_path}: {str(e)}")
+            return None
+    
+    def save_array_artifact(self, arrays: Dict[str, Any], metadata: Dict[str, Any], artifact_path: str) -> bool:
+        """Save arrays and JSON metadata as an array artifact"""
+        full_path = self.base_path / artifact_path
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        try:
+            from src.utils.array_artifact import save_array_artifact
+            save_array_artifact(full_path, arrays, metadata)
+            logger.info(f"Saved array artifact to {full_path}")
+            return True
+        except Exception as e:
+            logger.error(f"Error saving array artifact {full_path}: {str(e)}")
+            return False
+    
+    def file_stamp(self, *paths: str) -> Optional[str]:
+        """Fingerprint of the given files from their sizes and modification times, or None if any is missing"""
+        digest = hashlib.sha1()
+        for path in paths:
+            full_path = self.base_path / path
+            if not full_path.exists():
+                return None
+            stat = full_path.stat()
+            digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}\n".encode("utf-8"))
+        return digest.hexdigest()[:16]
+    
     def model_exists(self, model_path: str) -> bool:
         """Check if model file exists"""
         return (self.base_path / model_path).exists()
+    
+    def directory_version(self) -> str:
+        """Fingerprint of the files in base_path (names, sizes and modification times)"""
+        digest = hashlib.sha1()
+        for path in sorted(self.base_path.iterdir()):
+            if path.is_file():
+                stat = path.stat()
+                digest.update(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}\n".encode("utf-8"))
+        return digest.hexdigest()[:12]
 
 
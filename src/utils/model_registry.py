@@ -0,0 +1,192 @@
+"""
+Thread-safe registry of lazily constructed model singletons
+"""
+
+import asyncio
+import sys
+import threading
+import time
+import types
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+def estimate_nbytes(obj: Any, max_depth: int = 12) -> int:
+    """
+    Approximate memory footprint of an object graph.
+
+    NumPy arrays count their buffer (views count their base once), FAISS-style
+    indexes count ntotal * d float32 codes, and containers and objects are walked
+    through their pickle state, once each. Modules, classes and functions are skipped.
+    """
+    # Holds the objects themselves so temporary pickle states can't recycle ids mid-walk
+    seen: Dict[int, Any] = {}
+    # No arrays can exist if NumPy was never imported, so don't import it just for this check
+    np = sys.modules.get("numpy")
+    skipped_types = (types.ModuleType, type, types.FunctionType, types.BuiltinFunctionType,
+                     types.MethodType, logging.Logger)
+
+    def walk(value: Any, depth: int) -> int:
+        if id(value) in seen or depth > max_depth or isinstance(value, skipped_types):
+            return 0
+        seen[id(value)] = value
+
+        if np is not None and isinstance(value, np.ndarray):
+            if isinstance(value.base, np.ndarray):
+                return walk(value.base, depth + 1)
+            return value.nbytes
+        if hasattr(value, "ntotal") and hasattr(value, "d"):
+            return int(value.ntotal) * int(value.d) * 4
+
+        size = sys.getsizeof(value, 0)
+        if isinstance(value, (str, bytes, int, float, bool, type(None))):
+            return size
+        if isinstance(value, dict):
+            return size + sum(walk(k, depth + 1) + walk(v, depth + 1) for k, v in value.items())
+        if isinstance(value, (list, tuple, set, frozenset)):
+            return size + sum(walk(item, depth + 1) for item in value)
+
+        try:
+            state = value.__getstate__()
+        except Exception:
+            state = getattr(value, "__dict__", None)
+        if isinstance(state, dict):
+            return size + walk(state, depth + 1)
+        return size
+
+    return walk(obj, 0)
+
+class ModelRegistry:
+    """
+    Holds one instance per registered model name, constructed on first use.
+
+    Concurrent first callers share a single in-flight load: the first caller runs
+    the factory and the others wait on the same future. A failed load is not
+    cached, so the next caller retries it.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._futures: Dict[str, Future] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._reload_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        """Register a zero-argument factory for a model name"""
+        with self._lock:
+            self._factories[name] = factory
+            self._stats[name] = {"status": "registered"}
+            self._reload_locks[name] = threading.Lock()
+
+    def _claim(self, name: str) -> Tuple[Future, bool]:
+        """Return the future for a model and whether this caller must run its factory"""
+        with self._lock:
+            if name not in self._factories:
+                raise KeyError(f"Model '{name}' is not registered")
+            future = self._futures.get(name)
+            if future is not None:
+                return future, False
+            future = Future()
+            self._futures[name] = future
+            self._stats[name] = {"status": "loading"}
+            return future, True
+
+    def _load(self, name: str, future: Future):
+        """Run the factory and resolve the shared future"""
+        started = time.perf_counter()
+        try:
+            instance = self._factories[name]()
+        except BaseException as e:
+            with self._lock:
+                self._futures.pop(name, None)
+                self._stats[name] = {"status": "failed", "error": str(e)}
+            future.set_exception(e)
+            logger.error(f"Failed to load model {name}: {str(e)}")
+            return
+
+        load_seconds = time.perf_counter() - started
+        with self._lock:
+            self._stats[name] = {
+                "status": "ready",
+                "load_seconds": round(load_seconds, 3),
+                "loaded_at": time.time(),
+                "memory_bytes": estimate_nbytes(instance)
+            }
+        future.set_result(instance)
+        logger.info(f"Loaded model {name} in {load_seconds:.3f}s")
+
+    def get(self, name: str) -> Any:
+        """Return the model instance, loading it in this thread if nobody else is"""
+        future, owner = self._claim(name)
+        if owner:
+            self._load(name, future)
+        return future.result()
+
+    async def aget(self, name: str) -> Any:
+        """Async variant of get; loads run in a worker thread so the event loop stays free"""
+        future, owner = self._claim(name)
+        if owner:
+            await asyncio.to_thread(self._load, name, future)
+        return await asyncio.wrap_future(future)
+
+    def reload(self, name: str) -> Any:
+        """
+        Build a fresh instance in this thread and atomically swap it in.
+
+        Requests that already hold the previous instance finish with it; new
+        callers get the new one. If the load fails the previous instance stays.
+        """
+        if name not in self._factories:
+            raise KeyError(f"Model '{name}' is not registered")
+
+        with self._reload_locks[name]:
+            started = time.perf_counter()
+            try:
+                instance = self._factories[name]()
+            except Exception as e:
+                with self._lock:
+                    self._stats[name]["last_reload_error"] = str(e)
+                logger.error(f"Reloading model {name} failed, keeping current instance: {str(e)}")
+                raise
+
+            future = Future()
+            future.set_result(instance)
+            load_seconds = time.perf_counter() - started
+            with self._lock:
+                previous = self._stats.get(name, {})
+                self._futures[name] = future
+                self._stats[name] = {
+                    "status": "ready",
+                    "load_seconds": round(load_seconds, 3),
+                    "loaded_at": time.time(),
+                    "memory_bytes": estimate_nbytes(instance),
+                    "reloads": previous.get("reloads", 0) + 1
+                }
+            logger.info(f"Reloaded model {name} in {load_seconds:.3f}s")
+            return instance
+
+    async def areload(self, name: str) -> Any:
+        """Async variant of reload; the new instance is built in a worker thread"""
+        return await asyncio.to_thread(self.reload, name)
+
+    def peek(self, name: str) -> Any:
+        """Current instance if loaded, without triggering a load"""
+        with self._lock:
+            future = self._futures.get(name)
+        if future is None or not future.done() or future.exception() is not None:
+            return None
+        return future.result()
+
+    def is_loaded(self, name: str) -> bool:
+        """Whether the model has finished loading successfully"""
+        with self._lock:
+            future = self._futures.get(name)
+        return future is not None and future.done() and future.exception() is None
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Load status, load time and approximate memory footprint per model"""
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
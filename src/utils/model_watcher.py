@@ -0,0 +1,92 @@
+"""
+Background watcher that hot-reloads models when their artifact directories change
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+import logging
+from src.utils.model_loader import ModelLoader
+from src.utils.model_registry import ModelRegistry
+
+logger = logging.getLogger(__name__)
+
+class ModelDirectoryWatcher:
+    """
+    Polls model artifact directories and reloads a model through the registry
+    when its directory fingerprint differs from the loaded instance's model_version.
+
+    A new fingerprint must be seen on two consecutive polls before reloading, so
+    a notebook that is still writing model and scaler files is not picked up halfway.
+    """
+
+    def __init__(self, registry: ModelRegistry, directories: Dict[str, str], interval_seconds: float = 30.0,
+                 on_reload: Optional[Callable[[str, Any], Awaitable[None]]] = None):
+        self.registry = registry
+        self.loaders = {name: ModelLoader(base_path=path) for name, path in directories.items()}
+        self.interval_seconds = interval_seconds
+        # Awaited with (name, new instance) after each successful reload, e.g. to warm it up
+        self.on_reload = on_reload
+        self._pending_versions: Dict[str, str] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def versions(self) -> Dict[str, Dict[str, Any]]:
+        """Loaded and on-disk artifact versions per watched model"""
+        versions = {}
+        for name, loader in self.loaders.items():
+            instance = self.registry.peek(name)
+            versions[name] = {
+                "loaded_version": getattr(instance, "model_version", None),
+                "available_version": loader.directory_version(),
+                "directory": str(loader.base_path)
+            }
+        return versions
+
+    async def check_once(self):
+        """Reload every watched model whose artifacts changed and have settled"""
+        for name, loader in self.loaders.items():
+            instance = self.registry.peek(name)
+            if instance is None:
+                continue
+
+            available = loader.directory_version()
+            if available == getattr(instance, "model_version", None):
+                self._pending_versions.pop(name, None)
+                continue
+
+            if self._pending_versions.get(name) != available:
+                self._pending_versions[name] = available
+                continue
+
+            logger.info(f"Artifacts for {name} changed to version {available}, reloading")
+            self._pending_versions.pop(name, None)
+            try:
+                instance = await self.registry.areload(name)
+            except Exception:
+                # The registry keeps the previous instance; retry on a later poll
+                continue
+            if self.on_reload is not None:
+                await self.on_reload(name, instance)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.check_once()
+            except Exception as e:
+                logger.error(f"Model watcher check failed: {str(e)}")
+
+    def start(self):
+        """Start polling on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info(f"Watching model directories every {self.interval_seconds}s")
+
+    async def stop(self):
+        """Stop polling"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,200 @@
+"""
+Process-wide OpenAI clients over shared, tuned HTTP connection pools
+"""
+
+import importlib.util
+import os
+import threading
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+class _ConnectionMetrics:
+    """Requests sent versus TCP connections opened, from httpx event hooks and httpcore trace events"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections_opened = 0
+        self.http_versions: Counter = Counter()
+
+    def _count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def _count_event(self, event_name: str):
+        if event_name == "connection.connect_tcp.complete":
+            with self._lock:
+                self.connections_opened += 1
+
+    def _count_response(self, http_version: str):
+        with self._lock:
+            self.http_versions[http_version] += 1
+
+    def sync_hooks(self) -> Dict[str, list]:
+        def trace(event_name, info):
+            self._count_event(event_name)
+
+        def on_request(request):
+            self._count_request()
+            request.extensions["trace"] = trace
+
+        def on_response(response):
+            self._count_response(response.http_version)
+
+        return {"request": [on_request], "response": [on_response]}
+
+    def async_hooks(self) -> Dict[str, list]:
+        async def trace(event_name, info):
+            self._count_event(event_name)
+
+        async def on_request(request):
+            self._count_request()
+            request.extensions["trace"] = trace
+
+        async def on_response(response):
+            self._count_response(response.http_version)
+
+        return {"request": [on_request], "response": [on_response]}
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            reused = max(self.requests - self.connections_opened, 0)
+            return {
+                "requests": self.requests,
+                "connections_opened": self.connections_opened,
+                "reused_connections": reused,
+                "reuse_rate": reused / self.requests if self.requests else 0.0,
+                "http_versions": dict(self.http_versions)
+            }
+
+class OpenAIClients:
+    """
+    Lazily created sync and async OpenAI clients shared by every model in the process.
+
+    Each client keeps one httpx connection pool with the configured size, keep-alive
+    expiry, timeouts and HTTP/2 (when the h2 package is installed), so TLS connections
+    are reused across models and requests. SDK retries are disabled since the LLM
+    gateway retries. Clients are recreated in a forked worker rather than sharing
+    sockets opened by a preloading master; callers should fetch them per use.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = True,
+        connect_timeout: float = 5.0,
+        timeout: float = 60.0
+    ):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+        if http2 and not self.http2:
+            logger.info("h2 package not installed, OpenAI clients use HTTP/1.1")
+        self.connect_timeout = connect_timeout
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._sync_client = None
+        self._async_client = None
+        self._sync_metrics = _ConnectionMetrics()
+        self._async_metrics = _ConnectionMetrics()
+
+    @staticmethod
+    def _api_key() -> str:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY is required but not found in environment variables")
+        # Remove quotes if present
+        return api_key.strip("'\"")
+
+    def _http_options(self, openai_module) -> Dict[str, Any]:
+        # Limits and Timeout from the httpx package the installed openai client is built on
+        limits_type = type(openai_module.DEFAULT_CONNECTION_LIMITS)
+        return {
+            "limits": limits_type(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry
+            ),
+            "timeout": openai_module.Timeout(self.timeout, connect=self.connect_timeout),
+            "http2": self.http2
+        }
+
+    def _check_process(self):
+        """Drop clients inherited through fork; call with the lock held"""
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._sync_client = None
+            self._async_client = None
+
+    def sync_client(self):
+        """Shared openai.OpenAI client for this process"""
+        with self._lock:
+            self._check_process()
+            if self._sync_client is None:
+                import openai
+                http_client = openai.DefaultHttpxClient(
+                    event_hooks=self._sync_metrics.sync_hooks(), **self._http_options(openai)
+                )
+                self._sync_client = openai.OpenAI(api_key=self._api_key(), max_retries=0, http_client=http_client)
+            return self._sync_client
+
+    def async_client(self):
+        """Shared openai.AsyncOpenAI client for this process"""
+        with self._lock:
+            self._check_process()
+            if self._async_client is None:
+                import openai
+                http_client = openai.DefaultAsyncHttpxClient(
+                    event_hooks=self._async_metrics.async_hooks(), **self._http_options(openai)
+                )
+                self._async_client = openai.AsyncOpenAI(api_key=self._api_key(), max_retries=0, http_client=http_client)
+            return self._async_client
+
+    async def aclose(self):
+        """Close both clients' connection pools; they are recreated on next use"""
+        with self._lock:
+            sync_client, self._sync_client = self._sync_client, None
+            async_client, self._async_client = self._async_client, None
+            owned = self._pid == os.getpid()
+        if not owned:
+            return
+        if sync_client is not None:
+            sync_client.close()
+        if async_client is not None:
+            await async_client.close()
+        logger.info("OpenAI HTTP clients closed")
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool settings and connection reuse for the sync and async clients"""
+        return {
+            "pool": {
+                "max_connections": self.max_connections,
+                "max_keepalive_connections": self.max_keepalive_connections,
+                "keepalive_expiry_seconds": self.keepalive_expiry,
+                "http2": self.http2,
+                "connect_timeout_seconds": self.connect_timeout,
+                "timeout_seconds": self.timeout
+            },
+            "sync": self._sync_metrics.snapshot(),
+            "async": self._async_metrics.snapshot()
+        }
+
+@lru_cache(maxsize=None)
+def get_openai_clients() -> OpenAIClients:
+    """Process-wide OpenAI clients, configured from the environment"""
+    return OpenAIClients(
+        max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", "100")),
+        max_keepalive_connections=int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "20")),
+        keepalive_expiry=float(os.getenv("OPENAI_KEEPALIVE_EXPIRY_SECONDS", "30")),
+        http2=os.getenv("OPENAI_HTTP2", "True").lower() == "true",
+        connect_timeout=float(os.getenv("OPENAI_CONNECT_TIMEOUT_SECONDS", "5")),
+        timeout=float(os.getenv("OPENAI_TIMEOUT_SECONDS", "60"))
+    )
@@ -0,0 +1,334 @@
+"""
+Response cache for generated daily plans, keyed by a bucketed request signature
+"""
+
+import asyncio
+import bisect
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+from src.utils.embedding_cache import EmbeddingCache
+
+logger = logging.getLogger(__name__)
+
+# Lower edges of the buckets; a context is rounded down so a cached plan never asks for more than the user has
+STREAK_BUCKETS = (0, 1, 3, 7, 14, 30, 60, 100)
+TIME_BUCKETS = (5, 10, 15, 20, 30, 45, 60, 90)
+
+def _bucket(value: int, edges: Tuple[int, ...]) -> int:
+    if value < edges[0]:
+        return max(int(value), 0)
+    return edges[bisect.bisect_right(edges, value) - 1]
+
+def canonical_context(user_data: Dict[str, Any], goal: Optional[str] = None,
+                      max_recent_activities: int = 3) -> Dict[str, Any]:
+    """Bucketed, normalized planning context; see PlanCache for how recent activities are kept"""
+    mood = user_data.get("mood")
+    recent = (user_data.get("recent_activities") or [])[:max_recent_activities]
+    return {
+        "goal": goal or EmbeddingCache.normalize(user_data.get("goal") or "improve overall wellness"),
+        "current_streak": _bucket(int(user_data.get("current_streak") or 0), STREAK_BUCKETS),
+        "recent_activities": sorted({EmbeddingCache.normalize(activity) for activity in recent} - {""}),
+        "available_time_minutes": _bucket(int(user_data.get("available_time_minutes") or 15), TIME_BUCKETS),
+        "preferred_time": EmbeddingCache.normalize(user_data.get("preferred_time") or "morning"),
+        "mood": EmbeddingCache.normalize(mood) if mood else None
+    }
+
+def context_signature(context: Dict[str, Any]) -> str:
+    """Stable digest of a canonical context"""
+    return hashlib.sha1(json.dumps(context, sort_keys=True).encode("utf-8")).hexdigest()
+
+class PlanCache:
+    """
+    LRU + TTL cache of generated plans shared by users with the same bucketed context.
+
+    A context is (goal, streak bucket, available time bucket, preferred time, mood,
+    recent activities) with text fields normalized. Plans are generated from the
+    canonical context, so any user that maps to it can be served the same plan. Keys
+    include the plan date, and entries for past dates are dropped once the day changes,
+    even with a longer TTL.
+
+    Recent activities are part of the key as a sorted set of the first
+    max_recent_activities normalized entries, so plans still avoid repeating what the
+    user just did. That splits the cache by activity history and lowers the hit rate;
+    max_recent_activities=0 drops activities from the key (and the prompt) for the
+    highest hit rate at the cost of that personalization.
+
+    With a similarity threshold, goals whose embeddings are at least that cosine-similar
+    to a goal seen before share its entries. Known goals and the aliases mapped to them
+    are both bounded by max_goals, least recently used first. The shared backend only needs the
+    redis-py subset ``get(key)`` and ``set(key, value, ex=ttl_seconds)``; async callers
+    use aget/aset so backend round-trips run in a worker thread, off the event loop.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 4096,
+        ttl_seconds: float = 86400,
+        backend: Optional[Any] = None,
+        namespace: str = "daily-plan",
+        similarity_threshold: Optional[float] = None,
+        max_goals: int = 2048,
+        max_recent_activities: int = 3
+    ):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self.namespace = namespace
+        self.similarity_threshold = similarity_threshold
+        self.max_goals = max_goals
+        self.max_recent_activities = max_recent_activities
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any], int, str]]" = OrderedDict()
+        self._today: Optional[str] = None
+        self._goal_aliases: "OrderedDict[str, str]" = OrderedDict()
+        # Known goals in LRU order, mapped to their row in _goal_vectors; rows are reused on eviction
+        self._goal_slots: "OrderedDict[str, int]" = OrderedDict()
+        self._slot_texts: List[Optional[str]] = []
+        self._goal_vectors = np.empty((0, 0), dtype=np.float32)
+        # Rows of _goal_vectors holding a known goal; only these are searched
+        self._live_slots = np.zeros(0, dtype=bool)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.backend_hits = 0
+        self.semantic_matches = 0
+        self.coalesced = 0
+        self.saved_tokens = 0
+
+    def canonical_context(self, user_data: Dict[str, Any], goal: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Bucketed, normalized planning context shared by every user with the same signature
+
+        Args:
+            user_data: DailyPlanRequest fields
+            goal: Goal to use instead of the normalized request goal, e.g. from resolve_goal
+
+        Returns:
+            Context dict usable both as cache key and as prompt input
+        """
+        return canonical_context(user_data, goal, self.max_recent_activities)
+
+    def needs_goal_embedding(self, goal: str) -> bool:
+        """Whether resolve_goal needs an embedding for this goal"""
+        if self.similarity_threshold is None:
+            return False
+        with self._lock:
+            normalized = EmbeddingCache.normalize(goal)
+            return normalized not in self._goal_aliases and normalized not in self._goal_slots
+
+    def resolve_goal(self, goal: str, embedding: Optional[np.ndarray] = None) -> str:
+        """
+        Map a goal to the most similar previously seen goal above the similarity threshold
+
+        Args:
+            goal: Raw goal text
+            embedding: Goal embedding, required the first time a normalized goal is seen
+
+        Returns:
+            Normalized goal to use in the canonical context
+        """
+        normalized = EmbeddingCache.normalize(goal)
+        if self.similarity_threshold is None:
+            return normalized
+
+        with self._lock:
+            alias = self._goal_aliases.get(normalized)
+            if alias is None and normalized in self._goal_slots:
+                # A known goal whose own alias entry was evicted still maps to itself
+                alias = normalized
+            if alias is not None and alias in self._goal_slots:
+                self._goal_slots.move_to_end(alias)
+                self._remember_alias(normalized, alias)
+                return alias
+            if embedding is None:
+                return normalized
+
+            vector = np.asarray(embedding, dtype=np.float32)
+            vector = vector / (np.linalg.norm(vector) or 1.0)
+            alias = normalized
+            if self._live_slots.any():
+                similarities = np.where(self._live_slots, self._goal_vectors @ vector, -np.inf)
+                best = int(similarities.argmax())
+                if similarities[best] >= self.similarity_threshold:
+                    alias = self._slot_texts[best]
+                    self._goal_slots.move_to_end(alias)
+                    self.semantic_matches += 1
+
+            if alias == normalized:
+                self._add_goal(normalized, vector)
+            self._remember_alias(normalized, alias)
+            return alias
+
+    def _remember_alias(self, goal: str, alias: str):
+        """Record goal -> alias as most recently used, dropping the oldest aliases past max_goals; call with the lock held"""
+        self._goal_aliases[goal] = alias
+        self._goal_aliases.move_to_end(goal)
+        while len(self._goal_aliases) > self.max_goals:
+            self._goal_aliases.popitem(last=False)
+
+    def _add_goal(self, goal: str, vector: np.ndarray):
+        """Remember a new goal's vector, evicting the least recently used goal when full; call with the lock held"""
+        if not self._goal_vectors.size:
+            self._goal_vectors = np.zeros((self.max_goals, vector.shape[0]), dtype=np.float32)
+            self._slot_texts = [None] * self.max_goals
+            self._live_slots = np.zeros(self.max_goals, dtype=bool)
+        if len(self._goal_slots) < self.max_goals:
+            slot = int(np.flatnonzero(~self._live_slots)[0])
+        else:
+            evicted, slot = self._goal_slots.popitem(last=False)
+            for text in [text for text, alias in self._goal_aliases.items() if alias == evicted]:
+                del self._goal_aliases[text]
+        self._slot_texts[slot] = goal
+        self._goal_vectors[slot] = vector
+        self._live_slots[slot] = True
+        self._goal_slots[goal] = slot
+
+    def _key(self, context: Dict[str, Any], plan_date: str) -> str:
+        return f"{self.namespace}:{plan_date}:{context_signature(context)}"
+
+    def _roll_over(self):
+        """Drop local entries for past plan dates once the first lookup of a new day arrives"""
+        today = date.today().isoformat()
+        if today != self._today:
+            expired = [key for key, entry in self._entries.items() if entry[3] < today]
+            for key in expired:
+                del self._entries[key]
+            if self._today is not None:
+                logger.info(f"Plan cache dropped {len(expired)} plans from before {today}")
+            self._today = today
+
+    def _local_get(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._roll_over()
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, plan, tokens, _ = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    self.saved_tokens += tokens
+                    return plan
+                del self._entries[key]
+        return None
+
+    def _record_backend(self, key: str, plan_date: str, cached: Optional[Dict[str, Any]], now: float) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if cached is None:
+                self.misses += 1
+                return None
+            plan, tokens = cached["plan"], cached.get("tokens", 0)
+            self.hits += 1
+            self.backend_hits += 1
+            self.saved_tokens += tokens
+            self._store(key, plan_date, plan, tokens, now)
+        return plan
+
+    def get(self, context: Dict[str, Any], plan_date: str) -> Optional[Dict[str, Any]]:
+        """Return the cached plan for a canonical context and date, or None on a miss"""
+        key = self._key(context, plan_date)
+        now = time.monotonic()
+        plan = self._local_get(key, now)
+        if plan is not None:
+            return plan
+        return self._record_backend(key, plan_date, self._backend_get(key), now)
+
+    async def aget(self, context: Dict[str, Any], plan_date: str) -> Optional[Dict[str, Any]]:
+        """Async variant of get; a backend lookup runs in a worker thread"""
+        key = self._key(context, plan_date)
+        now = time.monotonic()
+        plan = self._local_get(key, now)
+        if plan is not None:
+            return plan
+        cached = await asyncio.to_thread(self._backend_get, key) if self.backend is not None else None
+        return self._record_backend(key, plan_date, cached, now)
+
+    def _local_set(self, context: Dict[str, Any], plan_date: str, plan: Dict[str, Any], tokens: int) -> str:
+        key = self._key(context, plan_date)
+        with self._lock:
+            self._roll_over()
+            self._store(key, plan_date, plan, tokens, time.monotonic())
+        return key
+
+    def set(self, context: Dict[str, Any], plan_date: str, plan: Dict[str, Any], tokens: int = 0):
+        """
+        Cache a generated plan
+
+        Args:
+            context: Canonical context the plan was generated from
+            plan_date: Date the plan is for (YYYY-MM-DD)
+            plan: Parsed model output
+            tokens: Tokens the generation used, counted as saved on every hit
+        """
+        key = self._local_set(context, plan_date, plan, tokens)
+        self._backend_set(key, plan, tokens)
+
+    async def aset(self, context: Dict[str, Any], plan_date: str, plan: Dict[str, Any], tokens: int = 0):
+        """Async variant of set; the backend write runs in a worker thread"""
+        key = self._local_set(context, plan_date, plan, tokens)
+        if self.backend is not None:
+            await asyncio.to_thread(self._backend_set, key, plan, tokens)
+
+    def record_coalesced(self, tokens: int):
+        """Count a miss that was served by another request's in-flight generation"""
+        with self._lock:
+            self.coalesced += 1
+            self.saved_tokens += tokens
+
+    def _store(self, key: str, plan_date: str, plan: Dict[str, Any], tokens: int, now: float):
+        self._entries[key] = (now + self.ttl_seconds, plan, tokens, plan_date)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _backend_get(self, key: str) -> Optional[Dict[str, Any]]:
+        if self.backend is None:
+            return None
+        try:
+            value = self.backend.get(key)
+            if value is None:
+                return None
+            cached = json.loads(value)
+            if not isinstance(cached, dict) or not isinstance(cached.get("plan"), dict):
+                raise ValueError("unexpected cached value")
+            return cached
+        except Exception as e:
+            # Unreachable backends and corrupt or foreign values are both treated as a miss
+            logger.warning(f"Plan cache backend get failed for {key}: {str(e)}")
+            return None
+
+    def _backend_set(self, key: str, plan: Dict[str, Any], tokens: int):
+        if self.backend is None:
+            return
+        try:
+            value = json.dumps({"plan": plan, "tokens": tokens})
+            self.backend.set(key, value.encode("utf-8"), ex=max(1, int(self.ttl_seconds)))
+        except Exception as e:
+            logger.warning(f"Plan cache backend set failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters, saved tokens and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "today": self._today,
+                "hits": self.hits,
+                "misses": self.misses,
+                "backend_hits": self.backend_hits,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "coalesced": self.coalesced,
+                "saved_tokens": self.saved_tokens,
+                "similarity_threshold": self.similarity_threshold,
+                "semantic_matches": self.semantic_matches,
+                "known_goals": len(self._goal_slots),
+                "goal_aliases": len(self._goal_aliases),
+                "shared_backend": self.backend is not None
+            }
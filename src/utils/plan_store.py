@@ -0,0 +1,150 @@
+"""
+SQLite store of precomputed daily plans keyed by (user_id, plan_date)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+class PlanStore:
+    """
+    Local store for DailyPlanResponse payloads generated ahead of time.
+
+    Uses a single SQLite file in WAL mode, so the API can read plans while a
+    precompute job in another process is writing tomorrow's. Connections are
+    opened per process, since SQLite handles must not be shared across fork.
+    Each plan is stored with the signature of the request context it was
+    generated for, and is only served to requests with the same signature.
+    """
+
+    def __init__(self, path: str = "data/plans/daily_plans.sqlite3"):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._connection_pid: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.context_mismatches = 0
+        with self._lock:
+            self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Connection for the current process, opened and initialized on first use; call with the lock held"""
+        if self._connection is not None and self._connection_pid == os.getpid():
+            return self._connection
+
+        connection = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS daily_plans ("
+            " user_id TEXT NOT NULL,"
+            " plan_date TEXT NOT NULL,"
+            " plan TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " context TEXT NOT NULL DEFAULT '',"
+            " PRIMARY KEY (user_id, plan_date))"
+        )
+        # Stores created before context signatures keep their rows, which then never match a request
+        columns = {row[1] for row in connection.execute("PRAGMA table_info(daily_plans)")}
+        if "context" not in columns:
+            connection.execute("ALTER TABLE daily_plans ADD COLUMN context TEXT NOT NULL DEFAULT ''")
+        connection.commit()
+        self._connection = connection
+        self._connection_pid = os.getpid()
+        return connection
+
+    def get(self, user_id: str, plan_date: str, context: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Return the stored plan for a user and date, or None
+
+        Args:
+            user_id: User identifier
+            plan_date: Plan date (YYYY-MM-DD)
+            context: Request context signature the plan must have been generated for; None skips the check
+
+        Returns:
+            Stored DailyPlanResponse payload or None
+        """
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT plan, context FROM daily_plans WHERE user_id = ? AND plan_date = ?", (user_id, plan_date)
+            ).fetchone()
+            if row is None or (context is not None and row[1] != context):
+                self.misses += 1
+                if row is not None:
+                    self.context_mismatches += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def has(self, user_id: str, plan_date: str, context: Optional[str] = None) -> bool:
+        """Whether a plan is stored for a user and date, and for the given context signature if any"""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT context FROM daily_plans WHERE user_id = ? AND plan_date = ?", (user_id, plan_date)
+            ).fetchone()
+        return row is not None and (context is None or row[0] == context)
+
+    def put_many(self, plans: Iterable[Tuple[Dict[str, Any], str]]) -> int:
+        """
+        Insert or replace plans in one transaction
+
+        Args:
+            plans: (DailyPlanResponse payload, request context signature) pairs; user_id and plan_date form the key
+
+        Returns:
+            Number of plans written
+        """
+        now = time.time()
+        rows = [(plan["user_id"], plan["plan_date"], json.dumps(plan), now, context) for plan, context in plans]
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO daily_plans (user_id, plan_date, plan, created_at, context) VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+        return len(rows)
+
+    def put(self, plan: Dict[str, Any], context: str):
+        """Insert or replace a single plan"""
+        self.put_many([(plan, context)])
+
+    def purge_before(self, plan_date: str) -> int:
+        """Delete plans for dates before plan_date (YYYY-MM-DD) and return how many were removed"""
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                cursor = connection.execute("DELETE FROM daily_plans WHERE plan_date < ?", (plan_date,))
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        """Stored plans per date and lookup counters"""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT plan_date, COUNT(*) FROM daily_plans GROUP BY plan_date ORDER BY plan_date DESC LIMIT 7"
+            ).fetchall()
+            lookups = self.hits + self.misses
+            return {
+                "path": str(self.path),
+                "plans_by_date": dict(rows),
+                "hits": self.hits,
+                "misses": self.misses,
+                "context_mismatches": self.context_mismatches,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+    def close(self):
+        """Close the underlying connection"""
+        with self._lock:
+            if self._connection is not None and self._connection_pid == os.getpid():
+                self._connection.close()
+            self._connection = None
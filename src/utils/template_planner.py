@@ -0,0 +1,138 @@
+"""
+Deterministic daily plans assembled from the content catalog, without an LLM call
+"""
+
+import re
+from typing import Any, Dict, List, Set
+
+# Goal keywords (prefixes) that map a free-text goal to catalog categories
+GOAL_KEYWORDS = {
+    "sleep": ("sleep", "rest", "insomnia", "tired", "bed", "nap"),
+    "mental_health": ("stress", "anxi", "calm", "mental", "mood", "worr", "overwhelm", "relax", "burnout"),
+    "meditation": ("meditat", "mindful", "breath", "focus", "present", "calm"),
+    "exercise": ("exercise", "fit", "run", "walk", "workout", "strength", "cardio", "active", "move", "energy", "weight"),
+    "nutrition": ("eat", "food", "diet", "nutrition", "meal", "water", "hydrat", "healthy", "breakfast", "weight")
+}
+
+# Used when a goal matches no keywords, and as minutes for items whose text names no duration
+DEFAULT_CATEGORIES = ("meditation", "mental_health", "exercise", "sleep", "nutrition")
+DEFAULT_DURATIONS = {"meditation": 5, "mental_health": 5, "exercise": 10, "nutrition": 10, "sleep": 10}
+
+DURATION_PATTERN = re.compile(r"(\d+)[\s-]*min", re.IGNORECASE)
+WORD_PATTERN = re.compile(r"[a-z]+")
+
+class TemplatePlanner:
+    """
+    Builds daily plans from catalog items by category, duration budget and recent-activity exclusion.
+
+    Goals are mapped to categories by keyword; items from the best matching categories
+    are picked greedily, at most one per category, within the available minutes,
+    skipping anything the user did recently unless nothing else fits. Output has the
+    same shape as the LLM's plan, so it can be served through the same response path.
+    """
+
+    def __init__(self, catalog: List[Dict[str, Any]], max_items: int = 2):
+        self.max_items = max_items
+        self.items = []
+        for item in catalog:
+            text = f"{item.get('title', '')} {item.get('description', '')}"
+            duration = item.get("duration_minutes")
+            if duration is None:
+                match = DURATION_PATTERN.search(text)
+                duration = int(match.group(1)) if match else DEFAULT_DURATIONS.get(item.get("category"), 10)
+            self.items.append({
+                "id": item["id"],
+                "activity": item["title"],
+                "description": item.get("description", ""),
+                "category": item.get("category", "mental_health"),
+                "duration_minutes": int(duration),
+                "words": set(WORD_PATTERN.findall(f"{text} {' '.join(item.get('tags', []))}".lower()))
+            })
+
+    @staticmethod
+    def goal_categories(goal: str) -> List[str]:
+        """Catalog categories a goal refers to, most keyword matches first"""
+        words = WORD_PATTERN.findall((goal or "").lower())
+        scores = {}
+        for category, keywords in GOAL_KEYWORDS.items():
+            score = sum(1 for word in words if word.startswith(keywords))
+            if score:
+                scores[category] = score
+        return sorted(scores, key=lambda category: -scores[category])
+
+    def can_plan(self, user_data: Dict[str, Any], max_minutes: int) -> bool:
+        """Whether a request is a common case the template plan serves well: short, no mood, recognized goal"""
+        return (
+            not user_data.get("mood")
+            and int(user_data.get("available_time_minutes") or 15) <= max_minutes
+            and bool(self.goal_categories(user_data.get("goal") or ""))
+        )
+
+    @staticmethod
+    def _recent_words(recent_activities: List[str]) -> Set[str]:
+        return {word for activity in recent_activities for word in WORD_PATTERN.findall(activity.lower()) if len(word) > 3}
+
+    def plan(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Assemble a plan for a request
+
+        Args:
+            user_data: DailyPlanRequest fields
+
+        Returns:
+            Dictionary with motivational_message, daily_items and follow_up_time
+        """
+        budget = max(int(user_data.get("available_time_minutes") or 15), 1)
+        goal_words = set(WORD_PATTERN.findall((user_data.get("goal") or "").lower()))
+        categories = self.goal_categories(user_data.get("goal") or "")
+        categories += [category for category in DEFAULT_CATEGORIES if category not in categories]
+        recent = self._recent_words(user_data.get("recent_activities") or [])
+
+        def rank(item):
+            category_rank = categories.index(item["category"]) if item["category"] in categories else len(categories)
+            return category_rank, -len(goal_words & item["words"]), item["duration_minutes"], item["id"]
+
+        ranked = sorted(self.items, key=rank)
+        fresh = [item for item in ranked if not recent & item["words"]]
+
+        # Recently done items are only used when no fresh item fits the budget
+        chosen = self._pick(fresh, budget) or self._pick(ranked, budget)
+
+        daily_items = [
+            {key: item[key] for key in ("activity", "duration_minutes", "description", "category")} for item in chosen
+        ]
+        if not daily_items and ranked:
+            # Nothing fits the budget: a shortened version of the best match
+            best = (fresh or ranked)[0]
+            daily_items = [{
+                "activity": best["activity"],
+                "duration_minutes": budget,
+                "description": f"A shorter {budget}-minute version: {best['description']}",
+                "category": best["category"]
+            }]
+
+        return {
+            "motivational_message": self._motivational_message(int(user_data.get("current_streak") or 0)),
+            "daily_items": daily_items,
+            "follow_up_time": "morning" if (user_data.get("preferred_time") or "").lower() == "evening" else "evening"
+        }
+
+    def _pick(self, candidates: List[Dict[str, Any]], budget: int) -> List[Dict[str, Any]]:
+        """Greedily take ranked items that fit the remaining minutes, at most one per category"""
+        chosen = []
+        remaining = budget
+        for item in candidates:
+            if len(chosen) == self.max_items:
+                break
+            if item["duration_minutes"] <= remaining and all(item["category"] != other["category"] for other in chosen):
+                chosen.append(item)
+                remaining -= item["duration_minutes"]
+        return chosen
+
+    @staticmethod
+    def _motivational_message(streak: int) -> str:
+        if streak <= 0:
+            return "Every habit starts with one small step - today is a great day to take it."
+        if streak < 7:
+            return f"{streak} day{'s' if streak > 1 else ''} in a row! Keep the momentum going with a small win today."
+        return f"{streak}-day streak - your consistency is paying off. Keep it up!"
@@ -0,0 +1,114 @@
+"""
+Shared fixtures: a local OpenAI stub server from scripts.llm_stub_server, and the API routes over fake models
+"""
+
+import socket
+import threading
+import time
+import pytest
+import uvicorn
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import src.api.routes as routes
+from scripts.llm_stub_server import create_app
+from src.utils.model_registry import ModelRegistry
+
+@pytest.fixture
+def stub_server():
+    """Start stub servers with the given create_app options; returns a factory for their /v1 base URLs"""
+    servers = []
+
+    def start(latency_ms: float = 20, rpm: int = 0, error_rate: float = 0.0, **options) -> str:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(("127.0.0.1", 0))
+        server = uvicorn.Server(uvicorn.Config(create_app(latency_ms, rpm, error_rate, **options), log_level="warning"))
+        thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+        thread.start()
+        deadline = time.monotonic() + 10
+        while not server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("Stub server did not start")
+            time.sleep(0.01)
+        servers.append((server, thread))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}/v1"
+
+    yield start
+
+    for server, thread in servers:
+        server.should_exit = True
+        thread.join(timeout=10)
+
+class FakeModel:
+    """Stand-in for a loaded model: always ready, with a model_version"""
+
+    def __init__(self, version: str = "v1"):
+        self.model_version = version
+
+    def is_ready(self) -> bool:
+        return True
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    """
+    API routes over a registry of FakeModel instances, with the admin token set to "secret"
+
+    Yields (client, registry, failing), where warm-ups fail for models whose version is in failing.
+    """
+    registry = ModelRegistry()
+    failing = set()
+
+    async def warm_up(model):
+        if model.model_version in failing:
+            raise Exception("embeddings endpoint unavailable")
+
+    for name in routes.MODEL_WARM_UPS:
+        registry.register(name, FakeModel)
+    monkeypatch.setattr(routes, "model_registry", registry)
+    monkeypatch.setattr(routes.model_watcher, "registry", registry)
+    monkeypatch.setattr(routes, "MODEL_WARM_UPS", {name: warm_up for name in routes.MODEL_WARM_UPS})
+    monkeypatch.setattr(routes, "warmup_state", {
+        "enabled": False, "completed": False, "duration_seconds": None, "errors": {}, "models": {}
+    })
+    monkeypatch.setattr(routes, "_warmup_retries", {})
+    monkeypatch.setenv("ADMIN_API_TOKEN", "secret")
+
+    app = FastAPI()
+    app.include_router(routes.router, prefix="/api/v1")
+    with TestClient(app) as client:
+        yield client, registry, failing
+
+@pytest.fixture
+def micro_coach_factory(monkeypatch, tmp_path):
+    """
+    Build MicroCoach instances with the given routing policy and extra environment, each with its own plan store
+
+    Pass base_url (e.g. from stub_server) for policies that call GPT. The process-wide OpenAI clients
+    and LLM gateway are rebuilt for every coach so they pick up the environment.
+    """
+    from src.models.micro_coach import MicroCoach
+    from src.utils.llm_gateway import get_llm_gateway
+    from src.utils.openai_clients import get_openai_clients
+
+    coaches = []
+
+    def create(policy: str = "template", base_url: str = None, **env) -> MicroCoach:
+        monkeypatch.setenv("PLAN_ROUTING_POLICY", policy)
+        monkeypatch.setenv("PLAN_STORE_PATH", str(tmp_path / f"plans-{len(coaches)}.sqlite3"))
+        if base_url is not None:
+            monkeypatch.setenv("OPENAI_BASE_URL", base_url)
+            monkeypatch.setenv("OPENAI_API_KEY", "stub")
+            monkeypatch.setenv("OPENAI_HTTP2", "False")
+        for name, value in env.items():
+            monkeypatch.setenv(name, str(value))
+        get_openai_clients.cache_clear()
+        get_llm_gateway.cache_clear()
+        coach = MicroCoach()
+        coaches.append(coach)
+        return coach
+
+    yield create
+
+    for coach in coaches:
+        coach.plan_store.close()
+    get_openai_clients.cache_clear()
+    get_llm_gateway.cache_clear()
@@ -0,0 +1,103 @@
+"""
+Admin model endpoints: X-Admin-Token authentication and hot reload
+"""
+
+import pytest
+import src.api.routes as routes
+
+ADMIN_ENDPOINTS = [
+    ("get", "/api/v1/admin/models/versions"),
+    ("post", "/api/v1/admin/models/churn_predictor/reload")
+]
+
+class RetrainedModel:
+    model_version = "v2"
+
+    def is_ready(self) -> bool:
+        return True
+
+def _call(client, method, path, token=None):
+    headers = {"X-Admin-Token": token} if token is not None else {}
+    return getattr(client, method)(path, headers=headers)
+
+@pytest.mark.parametrize("method, path", ADMIN_ENDPOINTS)
+def test_admin_endpoints_are_disabled_without_a_configured_token(fake_api, monkeypatch, method, path):
+    client, registry, _ = fake_api
+    monkeypatch.delenv("ADMIN_API_TOKEN")
+
+    assert _call(client, method, path).status_code == 403
+    assert _call(client, method, path, "secret").status_code == 403
+    monkeypatch.setenv("ADMIN_API_TOKEN", "")
+    assert _call(client, method, path, "").status_code == 403
+    assert not registry.is_loaded("churn_predictor")
+
+@pytest.mark.parametrize("method, path", ADMIN_ENDPOINTS)
+@pytest.mark.parametrize("token", [None, "", "wrong", "secret ", "SECRET"])
+def test_missing_or_wrong_tokens_are_rejected(fake_api, method, path, token):
+    client, registry, _ = fake_api
+
+    response = _call(client, method, path, token)
+    assert response.status_code == 401
+    assert "X-Admin-Token" in response.json()["detail"]
+    assert not registry.is_loaded("churn_predictor")
+
+def test_tokens_are_compared_in_constant_time(fake_api, monkeypatch):
+    client, _, _ = fake_api
+    compared = []
+
+    def compare_digest(a, b):
+        compared.append((a, b))
+        return a == b
+
+    monkeypatch.setattr(routes.secrets, "compare_digest", compare_digest)
+    assert _call(client, "get", "/api/v1/admin/models/versions", "wrong").status_code == 401
+    assert _call(client, "get", "/api/v1/admin/models/versions", "secret").status_code == 200
+    assert compared == [("wrong", "secret"), ("secret", "secret")]
+
+def test_versions_report_loaded_and_available_artifacts(fake_api):
+    client, registry, _ = fake_api
+    registry.get("churn_predictor")
+
+    response = _call(client, "get", "/api/v1/admin/models/versions", "secret")
+    assert response.status_code == 200
+    body = response.json()
+    assert set(body) == {"churn_predictor", "user_clusterer"}
+    assert body["churn_predictor"]["loaded_version"] == "v1"
+    assert body["user_clusterer"]["loaded_version"] is None
+    assert body["churn_predictor"]["available_version"]
+
+def test_reload_swaps_in_a_new_instance(fake_api, monkeypatch):
+    client, registry, _ = fake_api
+    previous = registry.get("churn_predictor")
+    monkeypatch.setitem(registry._factories, "churn_predictor", RetrainedModel)
+
+    response = _call(client, "post", "/api/v1/admin/models/churn_predictor/reload", "secret")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["model"] == "churn_predictor"
+    assert body["model_version"] == "v2"
+    assert body["stats"]["reloads"] == 1
+    assert registry.peek("churn_predictor") is not previous
+
+@pytest.mark.parametrize("model_name", ["micro_coach", "content_matcher", "not_a_model"])
+def test_only_watched_models_can_be_reloaded(fake_api, model_name):
+    client, registry, _ = fake_api
+
+    response = _call(client, "post", f"/api/v1/admin/models/{model_name}/reload", "secret")
+    assert response.status_code == 404
+    assert "stats" not in response.json()
+    assert not any(stats.get("reloads") for stats in registry.stats().values())
+
+def test_failed_reload_keeps_the_current_instance(fake_api, monkeypatch):
+    client, registry, _ = fake_api
+    previous = registry.get("churn_predictor")
+
+    def broken_artifacts():
+        raise Exception("scaler file is truncated")
+
+    monkeypatch.setitem(registry._factories, "churn_predictor", broken_artifacts)
+    response = _call(client, "post", "/api/v1/admin/models/churn_predictor/reload", "secret")
+    assert response.status_code == 500
+    assert "scaler file is truncated" in response.json()["detail"]
+    assert registry.peek("churn_predictor") is previous
+    assert registry.stats()["churn_predictor"]["last_reload_error"] == "scaler file is truncated"
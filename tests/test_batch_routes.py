@@ -0,0 +1,103 @@
+"""
+Batch scoring endpoints against the bundled model artifacts
+"""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import src.api.routes as routes
+from src.api.schemas import MAX_BATCH_USERS
+
+@pytest.fixture(scope="module")
+def client():
+    app = FastAPI()
+    app.include_router(routes.router, prefix="/api/v1")
+    with TestClient(app) as client:
+        yield client
+
+def _churn_user(i: int) -> dict:
+    return {
+        "user_id": f"user-{i}",
+        "days_since_signup": 10 + i,
+        "total_sessions": i % 7,
+        "avg_session_duration": 3.0 + i % 5,
+        "streak_length": i % 4,
+        "last_login_days_ago": i % 12,
+        "content_completion_rate": (i % 10) / 10,
+        "notification_response_rate": (i % 5) / 5,
+        "goal_progress_percentage": (i % 4) / 4
+    }
+
+def test_churn_batch_matches_single_predictions(client):
+    users = [_churn_user(i) for i in range(5)]
+    response = client.post("/api/v1/predict-churn/batch", json={"users": users})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total_users"] == 5
+    assert [prediction["user_id"] for prediction in body["predictions"]] == [user["user_id"] for user in users]
+    # Each user is scored independently of the others in the batch
+    for user, prediction in zip(users, body["predictions"]):
+        single = client.post("/api/v1/predict-churn", json=user)
+        assert single.status_code == 200
+        assert prediction == single.json()
+
+def test_empty_churn_batch(client):
+    response = client.post("/api/v1/predict-churn/batch", json={"users": []})
+    assert response.status_code == 200
+    assert response.json() == {"predictions": [], "total_users": 0}
+
+def test_churn_batch_over_the_limit_is_rejected(client):
+    users = [_churn_user(0)] * (MAX_BATCH_USERS + 1)
+    response = client.post("/api/v1/predict-churn/batch", json={"users": users})
+    assert response.status_code == 422
+
+def test_invalid_user_in_a_churn_batch_is_reported_by_index(client):
+    users = [_churn_user(0), dict(_churn_user(1), total_sessions="many"), _churn_user(2)]
+    response = client.post("/api/v1/predict-churn/batch", json={"users": users})
+
+    assert response.status_code == 422
+    locations = [error["loc"] for error in response.json()["detail"]]
+    assert locations == [["body", "users", 1, "total_sessions"]]
+
+def _behavior(i: int) -> dict:
+    return {
+        "user_id": f"user-{i}",
+        "session_count": 2 + i * 3,
+        "avg_session_duration": 2.0 + i % 9,
+        "streak_length": i % 15,
+        "preferred_time_of_day": ("morning", "afternoon", "evening")[i % 3],
+        "content_engagement_rate": (i % 10) / 10,
+        "notification_response_rate": (i % 7) / 7
+    }
+
+def test_cluster_batch_matches_single_assignments(client):
+    users = [_behavior(i) for i in range(6)]
+    response = client.post("/api/v1/cluster-user/batch", json={"users": users})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total_users"] == 6
+    assert [cluster["user_id"] for cluster in body["clusters"]] == [user["user_id"] for user in users]
+    for user, cluster in zip(users, body["clusters"]):
+        single = client.post("/api/v1/cluster-user", json=user)
+        assert single.status_code == 200
+        assert cluster == pytest.approx(single.json())
+
+def test_empty_cluster_batch(client):
+    response = client.post("/api/v1/cluster-user/batch", json={"users": []})
+    assert response.status_code == 200
+    assert response.json() == {"clusters": [], "total_users": 0}
+
+def test_cluster_batch_over_the_limit_is_rejected(client):
+    users = [_behavior(0)] * (MAX_BATCH_USERS + 1)
+    response = client.post("/api/v1/cluster-user/batch", json={"users": users})
+    assert response.status_code == 422
+
+def test_invalid_user_in_a_cluster_batch_is_reported_by_index(client):
+    users = [_behavior(0), _behavior(1), {k: v for k, v in _behavior(2).items() if k != "streak_length"}]
+    response = client.post("/api/v1/cluster-user/batch", json={"users": users})
+
+    assert response.status_code == 422
+    locations = [error["loc"] for error in response.json()["detail"]]
+    assert locations == [["body", "users", 2, "streak_length"]]
@@ -0,0 +1,139 @@
+"""
+Churn rule tables reproduce the original if/elif risk-factor and intervention logic
+"""
+
+import itertools
+import numpy as np
+import pytest
+from src.models.churn_rules import (
+    CHURN_FEATURES, RISK_LEVELS, bucket_risk_levels, decode_factor_list, decode_intervention,
+    evaluate_risk_factors, select_interventions
+)
+
+EXTENDED = "Extended period without app usage"
+SEVERAL_DAYS = "Several days since last login"
+LOW_SESSIONS = "Low session count relative to signup time"
+LOW_COMPLETION = "Low content completion rate"
+POOR_NOTIFICATIONS = "Poor notification engagement"
+LIMITED_PROGRESS = "Limited progress toward wellness goals"
+GENERAL_DECLINE = "General engagement decline patterns"
+
+RE_ENGAGE = "Send personalized re-engagement campaign with wellness goal reminder"
+SHORTER_CONTENT = "Offer shorter, easier content options with immediate rewards"
+CHECK_IN = "Provide one-on-one check-in with personalized motivation"
+NOTIFICATION_TIMING = "Optimize notification timing and personalize message content"
+STREAKS = "Introduce streak-building challenges with social elements"
+CONTINUE = "Continue current engagement patterns with occasional check-ins"
+
+# An engaged user that triggers no rule
+BASE = {
+    "days_since_signup": 30,
+    "total_sessions": 20,
+    "avg_session_duration": 10.0,
+    "streak_length": 5,
+    "last_login_days_ago": 1,
+    "content_completion_rate": 0.8,
+    "notification_response_rate": 0.8,
+    "goal_progress_percentage": 0.8
+}
+
+def _evaluate(rows, churn_probs):
+    features = np.array([[row[name] for name in CHURN_FEATURES] for row in rows], dtype=float)
+    churn_probs = np.asarray(churn_probs, dtype=float)
+    factor_bits = evaluate_risk_factors(features, churn_probs)
+    risk_levels = bucket_risk_levels(churn_probs)
+    interventions = select_interventions(risk_levels, factor_bits)
+    return [
+        (RISK_LEVELS[level], decode_factor_list(bits), decode_intervention(index))
+        for level, bits, index in zip(risk_levels, factor_bits, interventions)
+    ]
+
+def _reference(row, churn_prob):
+    """The original ChurnPredictor._get_risk_factors / _get_intervention_recommendation"""
+    factors = []
+    if row["last_login_days_ago"] > 7:
+        factors.append(EXTENDED)
+    elif row["last_login_days_ago"] > 3:
+        factors.append(SEVERAL_DAYS)
+    if row["total_sessions"] < 3 and row["days_since_signup"] > 7:
+        factors.append(LOW_SESSIONS)
+    if row["content_completion_rate"] < 0.3:
+        factors.append(LOW_COMPLETION)
+    if row["notification_response_rate"] < 0.2:
+        factors.append(POOR_NOTIFICATIONS)
+    if row["goal_progress_percentage"] < 0.2:
+        factors.append(LIMITED_PROGRESS)
+    if not factors and churn_prob > 0.5:
+        factors.append(GENERAL_DECLINE)
+
+    if churn_prob >= 0.7:
+        risk_level = "high"
+        if EXTENDED in factors:
+            intervention = RE_ENGAGE
+        elif LOW_COMPLETION in factors:
+            intervention = SHORTER_CONTENT
+        else:
+            intervention = CHECK_IN
+    elif churn_prob >= 0.4:
+        risk_level = "medium"
+        intervention = NOTIFICATION_TIMING if "notification engagement" in " ".join(factors).lower() else STREAKS
+    else:
+        risk_level = "low"
+        intervention = CONTINUE
+    return risk_level, factors, intervention
+
+CASES = [
+    # (feature overrides, churn probability, risk level, factors, intervention)
+    ({}, 0.1, "low", [], CONTINUE),
+    ({}, 0.39, "low", [], CONTINUE),
+    ({}, 0.4, "medium", [], STREAKS),
+    ({}, 0.5, "medium", [], STREAKS),
+    ({}, 0.51, "medium", [GENERAL_DECLINE], STREAKS),
+    ({}, 0.7, "high", [GENERAL_DECLINE], CHECK_IN),
+    ({"last_login_days_ago": 3}, 0.9, "high", [GENERAL_DECLINE], CHECK_IN),
+    ({"last_login_days_ago": 3.5}, 0.9, "high", [SEVERAL_DAYS], CHECK_IN),
+    ({"last_login_days_ago": 7}, 0.9, "high", [SEVERAL_DAYS], CHECK_IN),
+    ({"last_login_days_ago": 8}, 0.9, "high", [EXTENDED], RE_ENGAGE),
+    ({"last_login_days_ago": 8, "content_completion_rate": 0.1}, 0.9, "high", [EXTENDED, LOW_COMPLETION], RE_ENGAGE),
+    ({"content_completion_rate": 0.29}, 0.9, "high", [LOW_COMPLETION], SHORTER_CONTENT),
+    ({"content_completion_rate": 0.3}, 0.9, "high", [GENERAL_DECLINE], CHECK_IN),
+    ({"total_sessions": 2, "days_since_signup": 8}, 0.2, "low", [LOW_SESSIONS], CONTINUE),
+    ({"total_sessions": 2, "days_since_signup": 7}, 0.2, "low", [], CONTINUE),
+    ({"total_sessions": 3, "days_since_signup": 8}, 0.2, "low", [], CONTINUE),
+    ({"notification_response_rate": 0.19}, 0.45, "medium", [POOR_NOTIFICATIONS], NOTIFICATION_TIMING),
+    ({"notification_response_rate": 0.2}, 0.45, "medium", [], STREAKS),
+    ({"goal_progress_percentage": 0.19}, 0.45, "medium", [LIMITED_PROGRESS], STREAKS),
+    ({"goal_progress_percentage": 0.2}, 0.45, "medium", [], STREAKS),
+    (
+        {"last_login_days_ago": 5, "total_sessions": 1, "days_since_signup": 30, "content_completion_rate": 0.0,
+         "notification_response_rate": 0.0, "goal_progress_percentage": 0.0},
+        0.95, "high",
+        [SEVERAL_DAYS, LOW_SESSIONS, LOW_COMPLETION, POOR_NOTIFICATIONS, LIMITED_PROGRESS],
+        SHORTER_CONTENT
+    ),
+]
+
+@pytest.mark.parametrize("overrides, churn_prob, risk_level, factors, intervention", CASES)
+def test_rule_tables(overrides, churn_prob, risk_level, factors, intervention):
+    row = dict(BASE, **overrides)
+    assert _evaluate([row], [churn_prob]) == [(risk_level, factors, intervention)]
+    assert _reference(row, churn_prob) == (risk_level, factors, intervention)
+
+def test_rule_tables_match_the_original_logic_on_every_boundary():
+    boundaries = {
+        "last_login_days_ago": (0, 3, 3.01, 7, 7.01, 30),
+        "total_sessions": (0, 2.99, 3, 10),
+        "days_since_signup": (7, 7.01),
+        "content_completion_rate": (0.29, 0.3),
+        "notification_response_rate": (0.19, 0.2),
+        "goal_progress_percentage": (0.19, 0.2)
+    }
+    churn_probs = (0.0, 0.39, 0.4, 0.5, 0.51, 0.69, 0.7, 1.0)
+
+    rows, probs = [], []
+    for values in itertools.product(*boundaries.values()):
+        for churn_prob in churn_probs:
+            rows.append(dict(BASE, **dict(zip(boundaries, values))))
+            probs.append(churn_prob)
+
+    assert _evaluate(rows, probs) == [_reference(row, prob) for row, prob in zip(rows, probs)]
@@ -0,0 +1,100 @@
+"""
+EmbeddingBatcher fan-out, flushing and error propagation
+"""
+
+import asyncio
+import pytest
+from src.utils.embedding_batcher import EmbeddingBatcher
+
+class FakeEmbedder:
+    """Records every batch and embeds a text as [len(text), call number]"""
+
+    def __init__(self, error: Exception = None, drop_last: bool = False):
+        self.calls = []
+        self.error = error
+        self.drop_last = drop_last
+
+    async def __call__(self, texts):
+        self.calls.append(list(texts))
+        call = float(len(self.calls))
+        await asyncio.sleep(0)
+        if self.error is not None:
+            raise self.error
+        embeddings = [[float(len(text)), call] for text in texts]
+        return embeddings[:-1] if self.drop_last else embeddings
+
+@pytest.mark.asyncio
+async def test_concurrent_texts_share_one_call_and_duplicates_are_embedded_once():
+    embedder = FakeEmbedder()
+    batcher = EmbeddingBatcher(embedder, max_batch_size=64, max_wait_ms=20)
+
+    texts = ["sleep", "run", "sleep", "meditate", "run"]
+    results = await asyncio.gather(*[batcher.embed(text) for text in texts])
+
+    assert embedder.calls == [["sleep", "run", "meditate"]]
+    assert results == [[float(len(text)), 1.0] for text in texts]
+    stats = batcher.stats()
+    assert stats["requests"] == 5
+    assert stats["batches"] == 1
+    assert stats["embedded_texts"] == 3
+    assert stats["avg_batch_size"] == 5.0
+
+@pytest.mark.asyncio
+async def test_full_batch_flushes_without_waiting():
+    embedder = FakeEmbedder()
+    # A wait far beyond the test timeout: only the size limit can flush these batches
+    batcher = EmbeddingBatcher(embedder, max_batch_size=2, max_wait_ms=60000)
+
+    results = await asyncio.wait_for(
+        asyncio.gather(*[batcher.embed(f"text-{i}") for i in range(4)]),
+        timeout=1
+    )
+
+    assert embedder.calls == [["text-0", "text-1"], ["text-2", "text-3"]]
+    assert [result[1] for result in results] == [1.0, 1.0, 2.0, 2.0]
+
+@pytest.mark.asyncio
+async def test_later_texts_start_a_new_batch():
+    embedder = FakeEmbedder()
+    batcher = EmbeddingBatcher(embedder, max_batch_size=64, max_wait_ms=1)
+
+    await batcher.embed("first")
+    await batcher.embed("second")
+
+    assert embedder.calls == [["first"], ["second"]]
+
+@pytest.mark.asyncio
+async def test_embed_errors_reach_every_caller():
+    embedder = FakeEmbedder(error=RuntimeError("upstream down"))
+    batcher = EmbeddingBatcher(embedder, max_batch_size=64, max_wait_ms=1)
+
+    results = await asyncio.gather(*[batcher.embed(text) for text in ["a", "b", "a"]], return_exceptions=True)
+
+    assert len(embedder.calls) == 1
+    assert all(isinstance(result, RuntimeError) and str(result) == "upstream down" for result in results)
+
+@pytest.mark.asyncio
+async def test_short_result_fails_every_caller():
+    embedder = FakeEmbedder(drop_last=True)
+    batcher = EmbeddingBatcher(embedder, max_batch_size=64, max_wait_ms=1)
+
+    results = await asyncio.gather(*[batcher.embed(text) for text in ["a", "bb", "ccc"]], return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in results)
+
+@pytest.mark.asyncio
+async def test_cancelled_flush_does_not_leave_callers_waiting():
+    started = asyncio.Event()
+
+    async def hang(texts):
+        started.set()
+        await asyncio.sleep(60)
+
+    batcher = EmbeddingBatcher(hang, max_batch_size=64, max_wait_ms=1)
+    caller = asyncio.create_task(batcher.embed("stuck"))
+    await started.wait()
+    for task in list(batcher._tasks):
+        task.cancel()
+
+    with pytest.raises(Exception, match="without a result"):
+        await asyncio.wait_for(caller, timeout=1)
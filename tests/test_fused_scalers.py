@@ -0,0 +1,127 @@
+"""
+Compiled forest and nearest-centroid kernels with a fused StandardScaler match the sklearn pipeline
+"""
+
+import warnings
+import numpy as np
+import pytest
+from sklearn.cluster import KMeans
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+from src.models.churn_model import ChurnPredictor
+from src.models.clustering import UserClusterer
+from src.utils.feature_prep import scale_features
+from src.utils.forest_compiler import CHUNK_ROWS, CompiledForest
+from src.utils.kmeans_kernel import NearestCentroidKernel
+
+@pytest.fixture(scope="module")
+def raw_features():
+    rng = np.random.default_rng(0)
+    # Features on very different scales and offsets, like the churn and cluster inputs
+    scales = np.array([1.0, 30.0, 0.01, 500.0, 7.0])
+    offsets = np.array([0.0, 100.0, -3.0, 2000.0, 12.5])
+    return rng.normal(size=(CHUNK_ROWS * 2 + 37, len(scales))) * scales + offsets
+
+@pytest.fixture(scope="module")
+def scaler(raw_features):
+    return StandardScaler().fit(raw_features)
+
+def test_fused_forest_matches_scaler_then_forest(raw_features, scaler):
+    scaled = scaler.transform(raw_features)
+    labels = (scaled[:, 0] + scaled[:, 1] * scaled[:, 3] > 0.2).astype(int)
+    forest = RandomForestClassifier(n_estimators=15, max_depth=8, random_state=0).fit(scaled, labels)
+
+    compiled = CompiledForest.from_sklearn(forest)
+    fused = compiled.fuse_scaler(scaler.mean_, scaler.scale_)
+    expected = forest.predict_proba(scaled)
+
+    # Raw input spans several CHUNK_ROWS chunks
+    assert raw_features.shape[0] > CHUNK_ROWS
+    np.testing.assert_array_equal(compiled.predict_proba(scaled), expected)
+    np.testing.assert_array_equal(fused.predict_proba(raw_features), expected)
+    np.testing.assert_array_equal(fused.apply(raw_features), compiled.apply(scaled))
+
+def test_fused_forest_matches_on_split_boundaries(raw_features, scaler):
+    scaled = scaler.transform(raw_features)
+    labels = (scaled[:, 2] > 0).astype(int)
+    forest = RandomForestClassifier(n_estimators=5, max_depth=6, random_state=1).fit(scaled, labels)
+    compiled = CompiledForest.from_sklearn(forest)
+    fused = compiled.fuse_scaler(scaler.mean_, scaler.scale_)
+
+    # Raw values whose scaled float32 value lands exactly on a split threshold
+    internal = compiled.left != np.arange(len(compiled.left))
+    features = compiled.feature[internal]
+    thresholds = compiled.threshold[internal]
+    boundary = np.tile(scaler.mean_, (len(features), 1))
+    boundary[np.arange(len(features)), features] = thresholds * scaler.scale_[features] + scaler.mean_[features]
+
+    np.testing.assert_array_equal(
+        fused.predict_proba(boundary),
+        forest.predict_proba(scaler.transform(boundary))
+    )
+
+def test_fused_forest_cannot_be_fused_twice(raw_features, scaler):
+    labels = (raw_features[:, 0] > 0).astype(int)
+    forest = RandomForestClassifier(n_estimators=2, max_depth=3, random_state=0).fit(scaler.transform(raw_features), labels)
+    fused = CompiledForest.from_sklearn(forest).fuse_scaler(scaler.mean_, scaler.scale_)
+
+    with pytest.raises(ValueError):
+        fused.fuse_scaler(scaler.mean_, scaler.scale_)
+
+def test_fused_kmeans_matches_scaler_then_kmeans(raw_features, scaler):
+    scaled = scaler.transform(raw_features)
+    kmeans = KMeans(n_clusters=6, n_init=3, random_state=0).fit(scaled)
+
+    kernel = NearestCentroidKernel.from_sklearn(kmeans)
+    fused = kernel.fuse_scaler(scaler.mean_, scaler.scale_)
+    expected_distances = kmeans.transform(scaled)
+
+    np.testing.assert_allclose(kernel.transform(scaled), expected_distances, rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(fused.transform(raw_features), expected_distances, rtol=1e-9, atol=1e-9)
+
+    labels, distances = fused.assign(raw_features)
+    np.testing.assert_array_equal(labels, kmeans.predict(scaled))
+    np.testing.assert_allclose(distances, expected_distances, rtol=1e-9, atol=1e-9)
+
+def test_fused_kmeans_single_row_and_refuse(raw_features, scaler):
+    kmeans = KMeans(n_clusters=3, n_init=3, random_state=0).fit(scaler.transform(raw_features))
+    fused = NearestCentroidKernel.from_sklearn(kmeans).fuse_scaler(scaler.mean_, scaler.scale_)
+
+    labels, _ = fused.assign(raw_features[:1])
+    assert labels.tolist() == kmeans.predict(scaler.transform(raw_features[:1])).tolist()
+    with pytest.raises(ValueError):
+        fused.fuse_scaler(scaler.mean_, scaler.scale_)
+    with pytest.raises(ValueError):
+        fused.transform(raw_features[:, :2])
+
+NAMES = ["a", "b", "c", "d", "e"]
+
+def test_scale_features_matches_transform_of_named_columns(raw_features):
+    named = StandardScaler().fit(raw_features)
+    named.feature_names_in_ = np.array(NAMES, dtype=object)
+
+    with pytest.warns(UserWarning, match="feature names"):
+        expected = named.transform(raw_features)
+    np.testing.assert_array_equal(scale_features(named, raw_features, NAMES), expected)
+    with pytest.raises(ValueError):
+        scale_features(named, raw_features, NAMES[::-1])
+
+def test_sklearn_churn_backend_scales_without_feature_name_warnings(monkeypatch):
+    monkeypatch.setenv("CHURN_MODEL_BACKEND", "sklearn")
+    predictor = ChurnPredictor()
+    assert predictor.compiled_model is None
+    assert list(predictor.churn_scaler.feature_names_in_) == predictor.feature_names
+
+    features = predictor.churn_scaler.mean_ + np.random.default_rng(0).standard_normal((64, 8)) * predictor.churn_scaler.scale_
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", UserWarning)
+        probabilities = predictor._predict_proba(features)
+    assert probabilities.shape == (64, 2)
+
+def test_clusterer_fuses_its_scaler_without_feature_name_warnings():
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", UserWarning)
+        warnings.filterwarnings("ignore", message="Trying to unpickle")
+        clusterer = UserClusterer(use_artifact=False)
+    assert clusterer.scaler_fused
+    assert list(clusterer.clustering_scaler.feature_names_in_) == list(UserClusterer.FEATURES)
@@ -0,0 +1,78 @@
+"""
+JSONStreamParser on plans streamed in arbitrary chunk sizes
+"""
+
+import json
+import pytest
+from src.utils.json_stream import JSONStreamParser
+
+PLAN = {
+    "message": "Good morning! Let's keep the \"streak\" going {today}.",
+    "items": [
+        {"title": "Breathe", "duration_minutes": 5, "tags": ["calm", "focus"]},
+        {"title": "Stretch \\ walk", "duration_minutes": 10, "tags": []},
+        {"title": "Reflect", "duration_minutes": 3.5, "tags": ["journal"]}
+    ],
+    "follow_up": None,
+    "ready": True,
+    "streak": 12
+}
+
+def _stream(text: str, size: int):
+    parser = JSONStreamParser()
+    events = []
+    for start in range(0, len(text), size):
+        events.extend(parser.feed(text[start:start + size]))
+    return parser, events
+
+@pytest.mark.parametrize("size", [1, 3, 7, 1000])
+def test_fields_and_array_items_are_reported_in_order(size):
+    text = "```json\n" + json.dumps(PLAN, indent=2) + "\n```"
+    parser, events = _stream(text, size)
+
+    assert events == [
+        ("message", None, PLAN["message"]),
+        ("items", 0, PLAN["items"][0]),
+        ("items", 1, PLAN["items"][1]),
+        ("items", 2, PLAN["items"][2]),
+        ("items", None, PLAN["items"]),
+        ("follow_up", None, None),
+        ("ready", None, True),
+        ("streak", None, 12)
+    ]
+    assert parser.complete
+    assert parser.result() == PLAN
+
+def test_items_are_reported_before_the_array_closes():
+    text = json.dumps(PLAN, separators=(",", ":"))
+    cut = text.index('{"title":"Stretch')
+
+    parser = JSONStreamParser()
+    events = parser.feed(text[:cut])
+    assert events == [("message", None, PLAN["message"]), ("items", 0, PLAN["items"][0])]
+    assert not parser.complete
+
+def test_incomplete_stream_raises():
+    text = json.dumps(PLAN)
+    parser, _ = _stream(text[:-1], 5)
+
+    assert not parser.complete
+    with pytest.raises(ValueError):
+        parser.result()
+
+def test_text_after_the_object_is_ignored():
+    parser = JSONStreamParser()
+    events = parser.feed('Sure! {"message": "hi", "items": []} trailing {"message": "again"}')
+
+    assert events == [("message", None, "hi"), ("items", None, [])]
+    assert parser.feed('{"extra": 1}') == []
+    assert parser.result() == {"message": "hi", "items": []}
+
+def test_input_after_the_object_is_not_buffered():
+    parser = JSONStreamParser()
+    parser.feed('{"message": "hi"}\n```')
+    for _ in range(100):
+        assert parser.feed("x" * 1000) == []
+
+    assert len(parser._text) == len('{"message": "hi"}')
+    assert parser.result() == {"message": "hi"}
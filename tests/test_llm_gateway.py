@@ -0,0 +1,142 @@
+"""
+LLMGateway scheduling against the local OpenAI stub server
+"""
+
+import asyncio
+import time
+import openai
+import pytest
+from src.utils.llm_gateway import PRIORITY_BATCH, PRIORITY_INTERACTIVE, LLMGateway, LLMRateLimitError
+
+MESSAGES = [{"role": "user", "content": "Plan my day"}]
+
+def _client(base_url: str) -> openai.AsyncOpenAI:
+    return openai.AsyncOpenAI(base_url=base_url, api_key="stub", max_retries=0)
+
+def _chat(client: openai.AsyncOpenAI):
+    return lambda: client.chat.completions.create(model="gpt-4o-mini", messages=MESSAGES)
+
+@pytest.mark.asyncio
+async def test_waiting_calls_are_admitted_by_priority(stub_server):
+    client = _client(stub_server(latency_ms=30))
+    gateway = LLMGateway(max_concurrency=1)
+    order = []
+
+    async def call(name: str, priority: int):
+        await gateway.submit(_chat(client), estimated_tokens=100, priority=priority, operation=name)
+        order.append(name)
+
+    # The first call holds the only slot while the rest queue up, batch work first
+    first = asyncio.create_task(call("first", PRIORITY_INTERACTIVE))
+    await asyncio.sleep(0.005)
+    queued = [asyncio.create_task(call(f"batch-{i}", PRIORITY_BATCH)) for i in range(3)]
+    await asyncio.sleep(0.005)
+    queued += [asyncio.create_task(call(f"interactive-{i}", PRIORITY_INTERACTIVE)) for i in range(2)]
+    await asyncio.gather(first, *queued)
+    await client.close()
+
+    assert order == ["first", "interactive-0", "interactive-1", "batch-0", "batch-1", "batch-2"]
+    assert gateway.stats()["queued"] == 0
+    assert gateway.stats()["in_flight"] == 0
+
+@pytest.mark.asyncio
+async def test_429_pauses_admissions_and_is_retried(stub_server):
+    client = _client(stub_server(latency_ms=5, rpm=2, window_seconds=0.5))
+    gateway = LLMGateway(max_concurrency=4, base_delay=0.05, max_queue_seconds=5)
+
+    started = time.monotonic()
+    results = await asyncio.gather(*[
+        gateway.submit(_chat(client), estimated_tokens=100, operation="chat") for _ in range(4)
+    ])
+    elapsed = time.monotonic() - started
+    await client.close()
+
+    assert all(result.choices[0].message.content for result in results)
+    metrics = gateway.stats()["operations"]["chat"]
+    assert metrics["calls"] == 4
+    assert metrics["rate_limited"] >= 1
+    assert metrics["retries"] >= 1
+    assert metrics["errors"] == 0
+    # Retried calls waited for the stub's Retry-After window instead of failing
+    assert elapsed >= 0.4
+
+@pytest.mark.asyncio
+async def test_queue_timeout_when_slots_stay_busy(stub_server):
+    client = _client(stub_server(latency_ms=1000))
+    gateway = LLMGateway(max_concurrency=1, max_queue_seconds=0.3)
+
+    slow = asyncio.create_task(gateway.submit(_chat(client), estimated_tokens=100, operation="chat"))
+    await asyncio.sleep(0.05)
+    started = time.monotonic()
+    with pytest.raises(LLMRateLimitError) as error:
+        await gateway.submit(_chat(client), estimated_tokens=100, operation="chat")
+    waited = time.monotonic() - started
+
+    assert 0.2 <= waited < 0.6
+    assert error.value.retry_after >= 1.0
+    assert gateway.stats()["queued"] == 0
+    await slow
+    await client.close()
+    assert gateway.stats()["in_flight"] == 0
+
+@pytest.mark.asyncio
+async def test_queue_timeout_is_immediate_when_the_bucket_wait_exceeds_it(stub_server):
+    client = _client(stub_server())
+    gateway = LLMGateway(requests_per_minute=1, max_queue_seconds=1)
+
+    await gateway.submit(_chat(client), estimated_tokens=100, operation="chat")
+    started = time.monotonic()
+    with pytest.raises(LLMRateLimitError) as error:
+        await gateway.submit(_chat(client), estimated_tokens=100, operation="chat")
+    await client.close()
+
+    assert time.monotonic() - started < 0.1
+    assert error.value.retry_after > 1.0
+    assert gateway.stats()["operations"]["chat"]["rate_limited"] == 1
+
+def _stream_chat(client: openai.AsyncOpenAI):
+    return lambda: client.chat.completions.create(
+        model="gpt-4o-mini", messages=MESSAGES, stream=True, stream_options={"include_usage": True}
+    )
+
+@pytest.mark.asyncio
+async def test_streams_hold_their_slot_and_report_usage(stub_server):
+    client = _client(stub_server(latency_ms=5, token_ms=2))
+    gateway = LLMGateway(max_concurrency=1, tokens_per_minute=100000)
+    in_flight = []
+    content = ""
+
+    chunks = gateway.stream(_stream_chat(client), estimated_tokens=5000, operation="chat.stream")
+    async for chunk in chunks:
+        in_flight.append(gateway.stats()["in_flight"])
+        if chunk.choices and chunk.choices[0].delta.content:
+            content += chunk.choices[0].delta.content
+    await client.close()
+
+    assert content
+    assert set(in_flight) == {1}
+    stats = gateway.stats()
+    assert stats["in_flight"] == 0
+    metrics = stats["operations"]["chat.stream"]
+    assert metrics["calls"] == 1
+    assert metrics["prompt_tokens"] > 0
+    assert metrics["completion_tokens"] > 0
+    # The 5000-token reservation was corrected to the reported usage
+    assert stats["available_tokens"] > 100000 - 1000
+
+@pytest.mark.asyncio
+async def test_closing_a_stream_early_releases_its_slot(stub_server):
+    client = _client(stub_server(latency_ms=5, token_ms=2))
+    gateway = LLMGateway(max_concurrency=1)
+
+    chunks = gateway.stream(_stream_chat(client), estimated_tokens=100, operation="chat.stream")
+    async for _ in chunks:
+        break
+    assert gateway.stats()["in_flight"] == 1
+    await chunks.aclose()
+    assert gateway.stats()["in_flight"] == 0
+
+    # The freed slot admits the next call straight away
+    result = await asyncio.wait_for(gateway.submit(_chat(client), estimated_tokens=100, operation="chat"), timeout=2)
+    await client.close()
+    assert result.choices[0].message.content
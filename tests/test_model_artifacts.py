@@ -0,0 +1,45 @@
+"""
+Exported .welli artifacts are used only while the joblib files they came from are unchanged
+"""
+
+import os
+import shutil
+from pathlib import Path
+import pytest
+from src.models.clustering import UserClusterer
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+@pytest.fixture
+def model_dir(tmp_path, monkeypatch):
+    shutil.copytree(REPO_ROOT / "ml_models" / "clustering", tmp_path / "ml_models" / "clustering",
+                    ignore=shutil.ignore_patterns("*.welli"))
+    monkeypatch.chdir(tmp_path)
+    UserClusterer(use_artifact=False).export_artifact()
+    return tmp_path / "ml_models" / "clustering"
+
+def test_artifact_is_used_while_the_sources_are_unchanged(model_dir):
+    clusterer = UserClusterer()
+    assert clusterer.loaded_from_artifact
+    assert clusterer.kmeans_model is None
+
+def test_source_files_are_not_read_to_validate_the_artifact(model_dir, monkeypatch):
+    read = []
+    original = Path.read_bytes
+
+    def read_bytes(path):
+        read.append(path.name)
+        return original(path)
+
+    monkeypatch.setattr(Path, "read_bytes", read_bytes)
+    assert UserClusterer().loaded_from_artifact
+    assert not [name for name in read if name.endswith(".joblib")]
+
+@pytest.mark.parametrize("source", UserClusterer.SOURCE_FILES)
+def test_retrained_sources_make_the_artifact_stale(model_dir, source):
+    stat = (model_dir / source).stat()
+    os.utime(model_dir / source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    clusterer = UserClusterer()
+    assert not clusterer.loaded_from_artifact
+    assert clusterer.kmeans_model is not None
@@ -0,0 +1,98 @@
+"""
+/models/health readiness: loaded, ready and warmed up, without triggering loads
+"""
+
+import time
+import pytest
+import src.api.routes as routes
+
+class RetrainedModel:
+    """What a reload builds from new artifacts"""
+
+    model_version = "v2"
+
+    def is_ready(self) -> bool:
+        return True
+
+def _health(client):
+    response = client.get("/api/v1/models/health")
+    return response.status_code, response.json()
+
+def test_models_are_not_ready_until_loaded(fake_api):
+    client, registry, _ = fake_api
+    status, body = _health(client)
+    assert status == 503
+    assert body["status"] == "degraded"
+    assert not any(body["models"].values())
+    # The probe itself never loads a model
+    assert not any(registry.is_loaded(name) for name in routes.MODEL_WARM_UPS)
+
+def test_loaded_models_count_as_warm_without_startup_warm_up(fake_api):
+    client, registry, _ = fake_api
+    for name in routes.MODEL_WARM_UPS:
+        registry.get(name)
+
+    status, body = _health(client)
+    assert status == 200
+    assert body["status"] == "healthy"
+
+def test_model_that_failed_warm_up_is_not_ready(fake_api, monkeypatch):
+    client, _, failing = fake_api
+    monkeypatch.setattr(routes, "WARMUP_RETRY_SECONDS", 3600)
+    failing.add("v1")
+    client.portal.call(routes.warm_up_models)
+
+    status, body = _health(client)
+    assert status == 503
+    assert not any(body["models"].values())
+    assert body["warmup"]["errors"]["content_matcher"] == "embeddings endpoint unavailable"
+
+def test_failed_warm_up_is_retried_from_health_probes(fake_api, monkeypatch):
+    client, _, failing = fake_api
+    monkeypatch.setattr(routes, "WARMUP_RETRY_SECONDS", 0)
+    failing.add("v1")
+    client.portal.call(routes.warm_up_models)
+    assert _health(client)[0] == 503
+
+    failing.clear()
+    deadline = time.monotonic() + 5
+    while _health(client)[0] != 200:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert routes.warmup_state["errors"] == {}
+
+def test_reload_warms_the_new_instance(fake_api, monkeypatch):
+    client, registry, failing = fake_api
+    monkeypatch.setattr(routes, "WARMUP_RETRY_SECONDS", 3600)
+    client.portal.call(routes.warm_up_models)
+    assert _health(client)[0] == 200
+
+    # The reloaded instance fails its warm-up, so the model is reported not ready
+    monkeypatch.setattr(registry, "_factories", dict(registry._factories, churn_predictor=RetrainedModel))
+    failing.add("v2")
+    response = client.post("/api/v1/admin/models/churn_predictor/reload", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert response.json()["warmup"]["warm"] is False
+    status, body = _health(client)
+    assert status == 503
+    assert body["models"]["churn_predictor"] is False
+
+    # A successful reload clears it again
+    failing.clear()
+    response = client.post("/api/v1/admin/models/churn_predictor/reload", headers={"X-Admin-Token": "secret"})
+    assert response.json()["warmup"]["warm"] is True
+    assert _health(client)[0] == 200
+
+@pytest.mark.asyncio
+async def test_watcher_reload_warms_the_new_instance(fake_api, monkeypatch):
+    _, registry, _ = fake_api
+    registry.get("churn_predictor")
+    routes.warmup_state["enabled"] = True
+    monkeypatch.setattr(routes.model_watcher, "loaders", {"churn_predictor": routes.model_watcher.loaders["churn_predictor"]})
+    monkeypatch.setattr(routes.model_watcher.loaders["churn_predictor"], "directory_version", lambda: "v2")
+
+    await routes.model_watcher.check_once()
+    await routes.model_watcher.check_once()
+
+    assert registry.stats()["churn_predictor"]["reloads"] == 1
+    assert routes.warmup_state["models"]["churn_predictor"]["warm"] is True
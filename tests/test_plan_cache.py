@@ -0,0 +1,237 @@
+"""
+PlanCache context bucketing, day rollover, TTL and goal aliasing
+"""
+
+import json
+from datetime import date
+import numpy as np
+import pytest
+import src.utils.plan_cache as plan_cache_module
+from src.utils.plan_cache import PlanCache, canonical_context, context_signature
+
+USER = {
+    "goal": "  Sleep BETTER! ",
+    "current_streak": 9,
+    "available_time_minutes": 27,
+    "preferred_time": "Evening",
+    "mood": "Tired.",
+    "recent_activities": ["Yoga", "walk", "yoga!", "Journal", "Breathing"]
+}
+
+PLAN = {"message": "Wind down early", "items": [{"title": "Breathe", "duration_minutes": 5}]}
+
+class FakeBackend:
+    """The redis-py get/set subset PlanCache relies on"""
+
+    def __init__(self):
+        self.values = {}
+        self.expiry = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value
+        self.expiry[key] = ex
+
+class FakeDate(date):
+    """date with a settable today()"""
+
+    current = date(2026, 3, 1)
+
+    @classmethod
+    def today(cls):
+        return cls.current
+
+def test_context_is_bucketed_down_and_normalized():
+    context = canonical_context(USER)
+
+    assert context == {
+        "goal": "sleep better",
+        "current_streak": 7,
+        "recent_activities": ["walk", "yoga"],
+        "available_time_minutes": 20,
+        "preferred_time": "evening",
+        "mood": "tired"
+    }
+
+@pytest.mark.parametrize("streak, expected", [(0, 0), (1, 1), (2, 1), (13, 7), (30, 30), (365, 100)])
+def test_streak_buckets(streak, expected):
+    assert canonical_context({"current_streak": streak})["current_streak"] == expected
+
+@pytest.mark.parametrize("minutes, expected", [(1, 1), (5, 5), (14, 10), (45, 45), (240, 90)])
+def test_time_buckets(minutes, expected):
+    assert canonical_context({"available_time_minutes": minutes})["available_time_minutes"] == expected
+
+def test_defaults_and_recent_activity_limit():
+    context = canonical_context({}, max_recent_activities=0)
+    assert context["goal"] == "improve overall wellness"
+    assert context["available_time_minutes"] == 15
+    assert context["preferred_time"] == "morning"
+    assert context["mood"] is None
+    assert context["recent_activities"] == []
+
+    assert canonical_context(USER, max_recent_activities=0)["recent_activities"] == []
+    # Order of recent activities does not change the signature
+    shuffled = dict(USER, recent_activities=["WALK", "yoga"])
+    assert context_signature(canonical_context(shuffled)) == context_signature(canonical_context(USER))
+
+def test_similar_users_share_a_signature():
+    other = dict(USER, goal="sleep better", current_streak=13, available_time_minutes=29, mood="tired")
+    assert context_signature(canonical_context(other)) == context_signature(canonical_context(USER))
+    assert context_signature(canonical_context(dict(USER, mood="happy"))) != context_signature(canonical_context(USER))
+
+def test_get_set_and_saved_tokens():
+    cache = PlanCache()
+    context = cache.canonical_context(USER)
+    today = date.today().isoformat()
+
+    assert cache.get(context, today) is None
+    cache.set(context, today, PLAN, tokens=120)
+    assert cache.get(context, today) == PLAN
+    assert cache.get(cache.canonical_context(dict(USER, mood="happy")), today) is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["saved_tokens"] == 120
+    assert stats["size"] == 1
+
+def test_entries_for_past_dates_are_dropped_when_the_day_changes(monkeypatch):
+    monkeypatch.setattr(plan_cache_module, "date", FakeDate)
+    cache = PlanCache(ttl_seconds=7 * 86400)
+    context = cache.canonical_context(USER)
+
+    FakeDate.current = date(2026, 3, 1)
+    cache.set(context, "2026-03-01", PLAN)
+    cache.set(context, "2026-03-02", PLAN)
+    assert cache.get(context, "2026-03-01") == PLAN
+
+    FakeDate.current = date(2026, 3, 2)
+    assert cache.get(context, "2026-03-02") == PLAN
+    assert cache.stats()["size"] == 1
+    assert cache.stats()["today"] == "2026-03-02"
+    assert cache.get(context, "2026-03-01") is None
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(plan_cache_module.time, "monotonic", lambda: clock[0])
+    cache = PlanCache(ttl_seconds=60)
+    context = cache.canonical_context(USER)
+    today = date.today().isoformat()
+
+    cache.set(context, today, PLAN)
+    clock[0] += 59
+    assert cache.get(context, today) == PLAN
+    clock[0] += 2
+    assert cache.get(context, today) is None
+    assert cache.stats()["size"] == 0
+
+def test_least_recently_used_plans_are_evicted():
+    cache = PlanCache(max_size=2)
+    today = date.today().isoformat()
+    contexts = [cache.canonical_context(dict(USER, goal=goal)) for goal in ("a", "b", "c")]
+
+    cache.set(contexts[0], today, PLAN)
+    cache.set(contexts[1], today, PLAN)
+    cache.get(contexts[0], today)
+    cache.set(contexts[2], today, PLAN)
+
+    assert cache.get(contexts[0], today) == PLAN
+    assert cache.get(contexts[1], today) is None
+    assert cache.get(contexts[2], today) == PLAN
+
+def test_similar_goals_share_entries_and_aliases_are_bounded():
+    cache = PlanCache(similarity_threshold=0.9, max_goals=2)
+
+    assert cache.needs_goal_embedding("Sleep better")
+    assert cache.resolve_goal("Sleep better", np.array([1.0, 0.0, 0.0])) == "sleep better"
+    assert cache.resolve_goal("sleep more", np.array([0.99, 0.05, 0.0])) == "sleep better"
+    assert not cache.needs_goal_embedding("SLEEP MORE!")
+    assert cache.resolve_goal("SLEEP MORE!") == "sleep better"
+    assert cache.stats()["semantic_matches"] == 1
+
+    assert cache.resolve_goal("run a 5k", np.array([0.0, 1.0, 0.0])) == "run a 5k"
+    # A third distinct goal evicts the least recently used one ("sleep better") and its aliases
+    assert cache.resolve_goal("eat well", np.array([0.0, 0.0, 1.0])) == "eat well"
+    stats = cache.stats()
+    assert stats["known_goals"] == 2
+    assert stats["goal_aliases"] <= 2
+    assert cache.needs_goal_embedding("sleep more")
+    assert cache.resolve_goal("sleep more", np.array([0.99, 0.05, 0.0])) == "sleep more"
+
+def test_goals_pass_through_without_a_threshold():
+    cache = PlanCache()
+    assert not cache.needs_goal_embedding("Sleep better")
+    assert cache.resolve_goal("Sleep better!", np.array([1.0, 0.0])) == "sleep better"
+
+def test_backend_shares_plans_between_caches():
+    backend = FakeBackend()
+    writer, reader = PlanCache(backend=backend, ttl_seconds=3600), PlanCache(backend=backend)
+    context = writer.canonical_context(USER)
+    today = date.today().isoformat()
+
+    writer.set(context, today, PLAN, tokens=80)
+    (key, value), = backend.values.items()
+    assert json.loads(value) == {"plan": PLAN, "tokens": 80}
+    assert backend.expiry[key] == 3600
+
+    assert reader.get(context, today) == PLAN
+    assert reader.stats()["backend_hits"] == 1
+    # Backend hits are kept locally afterwards
+    backend.values.clear()
+    assert reader.get(context, today) == PLAN
+
+@pytest.mark.asyncio
+async def test_async_get_and_set_use_the_backend():
+    backend = FakeBackend()
+    writer, reader = PlanCache(backend=backend), PlanCache(backend=backend)
+    context = writer.canonical_context(USER)
+    today = date.today().isoformat()
+
+    assert await reader.aget(context, today) is None
+    await writer.aset(context, today, PLAN, tokens=50)
+    assert await writer.aget(context, today) == PLAN
+    assert await reader.aget(context, today) == PLAN
+
+    stats = reader.stats()
+    assert stats["misses"] == 1
+    assert stats["backend_hits"] == 1
+    assert stats["saved_tokens"] == 50
+
+def test_goal_whose_own_alias_was_evicted_is_not_added_twice():
+    cache = PlanCache(similarity_threshold=0.9, max_goals=3)
+    vectors = {
+        "a": [1.0, 0.0, 0.0], "a2": [1.0, 0.1, 0.0], "a3": [1.0, 0.1, 0.1], "a4": [1.0, 0.0, 0.1],
+        "b": [0.0, 1.0, 0.0], "c": [0.0, 0.0, 1.0], "a5": [1.0, 0.05, 0.0]
+    }
+
+    # a2..a4 alias to "a" and push its own alias entry out, while "a" stays a known goal
+    for goal in ("a", "a2", "a3", "a4"):
+        assert cache.resolve_goal(goal, np.array(vectors[goal])) == "a"
+    assert not cache.needs_goal_embedding("a")
+    assert cache.resolve_goal("a", np.array(vectors["a"])) == "a"
+    assert cache.stats()["semantic_matches"] == 3
+
+    for goal in ("b", "c"):
+        assert cache.resolve_goal(goal, np.array(vectors[goal])) == goal
+    assert cache.resolve_goal("a5", np.array(vectors["a5"])) == "a"
+    assert cache.stats()["known_goals"] == 3
+
+    # Evicting "a" removes its vector from the search, so a similar goal becomes a new known goal
+    for goal, vector in (("d", [0.0, 1.0, 1.0]), ("e", [0.0, -1.0, 0.0]), ("f", [0.0, 0.0, -1.0])):
+        assert cache.resolve_goal(goal, np.array(vector)) == goal
+    assert cache.resolve_goal("a6", np.array(vectors["a5"])) == "a6"
+    assert cache.stats()["known_goals"] == 3
+
+@pytest.mark.parametrize("value", [b"not json", b"[1, 2]", b'{"tokens": 3}', b'{"plan": "text"}'])
+def test_corrupt_backend_values_are_misses(value):
+    backend = FakeBackend()
+    cache = PlanCache(backend=backend)
+    context = cache.canonical_context(USER)
+    today = date.today().isoformat()
+    backend.values[cache._key(context, today)] = value
+
+    assert cache.get(context, today) is None
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["backend_hits"] == 0
@@ -0,0 +1,111 @@
+"""
+Daily plan routing between the template planner, the plan cache and GPT (via the local stub server)
+"""
+
+import pytest
+from src.utils.llm_gateway import LLMRateLimitError
+
+SHORT_REQUEST = {
+    "user_id": "user-1",
+    "goal": "Sleep better",
+    "current_streak": 3,
+    "recent_activities": [],
+    "available_time_minutes": 10,
+    "preferred_time": "evening",
+    "mood": None
+}
+
+def _total_minutes(plan):
+    return sum(item["duration_minutes"] for item in plan["daily_items"])
+
+@pytest.mark.asyncio
+async def test_template_policy_needs_no_api_key(micro_coach_factory, monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    coach = micro_coach_factory("template")
+
+    assert coach.openai_client is None
+    assert coach.is_ready()
+    # Every request is planned from templates, including ones template_first would send to GPT
+    plan = await coach.generate_daily_plan(dict(SHORT_REQUEST, mood="anxious", available_time_minutes=60))
+    assert plan["daily_items"]
+    assert plan["estimated_total_time"] == _total_minutes(plan) <= 60
+    assert coach.route_counts == {"template": 1, "cache": 0, "llm": 0, "fallback": 0}
+
+@pytest.mark.asyncio
+async def test_budget_smaller_than_every_template_gets_a_shortened_item(micro_coach_factory):
+    coach = micro_coach_factory("template")
+
+    plan = await coach.generate_daily_plan(dict(SHORT_REQUEST, available_time_minutes=1))
+    assert len(plan["daily_items"]) == 1
+    assert plan["daily_items"][0]["duration_minutes"] == 1
+    assert plan["daily_items"][0]["description"].startswith("A shorter 1-minute version")
+    assert plan["estimated_total_time"] == 1
+
+@pytest.mark.asyncio
+async def test_template_policy_streams_the_template_plan(micro_coach_factory):
+    coach = micro_coach_factory("template")
+
+    events = [event async for event in coach.stream_daily_plan(SHORT_REQUEST)]
+    kinds = [kind for kind, _ in events]
+    assert kinds[0] == "message"
+    assert kinds[-1] == "plan"
+    assert kinds.count("item") == len(events[-1][1]["daily_items"])
+
+@pytest.mark.asyncio
+async def test_template_first_sends_only_common_requests_to_templates(micro_coach_factory, stub_server):
+    coach = micro_coach_factory("template_first", stub_server(latency_ms=5, token_ms=1), PLAN_TEMPLATE_MAX_MINUTES=15)
+
+    await coach.generate_daily_plan(SHORT_REQUEST)
+    assert coach.route_counts["template"] == 1
+    assert coach.route_counts["llm"] == 0
+
+    # Mood, a long session or an unrecognized goal go to GPT
+    for changes in ({"mood": "anxious"}, {"available_time_minutes": 30}, {"goal": "learn to juggle"}):
+        plan = await coach.generate_daily_plan(dict(SHORT_REQUEST, **changes))
+        assert plan["daily_items"]
+    assert coach.route_counts == {"template": 1, "cache": 0, "llm": 3, "fallback": 0}
+    assert coach.llm_gateway.stats()["operations"]["chat.daily_plan"]["calls"] == 3
+
+    # The same context again is served from the plan cache
+    await coach.generate_daily_plan(dict(SHORT_REQUEST, user_id="user-2", mood="anxious"))
+    assert coach.route_counts["cache"] == 1
+
+@pytest.mark.asyncio
+async def test_fallback_policy_serves_templates_when_gpt_is_saturated(micro_coach_factory, stub_server, monkeypatch):
+    coach = micro_coach_factory("fallback", stub_server(latency_ms=5, token_ms=1), PLAN_FALLBACK_MAX_WAIT_SECONDS=2)
+
+    await coach.generate_daily_plan(SHORT_REQUEST)
+    assert coach.route_counts["llm"] == 1
+
+    monkeypatch.setattr(coach.llm_gateway, "estimated_wait", lambda *args, **kwargs: 30.0)
+    plan = await coach.generate_daily_plan(dict(SHORT_REQUEST, goal="Run a 5k"))
+    assert plan["daily_items"]
+    assert coach.route_counts["fallback"] == 1
+    assert coach.llm_gateway.stats()["operations"]["chat.daily_plan"]["calls"] == 1
+
+    # Background jobs never get a template: they queue for GPT within the gateway's budget
+    await coach.generate_daily_plan(dict(SHORT_REQUEST, goal="Eat more vegetables"), fallback=False)
+    assert coach.route_counts["fallback"] == 1
+    assert coach.llm_gateway.stats()["operations"]["chat.daily_plan"]["calls"] == 2
+
+@pytest.mark.asyncio
+async def test_background_jobs_get_the_rate_limit_error_instead_of_a_template(micro_coach_factory, stub_server):
+    coach = micro_coach_factory("fallback", stub_server(), LLM_REQUESTS_PER_MINUTE=1, LLM_MAX_QUEUE_SECONDS=1)
+
+    await coach.generate_daily_plan(SHORT_REQUEST, fallback=False)
+    with pytest.raises(LLMRateLimitError):
+        await coach.generate_daily_plan(dict(SHORT_REQUEST, goal="Run a 5k"), fallback=False)
+    assert coach.route_counts["fallback"] == 0
+
+    # Interactive requests get the template when the bucket wait exceeds the fallback budget
+    plan = await coach.generate_daily_plan(dict(SHORT_REQUEST, goal="Run a 5k"))
+    assert plan["daily_items"]
+    assert coach.route_counts["fallback"] == 1
+
+@pytest.mark.asyncio
+async def test_llm_policy_never_uses_templates(micro_coach_factory, stub_server):
+    coach = micro_coach_factory("llm", stub_server(latency_ms=5, token_ms=1))
+
+    assert coach.template_planner is None
+    await coach.generate_daily_plan(SHORT_REQUEST)
+    assert coach.route_counts == {"template": 0, "cache": 0, "llm": 1, "fallback": 0}
@@ -0,0 +1,104 @@
+"""
+PlanStore persistence and context-signature matching of precomputed plans
+"""
+
+import asyncio
+import sqlite3
+import pytest
+from src.utils.plan_store import PlanStore
+
+def _plan(user_id: str = "user-1", plan_date: str = "2026-03-02", message: str = "Good morning") -> dict:
+    return {
+        "user_id": user_id,
+        "plan_date": plan_date,
+        "motivational_message": message,
+        "daily_items": [{"activity": "Breathe", "duration_minutes": 5, "description": "Box breathing", "category": "meditation"}],
+        "estimated_total_time": 5,
+        "follow_up_time": "evening"
+    }
+
+@pytest.fixture
+def store(tmp_path):
+    store = PlanStore(str(tmp_path / "plans.sqlite3"))
+    yield store
+    store.close()
+
+@pytest.fixture
+def micro_coach(micro_coach_factory):
+    return micro_coach_factory("template")
+
+def test_plans_are_served_only_for_the_same_context(store):
+    store.put(_plan(), "signature-a")
+
+    assert store.get("user-1", "2026-03-02", "signature-a") == _plan()
+    assert store.get("user-1", "2026-03-02", "signature-b") is None
+    assert store.get("user-1", "2026-03-03", "signature-a") is None
+    assert store.get("user-2", "2026-03-02", "signature-a") is None
+    # Without a signature the context is not checked
+    assert store.get("user-1", "2026-03-02") == _plan()
+
+    stats = store.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 3
+    assert stats["context_mismatches"] == 1
+
+def test_has_checks_the_context(store):
+    store.put(_plan(), "signature-a")
+
+    assert store.has("user-1", "2026-03-02")
+    assert store.has("user-1", "2026-03-02", "signature-a")
+    assert not store.has("user-1", "2026-03-02", "signature-b")
+    assert not store.has("user-1", "2026-03-03")
+
+def test_replacing_a_plan_replaces_its_context(store):
+    store.put(_plan(message="old"), "signature-a")
+    store.put_many([(_plan(message="new"), "signature-b"), (_plan("user-2"), "signature-a")])
+
+    assert store.get("user-1", "2026-03-02", "signature-a") is None
+    assert store.get("user-1", "2026-03-02", "signature-b")["motivational_message"] == "new"
+    assert store.get("user-2", "2026-03-02", "signature-a") is not None
+    assert store.stats()["plans_by_date"] == {"2026-03-02": 2}
+
+def test_purge_before_drops_older_dates(store):
+    store.put_many([(_plan(plan_date=plan_date), "signature-a") for plan_date in ("2026-03-01", "2026-03-02", "2026-03-03")])
+
+    assert store.purge_before("2026-03-02") == 1
+    assert store.stats()["plans_by_date"] == {"2026-03-03": 1, "2026-03-02": 1}
+
+def test_stores_without_context_signatures_are_migrated_and_never_match(tmp_path):
+    path = tmp_path / "plans.sqlite3"
+    connection = sqlite3.connect(str(path))
+    connection.execute(
+        "CREATE TABLE daily_plans (user_id TEXT NOT NULL, plan_date TEXT NOT NULL, plan TEXT NOT NULL,"
+        " created_at REAL NOT NULL, PRIMARY KEY (user_id, plan_date))"
+    )
+    connection.execute("INSERT INTO daily_plans VALUES ('user-1', '2026-03-02', '{\"user_id\": \"user-1\"}', 0)")
+    connection.commit()
+    connection.close()
+
+    store = PlanStore(str(path))
+    assert store.get("user-1", "2026-03-02", "signature-a") is None
+    assert store.stats()["context_mismatches"] == 1
+    assert not store.has("user-1", "2026-03-02", "signature-a")
+    store.close()
+
+def test_precomputed_plans_follow_the_request_context(micro_coach):
+    request = {
+        "user_id": "user-1", "goal": "Sleep better", "current_streak": 4, "recent_activities": ["yoga"],
+        "available_time_minutes": 10, "preferred_time": "evening", "mood": None
+    }
+    plan = _plan()
+    micro_coach.plan_store.put(plan, micro_coach.plan_signature(request))
+
+    def precomputed(**changes):
+        return asyncio.run(micro_coach.get_precomputed_plan(dict(request, **changes), "2026-03-02"))
+
+    assert precomputed() == plan
+    # Changes within the same buckets still match the stored context
+    assert precomputed(goal="sleep  BETTER!", current_streak=5, available_time_minutes=14) == plan
+    # A stale plan generated for a different context is not served
+    assert precomputed(mood="anxious") is None
+    assert precomputed(goal="Run a 5k") is None
+    assert precomputed(recent_activities=["walk"]) is None
+    assert precomputed(available_time_minutes=30) is None
+    assert precomputed(current_streak=10) is None
@@ -0,0 +1,72 @@
+"""
+TemplatePlanner goal matching, budget fitting and recent-activity exclusion
+"""
+
+from src.utils.template_planner import TemplatePlanner
+
+CATALOG = [
+    {"id": "sleep-1", "title": "Evening Wind Down", "description": "A 20-minute bedtime routine", "category": "sleep"},
+    {"id": "sleep-2", "title": "Sleep Breathing", "description": "Slow breathing before bed", "category": "sleep",
+     "duration_minutes": 5},
+    {"id": "med-1", "title": "Body Scan", "description": "15 min guided body scan", "category": "meditation"},
+    {"id": "ex-1", "title": "Brisk Walk", "description": "A 30-minute walk outside", "category": "exercise"}
+]
+
+def _activities(plan):
+    return [item["activity"] for item in plan["daily_items"]]
+
+def test_durations_come_from_the_catalog_or_its_text():
+    planner = TemplatePlanner(CATALOG)
+    assert {item["id"]: item["duration_minutes"] for item in planner.items} == {
+        "sleep-1": 20, "sleep-2": 5, "med-1": 15, "ex-1": 30
+    }
+
+def test_goal_categories_pick_items_within_the_budget():
+    plan = TemplatePlanner(CATALOG).plan({"goal": "Sleep better", "available_time_minutes": 20})
+
+    assert _activities(plan) == ["Sleep Breathing", "Body Scan"]
+    assert sum(item["duration_minutes"] for item in plan["daily_items"]) <= 20
+    assert set(plan) == {"motivational_message", "daily_items", "follow_up_time"}
+
+def test_a_fitting_item_is_used_before_shortening_one():
+    catalog = [
+        {"id": "sleep-1", "title": "Evening Wind Down", "description": "A 20-minute routine", "category": "sleep"},
+        {"id": "med-1", "title": "Breathing Reset", "description": "5 min breathing", "category": "meditation"}
+    ]
+    plan = TemplatePlanner(catalog).plan({"goal": "sleep", "available_time_minutes": 10})
+
+    assert _activities(plan) == ["Breathing Reset"]
+    assert plan["daily_items"][0]["duration_minutes"] == 5
+
+def test_recent_items_are_used_when_no_fresh_item_fits():
+    plan = TemplatePlanner(CATALOG).plan({
+        "goal": "sleep", "available_time_minutes": 5, "recent_activities": ["sleep breathing"]
+    })
+
+    assert _activities(plan) == ["Sleep Breathing"]
+    assert plan["daily_items"][0]["duration_minutes"] == 5
+
+def test_recent_items_are_skipped_when_something_else_fits():
+    plan = TemplatePlanner(CATALOG).plan({
+        "goal": "sleep", "available_time_minutes": 20, "recent_activities": ["Sleep breathing"]
+    })
+
+    assert "Sleep Breathing" not in _activities(plan)
+    assert _activities(plan) == ["Evening Wind Down"]
+
+def test_budget_smaller_than_every_item_shortens_the_best_match():
+    plan = TemplatePlanner(CATALOG).plan({"goal": "sleep", "available_time_minutes": 3})
+
+    assert plan["daily_items"] == [{
+        "activity": "Sleep Breathing",
+        "duration_minutes": 3,
+        "description": "A shorter 3-minute version: Slow breathing before bed",
+        "category": "sleep"
+    }]
+
+def test_can_plan_only_short_mood_free_recognized_goals():
+    planner = TemplatePlanner(CATALOG)
+    assert planner.can_plan({"goal": "sleep better", "available_time_minutes": 10}, max_minutes=15)
+    assert not planner.can_plan({"goal": "sleep better", "available_time_minutes": 30}, max_minutes=15)
+    assert not planner.can_plan({"goal": "sleep better", "mood": "anxious"}, max_minutes=15)
+    assert not planner.can_plan({"goal": "learn guitar"}, max_minutes=15)